@@ -0,0 +1,237 @@
+import argparse
+import json
+import os
+from collections.abc import Iterable, Iterator
+from dataclasses import dataclass, field
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Self
+
+import numpy as np
+import pandas as pd
+
+from src.analysis_tools.ab_log import iter_file_events
+from src.microservice.event_log import read_manifest
+from src.utils.constants import AB_LOG_PATH, LOG_DIR
+
+MATCHED_COLUMNS = ["request_id", "variant", "prob", "y_true", "ts"]
+DEFAULT_TTL_S = 7 * 24 * 3600.0
+
+
+def _epoch(ts: str | None) -> float:
+    return 0.0 if ts is None else datetime.fromisoformat(ts).timestamp()
+
+
+@dataclass
+class JoinState:
+    pending: dict[str, tuple[str, float, float]] = field(default_factory=dict)
+    pending_feedback: dict[str, tuple[int, float]] = field(default_factory=dict)
+    done_segments: set[str] = field(default_factory=set)
+    offsets: dict[str, int] = field(default_factory=dict)
+    watermark: float = 0.0
+    matched: int = 0
+    evicted: int = 0
+    # Size of matched.csv when this state was saved; see IncrementalJoiner.
+    matched_bytes: int | None = None
+
+    @classmethod
+    def load(cls, path: Path) -> Self:
+        if not path.exists():
+            # Nothing was committed yet, so neither was any matched row.
+            return cls(matched_bytes=0)
+        raw = json.loads(path.read_text(encoding="utf-8"))
+        return cls(
+            pending={k: tuple(v) for k, v in raw["pending"].items()},
+            pending_feedback={
+                k: tuple(v) for k, v in raw["pending_feedback"].items()
+            },
+            done_segments=set(raw["done_segments"]),
+            offsets=raw["offsets"],
+            watermark=raw["watermark"],
+            matched=raw["matched"],
+            evicted=raw["evicted"],
+            matched_bytes=raw.get("matched_bytes"),
+        )
+
+    def save(self, path: Path) -> None:
+        raw = {**self.__dict__, "done_segments": sorted(self.done_segments)}
+        tmp = path.with_suffix(".tmp")
+        tmp.write_text(json.dumps(raw), encoding="utf-8")
+        os.replace(tmp, path)
+
+
+class IncrementalJoiner:
+    """Join predict and feedback events by `request_id` as the log grows.
+
+    Unmatched predictions are kept as `request_id -> (variant, prob, ts)` and
+    unmatched feedback as `request_id -> (y_true, ts)`. Entries older than
+    `ttl_s` (measured against the newest event seen) are evicted. Matched rows
+    are appended to `matched.csv` in `out_dir`, and the index plus the read
+    position in the log are persisted in `state.json`, so each run only reads
+    what was written since the previous one.
+
+    `state.json` is the commit point: it records the size of `matched.csv`,
+    and rows appended after it (by a run that crashed before saving its
+    state) are truncated on start, since that run's input is read again.
+    """
+
+    def __init__(self, out_dir: Path, *, ttl_s: float = DEFAULT_TTL_S):
+        self.out_dir = out_dir
+        self.ttl_s = ttl_s
+        self.out_dir.mkdir(parents=True, exist_ok=True)
+        self.matched_path = out_dir / "matched.csv"
+        self.state_path = out_dir / "state.json"
+        self.state = JoinState.load(self.state_path)
+        self._drop_uncommitted()
+
+    def process(self, events: Iterable[dict[str, Any]]) -> list[dict[str, Any]]:
+        st = self.state
+        rows: list[dict[str, Any]] = []
+        for e in events:
+            kind = e.get("event")
+            rid = e.get("request_id")
+            if rid is None:
+                continue
+            ts = _epoch(e.get("ts"))
+            st.watermark = max(st.watermark, ts)
+            if kind == "predict":
+                fb = st.pending_feedback.pop(rid, None)
+                if fb is None:
+                    st.pending[rid] = (e["variant"], float(e["prob"]), ts)
+                else:
+                    rows.append(self._row(rid, e["variant"], e["prob"], fb[0], ts))
+            elif kind == "feedback":
+                pred = st.pending.pop(rid, None)
+                if pred is None:
+                    st.pending_feedback[rid] = (int(e["true"]), ts)
+                else:
+                    rows.append(self._row(rid, pred[0], pred[1], e["true"], pred[2]))
+        st.matched += len(rows)
+        self.evict()
+        return rows
+
+    def evict(self) -> None:
+        st = self.state
+        cutoff = st.watermark - self.ttl_s
+        for index in (st.pending, st.pending_feedback):
+            expired = [rid for rid, v in index.items() if v[-1] < cutoff]
+            for rid in expired:
+                del index[rid]
+            st.evicted += len(expired)
+
+    def tail(self, path: Path) -> int:
+        """Consume events appended to `path` since the last call.
+
+        `path` is a single JSONL file (read from the saved byte offset) or a
+        rotated log directory (only sealed segments listed in the manifest).
+        """
+
+        if path.is_file():
+            rows = self.process(self._read_from_offset(path))
+        else:
+            rows = []
+            for seg in read_manifest(path):
+                if seg["file"] in self.state.done_segments:
+                    continue
+                rows.extend(self.process(iter_file_events(path / seg["file"])))
+                self.state.done_segments.add(seg["file"])
+        self._append(rows)
+        if self.matched_path.exists():
+            self.state.matched_bytes = self.matched_path.stat().st_size
+        self.state.save(self.state_path)
+        return len(rows)
+
+    def load_matched(self) -> pd.DataFrame:
+        if not self.matched_path.exists():
+            return pd.DataFrame(columns=pd.Index(MATCHED_COLUMNS))
+        return pd.read_csv(self.matched_path, dtype={"request_id": "string"})
+
+    def _drop_uncommitted(self) -> None:
+        size = self.state.matched_bytes
+        if size is None or not self.matched_path.exists():
+            return
+        if self.matched_path.stat().st_size > size:
+            with self.matched_path.open("r+b") as f:
+                f.truncate(size)
+
+    def _read_from_offset(self, path: Path) -> Iterator[dict[str, Any]]:
+        """Events after the saved offset, read line by line.
+
+        The offset advances past each complete line as it is read.
+        """
+        key = str(path.resolve())
+        offset = self.state.offsets.get(key, 0)
+        if path.stat().st_size < offset:
+            offset = self.state.offsets[key] = 0
+        with path.open("rb") as f:
+            f.seek(offset)
+            for line in f:
+                # A trailing line without "\n" may still be written; leave it.
+                if not line.endswith(b"\n"):
+                    break
+                offset += len(line)
+                self.state.offsets[key] = offset
+                if line.strip():
+                    yield json.loads(line)
+
+    def _append(self, rows: list[dict[str, Any]]) -> None:
+        if not rows:
+            return
+        df = pd.DataFrame(rows, columns=pd.Index(MATCHED_COLUMNS))
+        df.to_csv(
+            self.matched_path,
+            mode="a",
+            header=not self.matched_path.exists(),
+            index=False,
+        )
+
+    @staticmethod
+    def _row(
+        rid: str, variant: str, prob: float, y_true: int, ts: float
+    ) -> dict[str, Any]:
+        return {
+            "request_id": rid,
+            "variant": variant,
+            "prob": float(prob),
+            "y_true": int(y_true),
+            "ts": ts,
+        }
+
+
+def logloss_by_variant(matched: pd.DataFrame, eps: float = 1e-15) -> pd.DataFrame:
+    p = np.clip(matched["prob"].to_numpy(dtype=float), eps, 1 - eps)
+    y = matched["y_true"].to_numpy(dtype=float)
+    loss = -(y * np.log(p) + (1 - y) * np.log(1 - p))
+    return (
+        matched.assign(loss=loss)
+        .groupby("variant")["loss"]
+        .agg(["count", "mean", "std"])
+        .reset_index()
+    )
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser()
+    ap.add_argument(
+        "--log",
+        type=Path,
+        default=AB_LOG_PATH,
+        help="JSONL log file or rotated log directory",
+    )
+    ap.add_argument("--out", type=Path, default=LOG_DIR / "ab_join")
+    ap.add_argument("--ttl-hours", type=float, default=DEFAULT_TTL_S / 3600)
+    args = ap.parse_args()
+
+    joiner = IncrementalJoiner(args.out, ttl_s=args.ttl_hours * 3600)
+    new_rows = joiner.tail(args.log)
+    st = joiner.state
+    print(
+        f"new matches: {new_rows}  total: {st.matched}  "
+        f"pending predict: {len(st.pending)}  "
+        f"pending feedback: {len(st.pending_feedback)}  evicted: {st.evicted}"
+    )
+    print(logloss_by_variant(joiner.load_matched()).to_string(index=False))
+
+
+if __name__ == "__main__":
+    main()
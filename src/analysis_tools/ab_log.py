@@ -0,0 +1,129 @@
+import gzip
+import json
+from collections.abc import Iterable, Iterator
+from datetime import datetime
+from pathlib import Path
+from typing import Any, TextIO
+
+import pandas as pd
+
+from src.microservice.event_log import read_manifest
+
+
+def _open_text(path: Path) -> TextIO:
+    if path.suffix == ".gz":
+        return gzip.open(path, "rt", encoding="utf-8")
+    return path.open("r", encoding="utf-8")
+
+
+def _segment_overlaps(
+    seg: dict[str, Any],
+    since: datetime | None,
+    until: datetime | None,
+) -> bool:
+    if seg.get("start_ts") is None or seg.get("end_ts") is None:
+        return True
+    if since is not None and datetime.fromisoformat(seg["end_ts"]) < since:
+        return False
+    if until is not None and datetime.fromisoformat(seg["start_ts"]) > until:
+        return False
+    return True
+
+
+def _segment_has_variants(seg: dict[str, Any], variants: set[str]) -> bool:
+    # Feedback events carry no variant, so segments with feedback are kept.
+    if seg.get("events", {}).get("feedback"):
+        return True
+    return bool(variants & set(seg.get("variants", {})))
+
+
+def log_files(
+    path: Path,
+    *,
+    since: datetime | None = None,
+    until: datetime | None = None,
+    variants: Iterable[str] | None = None,
+) -> list[Path]:
+    """Resolve an A/B log location to the files that may hold matching events.
+
+    `path` is either a single JSONL file or a rotated log directory; for a
+    directory the manifest is used to skip segments outside `since`/`until`
+    or without any of `variants`.
+    """
+
+    if path.is_file():
+        return [path]
+    wanted = None if variants is None else set(variants)
+    files = []
+    for seg in read_manifest(path):
+        if not _segment_overlaps(seg, since, until):
+            continue
+        if wanted is not None and not _segment_has_variants(seg, wanted):
+            continue
+        files.append(path / seg["file"])
+    return files
+
+
+def iter_file_events(file: Path) -> Iterator[dict[str, Any]]:
+    with _open_text(file) as f:
+        for i, raw in enumerate(f, start=1):
+            line = raw.strip()
+            if not line:
+                continue
+            try:
+                yield json.loads(line)
+            except json.JSONDecodeError:
+                print(f"[warn] invalid JSON in {file.name} line {i}, skipping")
+
+
+def iter_events(
+    path: Path,
+    *,
+    since: datetime | None = None,
+    until: datetime | None = None,
+    variants: Iterable[str] | None = None,
+) -> Iterator[dict[str, Any]]:
+    for file in log_files(path, since=since, until=until, variants=variants):
+        yield from iter_file_events(file)
+
+
+def load_events(
+    path: Path,
+    *,
+    since: datetime | None = None,
+    until: datetime | None = None,
+    variants: Iterable[str] | None = None,
+) -> pd.DataFrame:
+    return pd.DataFrame(
+        iter_events(path, since=since, until=until, variants=variants)
+    )
+
+
+def load_parquet_events(  # noqa: PLR0913 - keyword-only filters, as in load_events
+    path: Path,
+    event: str,
+    *,
+    columns: list[str] | None = None,
+    since: datetime | None = None,
+    until: datetime | None = None,
+    variants: Iterable[str] | None = None,
+) -> pd.DataFrame:
+    """Load one event type from a `ParquetSink` directory.
+
+    Date and variant filters are applied on the partition directories, so
+    skipped partitions are never opened. Only predict events are partitioned
+    by variant.
+    """
+
+    filters: list[tuple[str, str, Any]] = []
+    if since is not None:
+        filters.append(("date", ">=", since.date().isoformat()))
+    if until is not None:
+        filters.append(("date", "<=", until.date().isoformat()))
+    if variants is not None:
+        filters.append(("variant", "in", list(variants)))
+    return pd.read_parquet(
+        path / f"event={event}",
+        columns=columns,
+        filters=filters or None,
+    )
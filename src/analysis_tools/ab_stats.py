@@ -0,0 +1,330 @@
+import argparse
+import json
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Self
+
+import numpy as np
+import pandas as pd
+from scipy.stats import t as student_t
+
+EPS = 1e-15
+
+
+def logloss(prob: np.ndarray, y_true: np.ndarray) -> np.ndarray:
+    p = np.clip(np.asarray(prob, dtype=np.float64), EPS, 1 - EPS)
+    y = np.asarray(y_true, dtype=np.float64)
+    return -(y * np.log(p) + (1 - y) * np.log(1 - p))
+
+
+@dataclass
+class RunningStats:
+    """Welford/Chan mean and variance; mergeable across workers and segments."""
+
+    count: int = 0
+    mean: float = 0.0
+    m2: float = 0.0
+
+    def update(self, values: np.ndarray) -> None:
+        x = np.asarray(values, dtype=np.float64)
+        if x.size == 0:
+            return
+        batch_mean = float(x.mean())
+        self.merge(
+            RunningStats(
+                int(x.size), batch_mean, float(((x - batch_mean) ** 2).sum())
+            )
+        )
+
+    def merge(self, other: Self) -> None:
+        if other.count == 0:
+            return
+        n = self.count + other.count
+        delta = other.mean - self.mean
+        self.mean += delta * other.count / n
+        self.m2 += other.m2 + delta**2 * self.count * other.count / n
+        self.count = n
+
+    @property
+    def var(self) -> float:
+        return self.m2 / (self.count - 1) if self.count > 1 else float("nan")
+
+    @property
+    def std(self) -> float:
+        return float(np.sqrt(self.var))
+
+
+@dataclass
+class CalibrationBins:
+    """Per-bin counts, summed predictions and summed labels over [0, 1]."""
+
+    n_bins: int = 10
+    count: list[int] = field(default_factory=list)
+    sum_prob: list[float] = field(default_factory=list)
+    sum_true: list[float] = field(default_factory=list)
+
+    def __post_init__(self) -> None:
+        if not self.count:
+            self.count = [0] * self.n_bins
+            self.sum_prob = [0.0] * self.n_bins
+            self.sum_true = [0.0] * self.n_bins
+
+    def update(self, prob: np.ndarray, y_true: np.ndarray) -> None:
+        p = np.asarray(prob, dtype=np.float64)
+        y = np.asarray(y_true, dtype=np.float64)
+        idx = np.minimum((p * self.n_bins).astype(int), self.n_bins - 1)
+        cnt = np.bincount(idx, minlength=self.n_bins)
+        sp = np.bincount(idx, weights=p, minlength=self.n_bins)
+        sy = np.bincount(idx, weights=y, minlength=self.n_bins)
+        for i in range(self.n_bins):
+            self.count[i] += int(cnt[i])
+            self.sum_prob[i] += float(sp[i])
+            self.sum_true[i] += float(sy[i])
+
+    def merge(self, other: Self) -> None:
+        if other.n_bins != self.n_bins:
+            raise ValueError("Cannot merge calibration bins of different sizes")
+        for i in range(self.n_bins):
+            self.count[i] += other.count[i]
+            self.sum_prob[i] += other.sum_prob[i]
+            self.sum_true[i] += other.sum_true[i]
+
+    def table(self) -> pd.DataFrame:
+        cnt = np.asarray(self.count, dtype=np.float64)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            return pd.DataFrame(
+                {
+                    "bin_lo": np.arange(self.n_bins) / self.n_bins,
+                    "bin_hi": np.arange(1, self.n_bins + 1) / self.n_bins,
+                    "count": self.count,
+                    "mean_prob": np.asarray(self.sum_prob) / cnt,
+                    "frac_true": np.asarray(self.sum_true) / cnt,
+                }
+            )
+
+
+@dataclass
+class VariantStats:
+    loss: RunningStats = field(default_factory=RunningStats)
+    calibration: CalibrationBins = field(default_factory=CalibrationBins)
+    positives: int = 0
+
+    def update(self, prob: np.ndarray, y_true: np.ndarray) -> None:
+        self.loss.update(logloss(prob, y_true))
+        self.calibration.update(prob, y_true)
+        self.positives += int(np.asarray(y_true).sum())
+
+    def merge(self, other: Self) -> None:
+        self.loss.merge(other.loss)
+        self.calibration.merge(other.calibration)
+        self.positives += other.positives
+
+
+class ABStats:
+    """Per-variant streaming accumulators of per-request logloss.
+
+    Memory does not depend on the number of events: each variant keeps a
+    Welford accumulator, calibration bins and a label count. Instances built
+    on different workers or log segments are combined with `merge`, and can
+    be persisted with `to_dict`/`from_dict`.
+    """
+
+    def __init__(self, n_bins: int = 10):
+        self.n_bins = n_bins
+        self.variants: dict[str, VariantStats] = {}
+
+    def _get(self, variant: str) -> VariantStats:
+        if variant not in self.variants:
+            self.variants[variant] = VariantStats(
+                calibration=CalibrationBins(self.n_bins)
+            )
+        return self.variants[variant]
+
+    def update(self, variant: str, prob: np.ndarray, y_true: np.ndarray) -> None:
+        self._get(variant).update(prob, y_true)
+
+    def update_frame(self, matched: pd.DataFrame) -> None:
+        for variant, part in matched.groupby("variant", observed=True):
+            self.update(
+                str(variant), part["prob"].to_numpy(), part["y_true"].to_numpy()
+            )
+
+    def merge(self, other: Self) -> None:
+        for variant, stats in other.variants.items():
+            self._get(variant).merge(stats)
+
+    def summary(self) -> pd.DataFrame:
+        return pd.DataFrame(
+            [
+                {
+                    "variant": v,
+                    "count": s.loss.count,
+                    "mean_logloss": s.loss.mean,
+                    "std_logloss": s.loss.std,
+                    "pos_rate": s.positives / s.loss.count if s.loss.count else 0.0,
+                }
+                for v, s in sorted(self.variants.items())
+            ]
+        )
+
+    def to_dict(self) -> dict[str, Any]:
+        return {
+            "n_bins": self.n_bins,
+            "variants": {
+                v: {
+                    "loss": s.loss.__dict__,
+                    "calibration": s.calibration.__dict__,
+                    "positives": s.positives,
+                }
+                for v, s in self.variants.items()
+            },
+        }
+
+    @classmethod
+    def from_dict(cls, raw: dict[str, Any]) -> Self:
+        out = cls(n_bins=raw["n_bins"])
+        for v, s in raw["variants"].items():
+            out.variants[v] = VariantStats(
+                loss=RunningStats(**s["loss"]),
+                calibration=CalibrationBins(**s["calibration"]),
+                positives=s["positives"],
+            )
+        return out
+
+
+@dataclass(frozen=True)
+class HypothesisResult:
+    delta: float
+    se: float
+    statistic: float
+    p_value: float
+    reject: bool
+
+
+def welch_test(
+    a: RunningStats,
+    b: RunningStats,
+    *,
+    alpha: float = 0.05,
+) -> HypothesisResult:
+    """One-sided Welch t-test of H1: mean(a) > mean(b) from summary statistics.
+
+    Needs at least two samples and some variance; otherwise the statistic,
+    p-value and standard error are NaN and the null is not rejected.
+    """
+
+    nan = float("nan")
+    if a.count < 2 or b.count < 2:
+        return HypothesisResult(a.mean - b.mean, nan, nan, nan, False)
+    va, vb = a.var / a.count, b.var / b.count
+    se = float(np.sqrt(va + vb))
+    delta = a.mean - b.mean
+    if se == 0:
+        return HypothesisResult(delta, se, nan, nan, False)
+    t_stat = delta / se
+    dof = (va + vb) ** 2 / (va**2 / (a.count - 1) + vb**2 / (b.count - 1))
+    p = float(student_t.sf(t_stat, dof))
+    return HypothesisResult(delta, se, float(t_stat), p, p < alpha)
+
+
+def required_sample_size(
+    std_a: float,
+    std_b: float,
+    mde: float,
+    *,
+    alpha: float = 0.05,
+    power: float = 0.80,
+) -> float:
+    from statsmodels.stats.power import TTestIndPower  # noqa: PLC0415
+
+    std_pooled = float(np.sqrt((std_a**2 + std_b**2) / 2.0))
+    return float(
+        TTestIndPower().solve_power(
+            effect_size=mde / std_pooled,
+            alpha=alpha,
+            power=power,
+            ratio=1.0,
+            alternative="larger",
+        )
+    )
+
+
+@dataclass
+class SequentialTest:
+    """Always-valid mixture SPRT on the difference of mean logloss (A - B).
+
+    The normal mixture prior on the effect has variance `tau ** 2`; a natural
+    choice is `tau = mde`. `check` may be called after any number of events
+    without inflating the type I error: the returned p-value is always valid
+    and non-increasing across calls.
+    """
+
+    alpha: float = 0.05
+    tau: float = 0.01
+    p_value: float = 1.0
+
+    def check(self, a: RunningStats, b: RunningStats) -> HypothesisResult:
+        if a.count < 2 or b.count < 2:
+            return HypothesisResult(float("nan"), float("nan"), 0.0, self.p_value, False)
+        v = a.var / a.count + b.var / b.count
+        delta = a.mean - b.mean
+        tau2 = self.tau**2
+        log_lr = 0.5 * np.log(v / (v + tau2)) + tau2 * delta**2 / (2 * v * (v + tau2))
+        self.p_value = min(self.p_value, float(np.exp(-log_lr)))
+        reject = self.p_value < self.alpha and delta > 0
+        return HypothesisResult(delta, float(np.sqrt(v)), float(log_lr), self.p_value, reject)
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser()
+    ap.add_argument(
+        "matched",
+        type=Path,
+        nargs="+",
+        help="CSV tables with variant, prob, y_true (e.g. ab_join matched.csv)",
+    )
+    ap.add_argument("--chunksize", type=int, default=1_000_000)
+    ap.add_argument("--alpha", type=float, default=0.05)
+    ap.add_argument("--power", type=float, default=0.80)
+    ap.add_argument("--mde-rel", type=float, default=0.02)
+    ap.add_argument("--state-out", type=Path, default=None)
+    args = ap.parse_args()
+
+    stats = ABStats()
+    for path in args.matched:
+        part = ABStats()
+        for chunk in pd.read_csv(
+            path, usecols=["variant", "prob", "y_true"], chunksize=args.chunksize
+        ):
+            part.update_frame(chunk)
+        stats.merge(part)
+
+    print(stats.summary().to_string(index=False))
+    if args.state_out is not None:
+        args.state_out.write_text(json.dumps(stats.to_dict()), encoding="utf-8")
+    counts = {v: s.loss.count for v, s in stats.variants.items()}
+    too_small = [v for v in ("A", "B") if counts.get(v, 0) < 2]
+    if too_small:
+        found = ", ".join(f"{v}={counts.get(v, 0)}" for v in ("A", "B"))
+        print(f"Tests skipped: need >= 2 matched events per variant ({found}).")
+        return
+    a, b = stats.variants["A"].loss, stats.variants["B"].loss
+    mde = args.mde_rel * a.mean
+    n_required = required_sample_size(
+        a.std, b.std, mde, alpha=args.alpha, power=args.power
+    )
+    welch = welch_test(a, b, alpha=args.alpha)
+    seq = SequentialTest(alpha=args.alpha, tau=mde).check(a, b)
+    print(f"MDE (abs) = {mde:.6f}  n required per variant: {n_required:.1f}")
+    print(
+        f"Welch (one-sided A > B): delta={welch.delta:.6f} "
+        f"t={welch.statistic:.4f} p={welch.p_value:.6g} reject={welch.reject}"
+    )
+    print(
+        f"mSPRT (always valid):    delta={seq.delta:.6f} "
+        f"p={seq.p_value:.6g} reject={seq.reject}"
+    )
+
+
+if __name__ == "__main__":
+    main()
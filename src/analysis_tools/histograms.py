@@ -7,6 +7,7 @@ import pandas as pd
 from matplotlib.backends.backend_pdf import PdfPages
 from matplotlib.ticker import FuncFormatter, MultipleLocator
 from src.data_processing.bookings import build_bookings_from_sessions
+from src.data_processing.columnar import read_dataset
 
 DISCRETE_COLUMNS = {
     "accommodates",
@@ -195,10 +196,10 @@ def save_capped_nights_bar(
 
 
 def load_sessions(path: Path) -> pd.DataFrame:
-    return pd.read_csv(
+    return read_dataset(
         path,
         dtype={
-            "action": "string",
+            "action": "category",
             "user_id": "string",
             "listing_id": "string",
             "booking_id": "string",
@@ -256,7 +257,7 @@ def main() -> None:
                 bins=args.bins,
             )
         if listings_path.exists():
-            listings = pd.read_csv(listings_path, dtype={"id": "string"})
+            listings = read_dataset(listings_path, dtype={"id": "string"})
             if "price" in listings.columns:
                 price = price_to_float(listings["price"])
                 save_hist(
@@ -340,7 +341,7 @@ def main() -> None:
                 )
 
         if reviews_path.exists():
-            reviews = pd.read_csv(
+            reviews = read_dataset(
                 reviews_path,
                 dtype={"listing_id": "string", "reviewer_id": "string"},
             )
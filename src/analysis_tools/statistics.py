@@ -5,6 +5,7 @@ import pandas as pd
 from scipy.stats import chi2_contingency
 from sklearn.feature_selection import mutual_info_classif
 
+from src.data_processing.columnar import read_dataset
 from src.utils.constants import DATA, TARGET
 
 
@@ -29,7 +30,7 @@ def cramers_v(
 
 def mutual_info_univariate(x: pd.Series, y: pd.Series) -> float:
     s = x.copy()
-    if s.dtype == "object" or str(s.dtype).startswith("string"):
+    if not pd.api.types.is_numeric_dtype(s.dtype):
         s = s.astype("string").fillna("MISSING")
         codes, _ = pd.factorize(s)
         return float(
@@ -60,11 +61,11 @@ def mutual_info_univariate(x: pd.Series, y: pd.Series) -> float:
 
 
 def main() -> None:
-    df = pd.read_csv(DATA)
+    df = read_dataset(DATA)
     y = df[TARGET].astype(int)
     X = df.drop(columns=[TARGET]).copy()
     X = X.replace({pd.NA: np.nan}).infer_objects(copy=False)
-    num_cols = [c for c in X.columns if X[c].dtype != "object"]
+    num_cols = [c for c in X.columns if pd.api.types.is_numeric_dtype(X[c].dtype)]
     pearson = (
         df[num_cols + [TARGET]]
         .corr(numeric_only=True)[TARGET]
@@ -83,7 +84,7 @@ def main() -> None:
         nunique = int(X[col].nunique(dropna=True))
         mi = mutual_info_univariate(X[col], y)
         v = p = levels = None
-        if X[col].dtype == "object" or nunique <= 50:
+        if not pd.api.types.is_numeric_dtype(X[col].dtype) or nunique <= 50:
             v, p, levels = cramers_v(X[col], y, top_k=50)
 
         rows.append(
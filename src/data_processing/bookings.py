@@ -1,8 +1,16 @@
-import re
+from __future__ import annotations
+
+import os
+from collections import Counter
+from collections.abc import Iterator, Mapping, Sequence
+from itertools import chain
 from pathlib import Path
+from typing import TYPE_CHECKING
 
+import numpy as np
 import pandas as pd
 
+from src.data_processing.columnar import iter_dataset, read_dataset
 from src.data_processing.features import (
     host_features,
     listing_features,
@@ -12,6 +20,10 @@ from src.data_processing.features import (
 )
 from src.utils.constants import LONG_STAY_DURATION
 from src.utils.pandas import require_series
+from src.utils.text import slugify_amenity
+
+if TYPE_CHECKING:
+    from scipy.sparse import csr_matrix
 
 DATA_DIR = Path("data")
 
@@ -31,28 +43,33 @@ def cut_percent_signs(series: pd.Series) -> pd.Series:
     return _to_numeric_series(s)
 
 
+SESSION_DTYPES = {
+    "user_id": "string",
+    "listing_id": "string",
+    "booking_id": "string",
+    "action": "category",
+}
+
+
 def load_sessions(path: Path) -> pd.DataFrame:
-    return pd.read_csv(
-        path,
-        dtype={
-            "user_id": "string",
-            "listing_id": "string",
-            "booking_id": "string",
-            "action": "string",
-        },
-    )
+    return read_dataset(path, dataset="sessions", dtype=SESSION_DTYPES)
+
+
+def iter_sessions(path: Path, chunksize: int) -> Iterator[pd.DataFrame]:
+    yield from iter_dataset(path, chunksize, dataset="sessions", dtype=SESSION_DTYPES)
 
 
 def load_listing_features(path: Path) -> pd.DataFrame:
-    listings = pd.read_csv(path, dtype={"id": "string"})
+    columns = listing_features + night_limit_cols + host_features + review_features
+    listings = read_dataset(
+        path,
+        ["id" if c == "listing_id" else c for c in columns],
+        dtype={"id": "string"},
+    ).rename(columns={"id": "listing_id"})
     out = (
-        listings.rename(columns={"id": "listing_id"})
-        .dropna(subset=["listing_id"])
+        listings.dropna(subset=["listing_id"])
         .drop_duplicates(subset=["listing_id"])
-        .loc[
-            :,
-            listing_features + night_limit_cols + host_features + review_features,
-        ]
+        .loc[:, columns]
     )
     out["price"] = price_to_float(out["price"])
     out["host_response_rate"] = cut_percent_signs(out["host_response_rate"])
@@ -73,12 +90,15 @@ def load_listing_features(path: Path) -> pd.DataFrame:
         .fillna(False)
         .astype("int8")
     )
-    return out
+    # Parsed once per listing; bookings pick them up by `listing_id`.
+    out["amenities_list"] = [parse_amenities_cell(x) for x in out["amenities"]]
+    return out.drop(columns=["amenities"])
 
 
 def load_user_features(path: Path) -> pd.DataFrame:
-    users = pd.read_csv(
+    users = read_dataset(
         path,
+        ["id", "city", "postal_code"],
         dtype={"id": "string", "city": "string", "postal_code": "string"},
     )
     users["postal_prefix2"] = users["postal_code"].str.slice(0, 2)
@@ -147,41 +167,79 @@ def add_time_features(bookings: pd.DataFrame) -> pd.DataFrame:
     return b
 
 
-_slug_re = re.compile(r"[^a-z0-9_]+")
+def topk_amenities(amen_lists: list[list[str]], k: int = 100) -> list[str]:
+    vc = pd.Series([a for row in amen_lists for a in row]).value_counts()
+    return list(vc.head(k).index)
+
 
+def count_amenities(amen_lists: list[list[str]]) -> Counter[str]:
+    return Counter(a for row in amen_lists for a in row)
 
-def slugify_amenity(a: str) -> str:
-    s = a.strip().lower().replace(" ", "_")
-    s = _slug_re.sub("_", s)
-    s = re.sub(r"_+", "_", s).strip("_")
-    return s or "amenity"
 
+def topk_from_counts(counts: Mapping[str, int], k: int = 100) -> list[str]:
+    """`topk_amenities` from counts accumulated in first-seen order.
 
-def topk_amenities(amen_lists: list[list[str]], k: int = 100) -> list[str]:
-    vc = pd.Series([a for row in amen_lists for a in row]).value_counts()
+    Sorting them like `value_counts` sorts its first-seen counts breaks ties
+    the same way, so chunked and in-memory runs pick identical columns.
+    """
+    vc = pd.Series(counts, dtype="int64").sort_values(ascending=False)
     return list(vc.head(k).index)
 
 
-def encode_amenities_topk(
-    bookings: pd.DataFrame,
-    k: int = 100,
-) -> pd.DataFrame:
-    b = bookings.copy()
-    if "amenities" not in b.columns:
-        b["amenities_count"] = 0
-        return b
+def listing_positions(bookings: pd.DataFrame, listings: pd.DataFrame) -> np.ndarray:
+    """Row of each booking's listing in `listings`, -1 if it has none."""
+    ids = pd.Index(listings["listing_id"].astype("string"))
+    return ids.get_indexer(bookings["listing_id"].astype("string"))
+
+
+def amenity_counts(positions: np.ndarray, parsed: Sequence[list[str]]) -> Counter[str]:
+    """`count_amenities` of the rows whose amenities are `parsed[positions]`.
+
+    Loops over distinct listings, weighted by their number of rows, in
+    first-seen order, so ties come out as with the per-row count.
+    """
+    counts: Counter[str] = Counter()
+    for pos, n in pd.Series(positions).value_counts(sort=False).items():
+        if pos >= 0:
+            for a in parsed[pos]:
+                counts[a] += int(n)
+    return counts
 
-    amenities = require_series(b, "amenities")
-    parsed: list[list[str]] = [parse_amenities_cell(x) for x in amenities.tolist()]
 
-    b["amenities_list"] = pd.Series(parsed, index=b.index)
-    b["amenities_count"] = pd.Series((len(xs) for xs in parsed), index=b.index).astype(
-        "int16"
+def amenity_indicators(
+    parsed: Sequence[list[str]], top: Sequence[str] | None = None, k: int = 100
+) -> tuple[csr_matrix, list[str]]:
+    """CSR 0/1 matrix of which `top` amenities (or the top `k`) each row has.
+
+    Tokens are factorized once; the top-k come from the same counts, ranked
+    as `topk_amenities` ranks them. Returns the matrix and its columns.
+    """
+    from scipy.sparse import csr_matrix  # noqa: PLC0415
+
+    lengths = np.fromiter(map(len, parsed), dtype=np.int64, count=len(parsed))
+    codes, uniques = pd.factorize(
+        np.fromiter(chain.from_iterable(parsed), dtype=object, count=lengths.sum())
     )
+    if top is None:
+        counts = pd.Series(np.bincount(codes, minlength=len(uniques)), index=uniques)
+        top = list(counts.sort_values(ascending=False).head(k).index)
+    else:
+        top = list(top)
+
+    cols = pd.Index(top).get_indexer(uniques)[codes]
+    rows = np.repeat(np.arange(len(parsed)), lengths)
+    keep = cols >= 0
+    matrix = csr_matrix(
+        (np.ones(keep.sum(), dtype=np.int8), (rows[keep], cols[keep])),
+        shape=(len(parsed), len(top)),
+    )
+    # An amenity listed twice in one cell was summed to 2.
+    matrix.data[:] = 1
+    return matrix, top
 
-    top = topk_amenities(parsed, k=k)
 
-    colnames: dict[str, str] = {}
+def amenity_column_names(top: Sequence[str]) -> list[str]:
+    names: list[str] = []
     used: set[str] = set()
     for a in top:
         base = f"amen_{slugify_amenity(a)}"
@@ -191,22 +249,65 @@ def encode_amenities_topk(
             name = f"{base}_{i}"
             i += 1
         used.add(name)
-        colnames[a] = name
-
-    matrix: list[list[int]] = []
-    for xs in parsed:
-        s = set(xs)
-        matrix.append([int(a in s) for a in top])
-
-    columns: list[str] = [colnames[a] for a in top]
-    amen_df = pd.DataFrame(
-        matrix,
-        columns=pd.Index(columns),
-        index=b.index,
-    )
-    b = pd.concat([b, amen_df], axis=1)
+        names.append(name)
+    return names
 
-    return b
+
+def encode_amenities_topk(
+    bookings: pd.DataFrame,
+    k: int = 100,
+    *,
+    top: list[str] | None = None,
+    listings: pd.DataFrame | None = None,
+    dtype: str | pd.SparseDtype = "int8",
+) -> pd.DataFrame:
+    """One-hot encode the `k` most frequent amenities, or a fixed `top` list.
+
+    With `listings` (from `load_listing_features`) the amenities already
+    parsed per listing are encoded once per listing and joined to the
+    bookings by `listing_id`; otherwise each booking's `amenities` string
+    (or merged `amenities_list`) is parsed. Indicator columns have `dtype`
+    (`int8` or `bool`); with a `pd.SparseDtype` of either, e.g.
+    `pd.SparseDtype("bool")`, they are sparse columns built from the CSR
+    matrix.
+    """
+    b = bookings.copy()
+    if listings is not None:
+        from scipy.sparse import csr_matrix, vstack  # noqa: PLC0415
+
+        parsed = listings["amenities_list"].tolist()
+        positions = listing_positions(b, listings)
+        if top is None:
+            top = topk_from_counts(amenity_counts(positions, parsed), k)
+        matrix, top = amenity_indicators(parsed, top)
+        # Position -1 (no such listing) selects the appended empty row.
+        empty = csr_matrix((1, len(top)), dtype=matrix.dtype)
+        matrix = vstack([matrix, empty], format="csr")[positions]
+        lengths = np.fromiter(map(len, parsed), dtype=np.int16, count=len(parsed))
+        b["amenities_count"] = np.append(lengths, np.int16(0))[positions]
+    elif "amenities" in b.columns or "amenities_list" in b.columns:
+        column = "amenities" if "amenities" in b.columns else "amenities_list"
+        amenities = require_series(b, column)
+        parsed = [parse_amenities_cell(x) for x in amenities.tolist()]
+        b["amenities_list"] = pd.Series(parsed, index=b.index)
+        b["amenities_count"] = pd.Series(
+            (len(xs) for xs in parsed), index=b.index
+        ).astype("int16")
+        matrix, top = amenity_indicators(parsed, top, k)
+    else:
+        b["amenities_count"] = 0
+        return b
+
+    columns = pd.Index(amenity_column_names(top))
+    if isinstance(dtype, pd.SparseDtype):
+        amen_df = pd.DataFrame.sparse.from_spmatrix(
+            matrix, index=b.index, columns=columns
+        ).astype(dtype)
+    else:
+        amen_df = pd.DataFrame(
+            matrix.astype(dtype).toarray(), index=b.index, columns=columns
+        )
+    return pd.concat([b, amen_df], axis=1)
 
 
 def drop_unused_columns(bookings: pd.DataFrame) -> pd.DataFrame:
@@ -235,6 +336,7 @@ def prepare_bookings_to_train(
     user_feats: pd.DataFrame,
     *,
     amen_topk: int = 100,
+    listing_feats: pd.DataFrame | None = None,
 ) -> pd.DataFrame:
     bookings = build_bookings_from_sessions(sessions)
     bookings = add_time_features(bookings)
@@ -246,8 +348,106 @@ def prepare_bookings_to_train(
         validate="m:1",
     )
 
-    bookings = encode_amenities_topk(bookings, k=amen_topk)
+    bookings = encode_amenities_topk(bookings, k=amen_topk, listings=listing_feats)
 
     out = drop_unused_columns(bookings)
 
     return out
+
+
+def spool_bookings(
+    sessions_path: Path,
+    listing_feats: pd.DataFrame,
+    user_feats: pd.DataFrame,
+    spool: Path,
+    *,
+    chunksize: int = 500_000,
+) -> tuple[Counter[str], list[int]]:
+    """Write the not yet encoded booking rows of `sessions_path` to `spool`.
+
+    Each sessions chunk is joined with the listing and user tables and
+    appended to `spool` as CSV. Returns the amenity counts, in first-seen
+    order, and the number of rows each chunk contributed.
+    """
+    parsed = listing_feats["amenities_list"].tolist()
+    counts: Counter[str] = Counter()
+    sizes: list[int] = []
+    for sessions in iter_sessions(sessions_path, chunksize):
+        bookings = build_bookings_from_sessions(
+            sessions.merge(listing_feats, on="listing_id", how="left", validate="m:1")
+        )
+        if bookings.empty:
+            continue
+        bookings = add_time_features(bookings)
+        bookings = bookings.merge(user_feats, on="user_id", how="left", validate="m:1")
+        positions = listing_positions(bookings, listing_feats)
+        counts.update(amenity_counts(positions, parsed))
+        first = not sizes
+        drop_unused_columns(bookings).to_csv(
+            spool, mode="w" if first else "a", header=first, index=False
+        )
+        sizes.append(len(bookings))
+    return counts, sizes
+
+
+def encode_spool(
+    spool: Path,
+    sizes: list[int],
+    top: list[str],
+    listing_feats: pd.DataFrame,
+    out_path: Path,
+) -> None:
+    """One-hot encode a `spool_bookings` file into `out_path` with `top`.
+
+    The spool is read back verbatim, as strings, in the chunks it was
+    written in, so values keep the formatting they had in memory.
+    """
+    if not sizes:
+        pd.DataFrame().to_csv(out_path, index=False)
+        return
+    with pd.read_csv(
+        spool, dtype="string", keep_default_na=False, iterator=True
+    ) as reader:
+        for i, size in enumerate(sizes):
+            chunk = encode_amenities_topk(
+                reader.get_chunk(size), top=top, listings=listing_feats
+            )
+            drop_unused_columns(chunk).to_csv(
+                out_path, mode="w" if i == 0 else "a", header=i == 0, index=False
+            )
+
+
+def prepare_bookings_streaming(
+    data_dir: Path,
+    out_path: Path,
+    *,
+    amen_topk: int = 100,
+    chunksize: int = 500_000,
+) -> int:
+    """`prepare_bookings_to_train` over `data_dir`'s sessions read in chunks.
+
+    Listings and users are loaded whole. Pass 1 spools the booking rows
+    next to `out_path` and counts amenities (`spool_bookings`). The top-k
+    amenities are only known after the last chunk, so pass 2 encodes the
+    spool into `out_path` (`encode_spool`). Peak memory follows `chunksize`,
+    not the session history. Returns the rows written.
+    """
+    listing_feats = load_listing_features(data_dir / "listings.csv")
+    user_feats = load_user_features(data_dir / "users.csv")
+    spool = out_path.with_name(f"{out_path.name}.bookings.tmp")
+    tmp = out_path.with_name(f"{out_path.name}.tmp")
+    try:
+        counts, sizes = spool_bookings(
+            data_dir / "sessions.csv",
+            listing_feats,
+            user_feats,
+            spool,
+            chunksize=chunksize,
+        )
+        top = topk_from_counts(counts, amen_topk)
+        encode_spool(spool, sizes, top, listing_feats, tmp)
+        os.replace(tmp, out_path)
+    finally:
+        spool.unlink(missing_ok=True)
+        tmp.unlink(missing_ok=True)
+    return sum(sizes)
@@ -0,0 +1,432 @@
+import argparse
+import json
+import os
+import time
+from collections.abc import Iterator, Sequence
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any
+
+import numpy as np
+import pandas as pd
+
+FORMATS = {"parquet": ".parquet", "feather": ".feather"}
+CACHE_DIRNAME = "cache"
+SOURCE_KEY = b"csv_source"
+# Bump when the typing rules change so existing caches are rebuilt.
+CACHE_VERSION = 1
+MAX_CATEGORY_LEVELS = 1024
+INGEST_CHUNKSIZE = 250_000
+# Declared string columns stay Arrow-backed in pandas: no per-value Python
+# objects, and reading them back from the cache is close to a memcpy.
+ARROW_STRING = pd.StringDtype("pyarrow")
+
+# Explicitly typed columns per dataset (the CSV stem unless given). Everything
+# else is compacted from the data: smallest fitting int, float32 where
+# lossless, low-cardinality text as category, other text as object (as
+# `read_csv`).
+SCHEMAS: dict[str, dict[str, str]] = {
+    "sessions": {
+        "user_id": "string",
+        "listing_id": "string",
+        "booking_id": "string",
+        "action": "category",
+        "timestamp": "string",
+        "booking_date": "string",
+        "booking_duration": "string",
+    },
+    "listings": {
+        "id": "string",
+        "host_id": "string",
+        "price": "string",
+        # Repeated per session by the bookings merge: shared `str` objects
+        # are far smaller there than Arrow copies of every row's bytes.
+        "amenities": "object",
+        "host_response_rate": "string",
+        "host_acceptance_rate": "string",
+    },
+    "users": {"id": "string", "city": "string", "postal_code": "string"},
+    "reviews": {"listing_id": "string", "reviewer_id": "string", "id": "string"},
+}
+
+
+def cache_format() -> str | None:
+    """`DATA_CACHE_FORMAT`: parquet (default), feather, or none to read CSVs."""
+    fmt = os.environ.get("DATA_CACHE_FORMAT", "parquet").strip().lower()
+    if fmt in {"", "none", "csv", "off"}:
+        return None
+    if fmt not in FORMATS:
+        raise ValueError(f"Unknown DATA_CACHE_FORMAT: {fmt!r}")
+    return fmt
+
+
+def cache_path(csv_path: Path, fmt: str) -> Path:
+    return csv_path.parent / CACHE_DIRNAME / f"{csv_path.stem}{FORMATS[fmt]}"
+
+
+def _fingerprint(csv_path: Path, dataset: str) -> dict[str, Any]:
+    st = csv_path.stat()
+    return {
+        "name": csv_path.name,
+        "dataset": dataset,
+        "size": st.st_size,
+        "mtime_ns": st.st_mtime_ns,
+        "version": CACHE_VERSION,
+    }
+
+
+def _int_dtype(lo: int, hi: int) -> str:
+    for dtype in ("int8", "int16", "int32"):
+        info = np.iinfo(dtype)
+        if info.min <= lo and hi <= info.max:
+            return dtype
+    return "int64"
+
+
+def _float32_exact(values: np.ndarray) -> bool:
+    """True if float32 keeps every value and writes it back the same way."""
+    f32 = values.astype(np.float32)
+    if not np.array_equal(f32.astype(np.float64), values):
+        return False
+    return np.array_equal(f32.astype(str).astype(np.float64), values)
+
+
+@dataclass
+class _ColumnStats:
+    declared: str | None = None
+    kinds: set[str] = field(default_factory=set)
+    nulls: int = 0
+    count: int = 0
+    lo: int = 0
+    hi: int = 0
+    float32_ok: bool = True
+    levels: set[str] | None = field(default_factory=set)
+
+    def update(self, s: pd.Series) -> None:
+        values = s.dropna()
+        self.nulls += len(s) - len(values)
+        self.count += len(values)
+        if values.empty or self.declared not in {None, "category"}:
+            return
+        dtype = s.dtype
+        if self.declared is None and pd.api.types.is_bool_dtype(dtype):
+            self.kinds.add("bool")
+        elif self.declared is None and pd.api.types.is_integer_dtype(dtype):
+            arr = values.to_numpy(dtype=np.int64)
+            lo, hi = int(arr.min()), int(arr.max())
+            self.lo = lo if "int" not in self.kinds else min(self.lo, lo)
+            self.hi = hi if "int" not in self.kinds else max(self.hi, hi)
+            self.kinds.add("int")
+            self.float32_ok &= max(-lo, hi) <= 2**24
+        elif self.declared is None and pd.api.types.is_float_dtype(dtype):
+            self.kinds.add("float")
+            if self.float32_ok:
+                self.float32_ok = _float32_exact(values.to_numpy(dtype=np.float64))
+        else:
+            self.kinds.add("object")
+            if self.levels is not None:
+                self.levels.update(values.astype(str).unique())
+                if len(self.levels) > MAX_CATEGORY_LEVELS:
+                    self.levels = None
+
+    def _kind(self) -> str:
+        kinds = self.kinds
+        if "object" in kinds or ("bool" in kinds and len(kinds) > 1):
+            return "object"
+        if "float" in kinds or ("int" in kinds and self.nulls):
+            return "float"
+        if "int" in kinds:
+            return "int"
+        if "bool" in kinds and not self.nulls:
+            return "bool"
+        return "float" if not kinds else "object"
+
+    def _category(self) -> pd.CategoricalDtype | None:
+        if self.levels is None or len(self.levels) * 2 > max(self.count, 1):
+            return None
+        return pd.CategoricalDtype(sorted(self.levels))
+
+    def read_dtype(self) -> Any:
+        """The dtype to parse the CSV column with on the writing pass."""
+        if self.declared == "object":
+            return "object"
+        if self.declared is not None:
+            return ARROW_STRING
+        return {"int": "int64", "float": "float64", "bool": "bool"}.get(
+            self._kind(), "object"
+        )
+
+    def dtype(self) -> Any:
+        """The dtype the column is stored with."""
+        if self.declared is not None:
+            return {
+                "category": self._category() or ARROW_STRING,
+                "object": "object",
+            }.get(self.declared, ARROW_STRING)
+        kind = self._kind()
+        if kind == "int":
+            return _int_dtype(self.lo, self.hi)
+        return {
+            "float": "float32" if self.float32_ok and self.kinds else "float64",
+            "bool": "bool",
+        }.get(kind) or (self._category() or "object")
+
+
+def infer_schema(
+    csv_path: Path, *, dataset: str | None = None, chunksize: int = INGEST_CHUNKSIZE
+) -> dict[str, _ColumnStats]:
+    declared = SCHEMAS.get(dataset or csv_path.stem, {})
+    stats: dict[str, _ColumnStats] = {}
+    for chunk in pd.read_csv(
+        csv_path,
+        dtype=dict.fromkeys(declared, "string"),
+        chunksize=chunksize,
+        low_memory=False,
+    ):
+        for col in chunk.columns:
+            if col not in stats:
+                stats[col] = _ColumnStats(declared=declared.get(col))
+            stats[col].update(chunk[col])
+    return stats
+
+
+def ingest_csv(
+    csv_path: Path,
+    *,
+    fmt: str = "parquet",
+    out: Path | None = None,
+    dataset: str | None = None,
+    chunksize: int = INGEST_CHUNKSIZE,
+) -> Path:
+    """Convert `csv_path` into a typed Parquet or Feather file, chunk by chunk.
+
+    A first pass settles each column's dtype over the whole file, so every
+    chunk is written with the same schema. The source's size and mtime are
+    stored in the schema metadata and checked by `read_dataset`.
+    """
+    import pyarrow as pa  # noqa: PLC0415
+    import pyarrow.parquet as pq  # noqa: PLC0415
+
+    out = out or cache_path(csv_path, fmt)
+    dataset = dataset or csv_path.stem
+    fingerprint = _fingerprint(csv_path, dataset)
+    stats = infer_schema(csv_path, dataset=dataset, chunksize=chunksize)
+    read_dtypes = {col: s.read_dtype() for col, s in stats.items()}
+    dtypes = {col: s.dtype() for col, s in stats.items()}
+
+    out.parent.mkdir(parents=True, exist_ok=True)
+    tmp = out.with_name(f"{out.name}.{os.getpid()}.tmp")
+    writer: Any = None
+    schema: Any = None
+    try:
+        for chunk in pd.read_csv(
+            csv_path, dtype=read_dtypes, chunksize=chunksize, low_memory=False
+        ):
+            table = pa.Table.from_pandas(
+                chunk.astype(dtypes), schema=schema, preserve_index=False
+            )
+            if schema is None:
+                metadata = {
+                    **(table.schema.metadata or {}),
+                    SOURCE_KEY: json.dumps(fingerprint).encode(),
+                }
+                schema = table.schema.with_metadata(metadata)
+                if fmt == "parquet":
+                    writer = pq.ParquetWriter(tmp, schema)
+                else:
+                    writer = pa.ipc.new_file(str(tmp), schema)
+            writer.write_table(table.replace_schema_metadata(schema.metadata))
+        if writer is None:
+            raise ValueError(f"No rows to ingest in {csv_path}")
+        writer.close()
+        writer = None
+        os.replace(tmp, out)
+    finally:
+        if writer is not None:
+            writer.close()
+        tmp.unlink(missing_ok=True)
+    return out
+
+
+def _cached_fingerprint(path: Path, fmt: str) -> dict[str, Any] | None:
+    import pyarrow as pa  # noqa: PLC0415
+    import pyarrow.parquet as pq  # noqa: PLC0415
+
+    if fmt == "parquet":
+        metadata = pq.read_schema(path).metadata
+    else:
+        with pa.memory_map(str(path)) as source:
+            metadata = pa.ipc.open_file(source).schema.metadata
+    raw = (metadata or {}).get(SOURCE_KEY)
+    return json.loads(raw) if raw is not None else None
+
+
+def ensure_cached(csv_path: Path, fmt: str, dataset: str | None = None) -> Path:
+    """The cache file for `csv_path`, (re)built if missing or stale."""
+    path = cache_path(csv_path, fmt)
+    fingerprint = _fingerprint(csv_path, dataset or csv_path.stem)
+    if path.exists() and _cached_fingerprint(path, fmt) == fingerprint:
+        return path
+    return ingest_csv(csv_path, fmt=fmt, out=path, dataset=dataset)
+
+
+def _arrow_types(arrow_type: Any) -> Any:
+    import pyarrow as pa  # noqa: PLC0415
+
+    return ARROW_STRING if arrow_type == pa.large_string() else None
+
+
+def _read_table(path: Path, fmt: str, columns: Sequence[str] | None) -> Any:
+    import pyarrow.parquet as pq  # noqa: PLC0415
+    from pyarrow import feather  # noqa: PLC0415
+
+    cols = list(columns) if columns is not None else None
+    if fmt == "parquet":
+        return pq.read_table(path, columns=cols)
+    return feather.read_table(path, columns=cols, memory_map=True)
+
+
+def write_frame(df: pd.DataFrame, path: Path, fmt: str = "parquet") -> Path:
+    """Write `df` as a Parquet or (uncompressed) Feather file."""
+    import pyarrow as pa  # noqa: PLC0415
+    import pyarrow.parquet as pq  # noqa: PLC0415
+
+    table = pa.Table.from_pandas(df)
+    if fmt == "parquet":
+        pq.write_table(table, path)
+    else:
+        with pa.ipc.new_file(str(path), table.schema) as writer:
+            writer.write_table(table)
+    return path
+
+
+def read_frame(path: Path, fmt: str = "parquet") -> pd.DataFrame:
+    """A frame saved by `write_frame`, with list columns as Python lists."""
+    import pyarrow as pa  # noqa: PLC0415
+
+    table = _read_table(path, fmt, None)
+    df = table.to_pandas(types_mapper=_arrow_types)
+    for column in table.schema:
+        if pa.types.is_list(column.type) or pa.types.is_large_list(column.type):
+            df[column.name] = table.column(column.name).to_pylist()
+    return df
+
+
+def _check_csv_kwargs(csv_kwargs: dict[str, Any]) -> None:
+    unsupported = sorted(csv_kwargs.keys() - {"dtype"})
+    if unsupported:
+        raise TypeError(
+            f"read_csv arguments {unsupported} cannot be applied to the columnar "
+            "cache; set DATA_CACHE_FORMAT=none to use them"
+        )
+
+
+def _apply_dtype(df: pd.DataFrame, dtype: Any) -> pd.DataFrame:
+    """Cast cached columns to the `dtype` given for `read_csv`.
+
+    Columns that already have the requested kind are kept as stored: any
+    string dtype satisfies "string" and any categorical satisfies "category".
+    Other strings are cast to Arrow-backed strings, as the cache stores them.
+    """
+    if dtype is None:
+        return df
+    if not isinstance(dtype, dict):
+        dtype = dict.fromkeys(df.columns, dtype)
+    casts: dict[str, Any] = {}
+    for col, requested in dtype.items():
+        if col not in df.columns:
+            continue
+        want = pd.api.types.pandas_dtype(requested)
+        have = df[col].dtype
+        if isinstance(want, pd.StringDtype):
+            if isinstance(have, pd.StringDtype):
+                continue
+            want = ARROW_STRING
+        elif (
+            isinstance(want, pd.CategoricalDtype)
+            and want.categories is None
+            and isinstance(have, pd.CategoricalDtype)
+        ):
+            continue
+        if have != want:
+            casts[col] = want
+    return df.astype(casts) if casts else df
+
+
+def read_dataset(
+    csv_path: Path,
+    columns: Sequence[str] | None = None,
+    *,
+    dataset: str | None = None,
+    **csv_kwargs: Any,
+) -> pd.DataFrame:
+    """Read a CSV dataset through its typed columnar cache.
+
+    Only `columns` are read. `dataset` picks the `SCHEMAS` entry when the
+    file is not named after it, e.g. for a sessions partition. Of the
+    `read_csv` arguments only `dtype` applies to the cache (see
+    `_apply_dtype`); others raise `TypeError`. With `DATA_CACHE_FORMAT=none`
+    this falls back to `pd.read_csv(csv_path, usecols=columns, **csv_kwargs)`.
+    """
+    fmt = cache_format()
+    if fmt is None:
+        return pd.read_csv(csv_path, usecols=columns, **csv_kwargs)
+    _check_csv_kwargs(csv_kwargs)
+    table = _read_table(ensure_cached(csv_path, fmt, dataset), fmt, columns)
+    df = table.to_pandas(
+        types_mapper=_arrow_types, self_destruct=True, split_blocks=True
+    )
+    return _apply_dtype(df, csv_kwargs.get("dtype"))
+
+
+def iter_dataset(
+    csv_path: Path,
+    chunksize: int,
+    columns: Sequence[str] | None = None,
+    *,
+    dataset: str | None = None,
+    **csv_kwargs: Any,
+) -> Iterator[pd.DataFrame]:
+    """`read_dataset` in chunks of at most `chunksize` rows."""
+    fmt = cache_format()
+    if fmt is None:
+        yield from pd.read_csv(
+            csv_path, usecols=columns, chunksize=chunksize, **csv_kwargs
+        )
+        return
+    _check_csv_kwargs(csv_kwargs)
+    path = ensure_cached(csv_path, fmt, dataset)
+    if fmt == "parquet":
+        import pyarrow.parquet as pq  # noqa: PLC0415
+
+        batches = pq.ParquetFile(path).iter_batches(
+            batch_size=chunksize, columns=list(columns) if columns else None
+        )
+    else:
+        batches = _read_table(path, fmt, columns).to_batches(max_chunksize=chunksize)
+    for batch in batches:
+        yield _apply_dtype(
+            batch.to_pandas(types_mapper=_arrow_types), csv_kwargs.get("dtype")
+        )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description="Ingest CSV datasets into the typed columnar cache."
+    )
+    parser.add_argument("csv", type=Path, nargs="+")
+    parser.add_argument("--format", choices=sorted(FORMATS), default="parquet")
+    parser.add_argument("--chunksize", type=int, default=INGEST_CHUNKSIZE)
+    args = parser.parse_args()
+
+    for csv_path in args.csv:
+        t0 = time.perf_counter()
+        out = ingest_csv(csv_path, fmt=args.format, chunksize=args.chunksize)
+        print(
+            f"{csv_path} ({csv_path.stat().st_size / 1e6:.1f} MB) -> {out} "
+            f"({out.stat().st_size / 1e6:.1f} MB) in {time.perf_counter() - t0:.1f}s"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -46,10 +46,10 @@ review_features = [
 
 
 def parse_amenities_cell(x: object) -> list[str]:
-    if pd.isna(x):
-        return []
     if isinstance(x, list):
         return [str(a).strip() for a in x]
+    if pd.isna(x):
+        return []
     s = str(x).strip()
     if not s:
         return []
@@ -0,0 +1,250 @@
+import hashlib
+import json
+import os
+import shutil
+from collections import Counter
+from collections.abc import Callable
+from functools import cache, partial
+from pathlib import Path
+from typing import Any
+
+import pandas as pd
+
+from src.data_processing.bookings import (
+    encode_spool,
+    load_listing_features,
+    load_user_features,
+    spool_bookings,
+    topk_from_counts,
+)
+from src.data_processing.columnar import (
+    CACHE_DIRNAME,
+    FORMATS,
+    cache_format,
+    read_frame,
+    write_frame,
+)
+
+# Bump a stage's version whenever its code changes what it produces. Keys of
+# downstream stages include upstream keys, so those are rebuilt as well.
+STAGE_VERSIONS = {
+    "listing_features": 2,
+    "user_features": 1,
+    "bookings": 2,
+    "encoded": 2,
+}
+DIGESTS_FILE = "digests.json"
+
+
+def stage_key(stage: str, **inputs: Any) -> str:
+    """Content address of a stage output: its version plus all its inputs."""
+    payload = {"stage": stage, "version": STAGE_VERSIONS[stage], **inputs}
+    blob = json.dumps(payload, sort_keys=True).encode()
+    return hashlib.sha256(blob).hexdigest()[:32]
+
+
+def session_partitions(data_dir: Path) -> list[Path]:
+    """`data_dir/sessions/*.csv` in name order, or else `data_dir/sessions.csv`."""
+    parts_dir = data_dir / "sessions"
+    if parts_dir.is_dir():
+        return sorted(parts_dir.glob("*.csv"))
+    return [data_dir / "sessions.csv"]
+
+
+def _write_text(text: str, path: Path) -> None:
+    path.write_text(text)
+
+
+def _replace_with(path: Path, write: Callable[[Path], Any]) -> None:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+    try:
+        write(tmp)
+        os.replace(tmp, path)
+    finally:
+        tmp.unlink(missing_ok=True)
+
+
+class StageCache:
+    """Outputs of the `prepare_data` stages, stored under their `stage_key`.
+
+    Input files are identified by the SHA-256 of their bytes, memoized per
+    path, size and mtime so unchanged files are not re-read. Frames are
+    stored as `fmt` (Parquet or Feather) files. `save` drops the outputs the
+    current run did not use.
+    """
+
+    def __init__(self, root: Path, fmt: str = "parquet"):
+        self.root = root
+        self.fmt = fmt
+        digests = root / DIGESTS_FILE
+        self._digests: dict[str, dict[str, Any]] = (
+            json.loads(digests.read_text()) if digests.exists() else {}
+        )
+        self._seen: dict[str, dict[str, Any]] = {}
+        self._used: set[Path] = set()
+        self.built: Counter[str] = Counter()
+        self.reused: Counter[str] = Counter()
+
+    def digest(self, path: Path) -> str:
+        st = path.stat()
+        name = str(path.resolve())
+        entry = self._digests.get(name)
+        if not (
+            entry
+            and entry["size"] == st.st_size
+            and entry["mtime_ns"] == st.st_mtime_ns
+        ):
+            with path.open("rb") as f:
+                sha = hashlib.file_digest(f, "sha256").hexdigest()
+            entry = {"size": st.st_size, "mtime_ns": st.st_mtime_ns, "sha256": sha}
+        self._seen[name] = entry
+        return entry["sha256"]
+
+    def path(self, stage: str, key: str, suffix: str) -> Path:
+        path = self.root / stage / f"{key}{suffix}"
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self._used.add(path)
+        return path
+
+    def hit(self, stage: str, path: Path) -> bool:
+        found = path.exists()
+        (self.reused if found else self.built)[stage] += 1
+        return found
+
+    def frame_path(self, stage: str, key: str) -> Path:
+        return self.path(stage, key, FORMATS[self.fmt])
+
+    def frame(
+        self, stage: str, key: str, build: Callable[[], pd.DataFrame]
+    ) -> pd.DataFrame:
+        path = self.frame_path(stage, key)
+        if self.hit(stage, path):
+            return read_frame(path, self.fmt)
+        df = build()
+        _replace_with(path, partial(write_frame, df, fmt=self.fmt))
+        return df
+
+    def save(self) -> None:
+        for stage in STAGE_VERSIONS:
+            stage_dir = self.root / stage
+            if stage_dir.is_dir():
+                for path in stage_dir.iterdir():
+                    if path not in self._used:
+                        path.unlink()
+        body = json.dumps(self._seen, indent=1)
+        _replace_with(self.root / DIGESTS_FILE, partial(_write_text, body))
+
+    def summary(self) -> str:
+        totals = self.built + self.reused
+        return ", ".join(
+            f"{stage} {self.built[stage]}/{totals[stage]}"
+            for stage in STAGE_VERSIONS
+            if totals[stage]
+        )
+
+
+def _concat_csv(parts: list[Path], out_path: Path) -> None:
+    """Concatenate CSV files with identical headers, keeping the first header."""
+
+    def write(tmp: Path) -> None:
+        if not parts:
+            pd.DataFrame().to_csv(tmp, index=False)
+            return
+        with tmp.open("wb") as out:
+            header = None
+            for part in parts:
+                with part.open("rb") as f:
+                    line = f.readline()
+                    if header is None:
+                        header = line
+                        out.write(line)
+                    elif line != header:
+                        raise ValueError(f"Columns of {part} differ from {parts[0]}")
+                    shutil.copyfileobj(f, out)
+
+    _replace_with(out_path, write)
+
+
+def prepare_bookings_incremental(
+    data_dir: Path,
+    out_path: Path,
+    *,
+    amen_topk: int = 100,
+    chunksize: int = 500_000,
+    cache_dir: Path | None = None,
+) -> tuple[int, StageCache]:
+    """`prepare_bookings_streaming` that only recomputes changed stages.
+
+    Stages and what their keys cover:
+
+    - `listing_features`, `user_features`: the raw CSV's content;
+    - `bookings`: one sessions partition's content and both feature keys,
+      stored as the spool of `spool_bookings` plus its amenity counts;
+    - `encoded`: a `bookings` key and the top-k amenity list.
+
+    A new partition only needs its own `bookings` stage. The others are
+    re-encoded only if it shifts the global top-k. The output is the
+    encoded partitions concatenated in partition order.
+    """
+    stage_cache = StageCache(
+        cache_dir or data_dir / CACHE_DIRNAME / "stages", cache_format() or "parquet"
+    )
+    listings_path = data_dir / "listings.csv"
+    users_path = data_dir / "users.csv"
+
+    listing_key = stage_key(
+        "listing_features", source=stage_cache.digest(listings_path)
+    )
+    user_key = stage_key("user_features", source=stage_cache.digest(users_path))
+    # Kept even when this run needs neither, so `save` does not prune them.
+    stage_cache.frame_path("listing_features", listing_key)
+    stage_cache.frame_path("user_features", user_key)
+
+    @cache
+    def listing_feats() -> pd.DataFrame:
+        load = partial(load_listing_features, listings_path)
+        return stage_cache.frame("listing_features", listing_key, load)
+
+    @cache
+    def user_feats() -> pd.DataFrame:
+        load = partial(load_user_features, users_path)
+        return stage_cache.frame("user_features", user_key, load)
+
+    counts: Counter[str] = Counter()
+    spools: list[tuple[str, Path, list[int]]] = []
+    for partition in session_partitions(data_dir):
+        key = stage_key(
+            "bookings",
+            source=stage_cache.digest(partition),
+            listing_features=listing_key,
+            user_features=user_key,
+        )
+        spool = stage_cache.path("bookings", key, ".csv")
+        meta = stage_cache.path("bookings", key, ".json")
+        # `meta` is written last, so it only exists next to a complete spool.
+        if not stage_cache.hit("bookings", meta):
+            part_counts, sizes = spool_bookings(
+                partition, listing_feats(), user_feats(), spool, chunksize=chunksize
+            )
+            body = json.dumps({"counts": part_counts, "sizes": sizes})
+            _replace_with(meta, partial(_write_text, body))
+        info = json.loads(meta.read_text())
+        counts.update(info["counts"])
+        spools.append((key, spool, info["sizes"]))
+
+    top = topk_from_counts(counts, amen_topk)
+    parts: list[Path] = []
+    for key, spool, sizes in spools:
+        if not sizes:
+            continue
+        encoded_key = stage_key("encoded", bookings=key, top=top)
+        encoded = stage_cache.path("encoded", encoded_key, ".csv")
+        if not stage_cache.hit("encoded", encoded):
+            write = partial(encode_spool, spool, sizes, top, listing_feats())
+            _replace_with(encoded, write)
+        parts.append(encoded)
+
+    _concat_csv(parts, out_path)
+    stage_cache.save()
+    return sum(sum(sizes) for _, _, sizes in spools), stage_cache
@@ -10,6 +10,8 @@ from sklearn.cluster import KMeans
 from sklearn.decomposition import PCA
 from sklearn.metrics import silhouette_score
 
+from src.data_processing.columnar import read_dataset
+
 HTML_RE = re.compile(r"<[^>]+>")
 WS_RE = re.compile(r"\s+")
 
@@ -176,7 +178,7 @@ def main() -> None:
     ap.add_argument("--min-samples", type=int, default=0, help="0 -> None")
     args = ap.parse_args()
 
-    listings = pd.read_csv(args.listings, dtype={"id": "string"})
+    listings = read_dataset(args.listings, dtype={"id": "string"})
     listings = listings.rename(columns={"id": "listing_id"})
     listings = (
         listings.dropna(subset=["listing_id"])
@@ -0,0 +1,41 @@
+from collections.abc import Iterable
+from typing import Any
+
+from src.utils.text import slugify_amenity
+
+AMEN_PREFIX = "amen_"
+
+
+class AmenityExpander:
+    """Expand a list of present amenities into the trained `amen_*` columns.
+
+    Amenities may be given as raw names ("Hot water"), slugs ("hot_water")
+    or column names ("amen_hot_water"). Amenities outside the trained top-k
+    are ignored, but still count towards `amenities_count` when the client
+    does not send it; spellings of the same amenity are counted once.
+    """
+
+    def __init__(self, columns: Iterable[str]):
+        self.columns = sorted(c for c in columns if c.startswith(AMEN_PREFIX))
+        self._zeros = dict.fromkeys(self.columns, 0)
+        self._known = set(self.columns)
+
+    @staticmethod
+    def slug(amenity: str) -> str:
+        return slugify_amenity(amenity.removeprefix(AMEN_PREFIX))
+
+    def column_for(self, amenity: str) -> str | None:
+        name = amenity if amenity.startswith(AMEN_PREFIX) else AMEN_PREFIX + amenity
+        if name in self._known:
+            return name
+        name = AMEN_PREFIX + self.slug(amenity)
+        return name if name in self._known else None
+
+    def expand(self, features: dict[str, Any], amenities: list[str]) -> dict[str, Any]:
+        out = {**self._zeros, **features}
+        for a in amenities:
+            col = self.column_for(a)
+            if col is not None:
+                out[col] = 1
+        out.setdefault("amenities_count", len({self.slug(a) for a in amenities}))
+        return out
@@ -1,29 +1,213 @@
-import json
+from __future__ import annotations
+
+import asyncio
+import atexit
 import random
 import uuid
+from collections.abc import AsyncIterator, Awaitable, Callable
+from contextlib import asynccontextmanager
+from contextvars import ContextVar
 from datetime import UTC, datetime
-from typing import Any
+from functools import partial
+from pathlib import Path
+from typing import TYPE_CHECKING, Any
+
+import numpy as np
+from fastapi import FastAPI, HTTPException, Request, Response
+from fastapi.responses import JSONResponse
+from pydantic import BaseModel, Field
+
+from src.microservice.batching import MicroBatcher
+from src.microservice.config import (
+    EventLogConfig,
+    FeatureStoreConfig,
+    MetricsConfig,
+    MicroBatchConfig,
+    PredictionCacheConfig,
+    RegistryConfig,
+    ScoringConfig,
+    ServingConfig,
+)
+from src.microservice.event_log import (
+    EventLogger,
+    EventSink,
+    JsonlSink,
+    RotatingJsonlSink,
+)
+from src.microservice.metrics import (
+    BATCH_SIZE_BUCKETS,
+    LATENCY_MS_BUCKETS,
+    STAGE_MS_BUCKETS,
+    CounterFamily,
+    HistogramFamily,
+    StageTimer,
+    render_sample,
+)
+from src.microservice.prediction_cache import PredictionCache, feature_key
+from src.microservice.registry import LoadOptions, ModelRegistry, ModelSet
+from src.microservice.scoring import ScoringExecutor, compile_model
+from src.microservice.startup import PROFILE
+from src.utils.constants import (
+    AB_EVENTS_DIR,
+    AB_LOG_DIR,
+    AB_LOG_PATH,
+    FEATURE_STORE_DIR,
+    MODEL_REGISTRY_DIR,
+    MODEL_SHARED_DIR,
+)
+
+# Everything below is imported on first use: sklearn, xgboost and pandas are
+# only needed once the models load, which happens off the import path.
+if TYPE_CHECKING:
+    from src.microservice.feature_store import ListingFeatureStore
+
+serving_config = ServingConfig.from_env()
+microbatch_config = MicroBatchConfig.from_env()
+feature_store_config = FeatureStoreConfig.from_env()
+prediction_cache_config = PredictionCacheConfig.from_env()
+registry_config = RegistryConfig.from_env()
+scoring_config = ScoringConfig.from_env()
+metrics_config = MetricsConfig.from_env()
+
+
+def make_feature_store(config: FeatureStoreConfig) -> ListingFeatureStore | None:
+    if not config.enabled:
+        return None
+    from src.microservice.feature_store import ListingFeatureStore  # noqa: PLC0415
+
+    return ListingFeatureStore(
+        Path(config.path or FEATURE_STORE_DIR), cache_size=config.cache_size
+    )
+
+
+feature_store = make_feature_store(feature_store_config)
+
+
+load_options = LoadOptions(
+    compile_fn=(
+        partial(compile_model, xgb_backend=serving_config.xgb_backend)
+        if serving_config.fast_path
+        else None
+    ),
+    mmap_mode=registry_config.mmap_mode,
+    shared_dir=(
+        Path(registry_config.shared_dir or MODEL_SHARED_DIR)
+        if registry_config.shared
+        else None
+    ),
+)
+# Scoring runs here, never on the event loop, so cheap endpoints such as
+# /health and /feedback do not wait behind it.
+scoring = ScoringExecutor(
+    scoring_config.executor, scoring_config.workers, options=load_options
+)
+# Models are loaded where `scoring` runs them: in process mode, only there.
+registry = ModelRegistry(
+    Path(registry_config.path or MODEL_REGISTRY_DIR),
+    poll_s=registry_config.poll_s,
+    loader=scoring.load_models,
+    profile=PROFILE,
+)
+event_log_config = EventLogConfig.from_env()
+
+
+def make_event_sink(config: EventLogConfig) -> EventSink:
+    if config.sink == "jsonl":
+        return JsonlSink(AB_LOG_PATH)
+    if config.sink == "rotating":
+        return RotatingJsonlSink(
+            AB_LOG_DIR,
+            max_bytes=int(config.rotate_max_mb * 1024 * 1024),
+            max_age_s=config.rotate_max_age_s,
+            compress=config.compress,
+        )
+    if config.sink == "parquet":
+        from src.microservice.parquet_sink import ParquetSink  # noqa: PLC0415
+
+        return ParquetSink(
+            AB_EVENTS_DIR,
+            max_rows=config.parquet_max_rows,
+            max_age_s=config.parquet_max_age_s,
+        )
+    raise ValueError(f"Unknown event log sink: {config.sink!r}")
+
+
+event_logger = EventLogger(make_event_sink(event_log_config), event_log_config)
+atexit.register(event_logger.close)
 
-import joblib
-import pandas as pd
-from fastapi import FastAPI
-from pydantic import BaseModel
-from sklearn.pipeline import Pipeline
+# Served by /metrics. Durations are observed in ms and exported in seconds.
+stage_latency = HistogramFamily(
+    "ab_predict_stage_seconds",
+    "Time spent in each stage of a prediction.",
+    STAGE_MS_BUCKETS,
+    ("stage", "variant", "model"),
+    scale=1e-3,
+)
+request_latency = HistogramFamily(
+    "ab_http_request_duration_seconds",
+    "HTTP request latency by endpoint.",
+    LATENCY_MS_BUCKETS,
+    ("endpoint",),
+    scale=1e-3,
+)
+request_count = CounterFamily(
+    "ab_http_requests_total",
+    "HTTP requests by endpoint, method and status.",
+    ("endpoint", "method", "status"),
+)
+prediction_count = CounterFamily(
+    "ab_predictions_total",
+    "Predictions served by variant and model.",
+    ("variant", "model", "cached"),
+)
+batch_items = HistogramFamily(
+    "ab_predict_batch_items", "Items per /predict/batch request.", BATCH_SIZE_BUCKETS
+)
+scoring_rows = HistogramFamily(
+    "ab_scoring_rows",
+    "Rows per scoring call, after micro-batching.",
+    BATCH_SIZE_BUCKETS,
+    ("variant", "model"),
+)
+# Request-level stages of /predict; scoring stages are observed per call.
+REQUEST_STAGES = ("parse", "features", "cache", "score", "log")
 
-from src.utils.constants import AB_LOG_PATH, MODEL_A_PATH, MODEL_B_PATH
+_request_timer: ContextVar[StageTimer | None] = ContextVar(
+    "request_timer", default=None
+)
 
-AB_LOG_PATH.parent.mkdir(parents=True, exist_ok=True)
 
-model_a: Pipeline = joblib.load(MODEL_A_PATH)
-model_b: Pipeline = joblib.load(MODEL_B_PATH)
+def request_timer() -> StageTimer:
+    """The stage timer of the current request, started by the middleware."""
+    timer = _request_timer.get()
+    if timer is None:
+        timer = StageTimer()
+        _request_timer.set(timer)
+    return timer
 
-app = FastAPI()
+
+def observe_scoring(
+    models: ModelSet,
+    variant: str,
+    stages: dict[str, float],
+    rows: int,
+    timer: StageTimer | None = None,
+) -> None:
+    model_name = models.names[variant]
+    scoring_rows.observe(rows, variant, model_name)
+    for stage, ms in stages.items():
+        stage_latency.observe(ms, stage, variant, model_name)
+        if timer is not None:
+            timer.add(stage, ms)
 
 
 class PredictIn(BaseModel):
     user_id: str | None = None
     listing_id: str | None = None
-    features: dict[str, Any]
+    # With the feature store enabled, listing features may be left out.
+    features: dict[str, Any] = Field(default_factory=dict)
+    # Present amenities (names or slugs); replaces sending every amen_* key.
+    amenities: list[str] | None = None
 
 
 class ExplanationItem(BaseModel):
@@ -39,6 +223,14 @@ class PredictOut(BaseModel):
     pred_label: int
 
 
+class PredictBatchIn(BaseModel):
+    items: list[PredictIn]
+
+
+class PredictBatchOut(BaseModel):
+    items: list[PredictOut]
+
+
 class FeedbackIn(BaseModel):
     request_id: str
     true_long_stay: int
@@ -48,39 +240,260 @@ def choose_variant() -> str:
     return "A" if random.uniform(0, 1) < 0.5 else "B"
 
 
-def log_event(obj: dict[str, Any]) -> None:
+async def log_event(obj: dict[str, Any]) -> None:
     obj["ts"] = datetime.now(UTC).isoformat()
-    with AB_LOG_PATH.open("a", encoding="utf-8") as f:
-        f.write(json.dumps(obj, ensure_ascii=False) + "\n")
+    await event_logger.log_async(obj)
+
+
+def request_features(inp: PredictIn, models: ModelSet) -> dict[str, Any]:
+    features = inp.features
+    if inp.amenities is not None:
+        features = models.amenities.expand(features, inp.amenities)
+    if feature_store is not None and inp.listing_id is not None:
+        listing = feature_store.get(inp.listing_id)
+        if listing is not None:
+            features = {**listing, **features}
+    return features
+
+
+def wait_for_models() -> ModelSet:
+    """The served models, waiting for the initial load during startup."""
+    ready = registry.wait_ready(registry_config.ready_timeout_s)
+    models = registry.current if ready else None
+    if models is None:
+        raise HTTPException(status_code=503, detail="Models are still loading")
+    return models
+
+
+async def current_models() -> ModelSet:
+    models = registry.current if registry.ready else None
+    if models is None:
+        models = await asyncio.to_thread(wait_for_models)
+    return models
+
+
+def predict_variant(
+    models: ModelSet, variant: str, rows: list[dict[str, Any]]
+) -> np.ndarray:
+    scores, stages = scoring.predict(models, variant, rows)
+    observe_scoring(models, variant, stages, len(rows))
+    return scores
+
+
+prediction_cache: PredictionCache | None = (
+    PredictionCache(
+        max_entries=prediction_cache_config.max_entries,
+        ttl_s=prediction_cache_config.ttl_s,
+    )
+    if prediction_cache_config.enabled
+    else None
+)
+
+
+async def predict_cached(
+    models: ModelSet, variant: str, rows: list[dict[str, Any]]
+) -> tuple[np.ndarray, np.ndarray]:
+    """Score rows, serving repeats from the cache; returns (probas, cached)."""
+    cached = np.zeros(len(rows), dtype=bool)
+    if prediction_cache is None:
+        scores, stages = await scoring.predict_async(models, variant, rows)
+        observe_scoring(models, variant, stages, len(rows), request_timer())
+        return scores, cached
+    keys = [feature_key(models.versions[variant], row) for row in rows]
+    probas = np.empty(len(rows), dtype=np.float64)
+    misses: list[int] = []
+    for i, key in enumerate(keys):
+        value = prediction_cache.get(key)
+        if value is None:
+            misses.append(i)
+        else:
+            probas[i] = value
+            cached[i] = True
+    if misses:
+        scores, stages = await scoring.predict_async(
+            models, variant, [rows[i] for i in misses]
+        )
+        observe_scoring(models, variant, stages, len(misses), request_timer())
+        probas[misses] = scores
+        for i in misses:
+            prediction_cache.put(keys[i], float(probas[i]))
+    return probas, cached
+
+
+batcher: MicroBatcher | None = (
+    MicroBatcher(
+        predict_variant,
+        max_batch_size=microbatch_config.max_batch_size,
+        max_wait_ms=microbatch_config.max_wait_ms,
+    )
+    if microbatch_config.enabled
+    else None
+)
+
+
+@asynccontextmanager
+async def lifespan(_: FastAPI) -> AsyncIterator[None]:
+    event_logger.start()
+    scoring.start()
+    registry.start()
+    if batcher is not None:
+        batcher.start()
+    try:
+        yield
+    finally:
+        if batcher is not None:
+            batcher.stop()
+        # The registry first, so a reload cannot start workers after `stop`.
+        registry.stop()
+        scoring.stop()
+        event_logger.close()
+
+
+app = FastAPI(lifespan=lifespan)
+PROFILE.mark("app_imported")
+
+
+@app.middleware("http")
+async def observe_request(
+    request: Request, call_next: Callable[[Request], Awaitable[Response]]
+) -> Response:
+    timer = StageTimer()
+    token = _request_timer.set(timer)
+    status = 500
+    try:
+        response = await call_next(request)
+        status = response.status_code
+    finally:
+        _request_timer.reset(token)
+        route = request.scope.get("route")
+        endpoint = getattr(route, "path", "unmatched")
+        total_ms = timer.elapsed_ms()
+        request_latency.observe(total_ms, endpoint)
+        request_count.inc(endpoint, request.method, str(status))
+    if metrics_config.server_timing:
+        timer.add("total", total_ms)
+        response.headers["Server-Timing"] = timer.server_timing()
+    return response
 
 
 @app.get("/health")
-def health() -> dict[str, str]:
+async def health() -> dict[str, str]:
     return {"status": "ok"}
 
 
-@app.post("/predict", response_model=PredictOut)
-def predict(inp: PredictIn):
-    variant = choose_variant()
-    model = model_a if variant == "A" else model_b
-    model_name = "baseline" if variant == "A" else "target"
+@app.get("/ready")
+async def ready() -> JSONResponse:
+    """200 once both models are loaded and have served a warm-up prediction."""
+    models = registry.current if registry.ready else None
+    if models is None:
+        return JSONResponse({"status": "loading"}, status_code=503)
+    return JSONResponse({"status": "ready", "versions": models.versions})
+
+
+@app.get("/stats/startup")
+async def startup_stats() -> dict[str, Any]:
+    return PROFILE.report()
+
+
+@app.get("/stats/batching")
+async def batching_stats() -> dict[str, Any]:
+    if batcher is None:
+        return {"enabled": False}
+    return batcher.stats()
+
+
+@app.get("/stats/features")
+async def feature_store_stats() -> dict[str, Any]:
+    if feature_store is None:
+        return {"enabled": False}
+    return feature_store.stats()
+
 
-    X = pd.DataFrame([inp.features])
+@app.get("/stats/cache")
+async def cache_stats() -> dict[str, Any]:
+    if prediction_cache is None:
+        return {"enabled": False}
+    return prediction_cache.stats()
 
-    proba = float(model.predict_proba(X)[:, 1][0])
+
+@app.get("/stats/models")
+async def model_stats() -> dict[str, Any]:
+    return registry.stats()
+
+
+@app.get("/stats/scoring")
+async def scoring_stats() -> dict[str, Any]:
+    return scoring.stats()
+
+
+@app.get("/metrics")
+async def prometheus_metrics() -> Response:
+    """Metrics in the Prometheus text exposition format."""
+    lines: list[str] = []
+    for family in (
+        request_count,
+        request_latency,
+        prediction_count,
+        stage_latency,
+        batch_items,
+        scoring_rows,
+    ):
+        lines += family.render()
+    log = event_logger.stats()
+    depth, capacity = log["queue_depth"], log["queue_capacity"]
+    in_flight = scoring.stats()["in_flight"]
+    samples = [
+        ("ab_event_log_queue_depth", "Events waiting to be written.", depth),
+        ("ab_event_log_queue_capacity", "Size of the event queue.", capacity),
+        ("ab_scoring_in_flight", "Scoring calls queued or running.", in_flight),
+        ("ab_models_ready", "1 once the models are loaded.", float(registry.ready)),
+    ]
+    if batcher is not None:
+        queued = batcher.stats()["queue_depth"]
+        samples.append(("ab_microbatch_queue_depth", "Rows awaiting a batch.", queued))
+    for name, help_text, value in samples:
+        lines += render_sample(name, help_text, "gauge", value)
+    lines += render_sample(
+        "ab_event_log_dropped_total",
+        "Events dropped by the event log.",
+        "counter",
+        log["dropped"],
+    )
+    return Response(
+        "\n".join(lines) + "\n", media_type="text/plain; version=0.0.4"
+    )
+
+
+@app.get("/stats/logging")
+async def logging_stats() -> dict[str, Any]:
+    return event_logger.stats()
+
+
+async def make_prediction(
+    inp: PredictIn,
+    models: ModelSet,
+    variant: str,
+    proba: float,
+    *,
+    cached: bool = False,
+) -> PredictOut:
+    model_name = models.names[variant]
     pred = int(proba >= 0.5)
     rid = str(uuid.uuid4())
+    prediction_count.inc(variant, model_name, str(cached).lower())
 
-    log_event(
+    await log_event(
         {
             "event": "predict",
             "request_id": rid,
             "variant": variant,
             "model": model_name,
+            "model_version": models.versions[variant],
             "user_id": inp.user_id,
             "listing_id": inp.listing_id,
             "prob": proba,
             "pred": pred,
+            "cached": cached,
         }
     )
 
@@ -93,9 +506,70 @@ def predict(inp: PredictIn):
     )
 
 
+@app.post("/predict", response_model=PredictOut)
+async def predict(inp: PredictIn):
+    timer = request_timer()
+    timer.lap("parse")
+    models = await current_models()
+    variant = choose_variant()
+    features = request_features(inp, models)
+    timer.lap("features")
+    key = None
+    proba = None
+    if prediction_cache is not None:
+        key = feature_key(models.versions[variant], features)
+        proba = prediction_cache.get(key)
+        timer.lap("cache")
+    cached = proba is not None
+    if proba is None:
+        if batcher is not None:
+            proba = await batcher.submit_async(models, variant, features)
+        else:
+            scores, stages = await scoring.predict_async(models, variant, [features])
+            observe_scoring(models, variant, stages, 1, timer)
+            proba = float(scores[0])
+        if key is not None:
+            prediction_cache.put(key, proba)
+        timer.lap("score")
+    out = await make_prediction(inp, models, variant, proba, cached=cached)
+    timer.lap("log")
+    model_name = models.names[variant]
+    for stage in REQUEST_STAGES:
+        if stage in timer.stages:
+            stage_latency.observe(timer.stages[stage], stage, variant, model_name)
+    return out
+
+
+@app.post("/predict/batch", response_model=PredictBatchOut)
+async def predict_batch(inp: PredictBatchIn):
+    timer = request_timer()
+    timer.lap("parse")
+    batch_items.observe(len(inp.items))
+    models = await current_models()
+    variants = [choose_variant() for _ in inp.items]
+    probas = np.empty(len(inp.items), dtype=np.float64)
+    cached = np.zeros(len(inp.items), dtype=bool)
+    for variant in models.artifacts:
+        idx = [i for i, v in enumerate(variants) if v == variant]
+        if idx:
+            rows = [request_features(inp.items[i], models) for i in idx]
+            timer.lap("features")
+            probas[idx], cached[idx] = await predict_cached(models, variant, rows)
+            timer.lap("score")
+
+    items = [
+        await make_prediction(item, models, variant, float(proba), cached=bool(hit))
+        for item, variant, proba, hit in zip(
+            inp.items, variants, probas, cached, strict=True
+        )
+    ]
+    timer.lap("log")
+    return PredictBatchOut(items=items)
+
+
 @app.post("/feedback")
-def feedback(inp: FeedbackIn):
-    log_event(
+async def feedback(inp: FeedbackIn):
+    await log_event(
         {
             "event": "feedback",
             "request_id": inp.request_id,
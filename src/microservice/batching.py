@@ -0,0 +1,173 @@
+import asyncio
+import queue
+import threading
+import time
+from collections import defaultdict
+from collections.abc import Callable
+from concurrent.futures import Future
+from dataclasses import dataclass, field
+from typing import Any
+
+import numpy as np
+
+from src.microservice.metrics import (
+    BATCH_SIZE_BUCKETS,
+    LATENCY_MS_BUCKETS,
+    Histogram,
+)
+from src.microservice.registry import ModelSet
+
+PredictFn = Callable[[ModelSet, str, list[dict[str, Any]]], np.ndarray]
+
+
+@dataclass
+class _Pending:
+    models: ModelSet
+    variant: str
+    features: dict[str, Any]
+    enqueued: float = field(default_factory=time.perf_counter)
+    future: Future = field(default_factory=Future)
+
+
+_STOP = object()
+
+
+class MicroBatcher:
+    """Coalesce concurrent single-row predictions into per-variant batches.
+
+    A batch is flushed when it reaches `max_batch_size` items or when its
+    oldest item has waited `max_wait_ms`, whichever comes first. Each item
+    is scored with the `ModelSet` its request submitted, so items queued
+    across a hot swap are split by snapshot as well as by variant. When a
+    batch fails, its items are retried one by one, so only the items that
+    fail on their own receive the error.
+    """
+
+    def __init__(
+        self,
+        predict_fn: PredictFn,
+        *,
+        max_batch_size: int = 64,
+        max_wait_ms: float = 5.0,
+    ):
+        if max_batch_size <= 0:
+            raise ValueError("max_batch_size must be > 0")
+        if max_wait_ms < 0:
+            raise ValueError("max_wait_ms must be >= 0")
+        self.predict_fn = predict_fn
+        self.max_batch_size = max_batch_size
+        self.max_wait_s = max_wait_ms / 1000.0
+        self.batch_size = Histogram(BATCH_SIZE_BUCKETS)
+        self.queue_delay_ms = Histogram(LATENCY_MS_BUCKETS)
+        self._queue: queue.Queue[Any] = queue.Queue()
+        self._thread: threading.Thread | None = None
+
+    def start(self) -> None:
+        if self._thread is not None:
+            return
+        self._thread = threading.Thread(
+            target=self._run, name="micro-batcher", daemon=True
+        )
+        self._thread.start()
+
+    def stop(self) -> None:
+        if self._thread is None:
+            return
+        self._queue.put(_STOP)
+        self._thread.join()
+        self._thread = None
+
+    def _enqueue(
+        self, models: ModelSet, variant: str, features: dict[str, Any]
+    ) -> Future:
+        if self._thread is None:
+            raise RuntimeError("MicroBatcher is not running")
+        pending = _Pending(models, variant, features)
+        self._queue.put(pending)
+        return pending.future
+
+    def submit(
+        self, models: ModelSet, variant: str, features: dict[str, Any]
+    ) -> float:
+        return self._enqueue(models, variant, features).result()
+
+    async def submit_async(
+        self, models: ModelSet, variant: str, features: dict[str, Any]
+    ) -> float:
+        """`submit` for event-loop callers: awaits the batch without blocking."""
+        return await asyncio.wrap_future(self._enqueue(models, variant, features))
+
+    def stats(self) -> dict[str, Any]:
+        return {
+            "enabled": True,
+            "max_batch_size": self.max_batch_size,
+            "max_wait_ms": self.max_wait_s * 1000.0,
+            "queue_depth": self._queue.qsize(),
+            "batch_size": self.batch_size.snapshot(),
+            "queue_delay_ms": self.queue_delay_ms.snapshot(),
+        }
+
+    def _run(self) -> None:
+        stopping = False
+        while not stopping:
+            first = self._queue.get()
+            if first is _STOP:
+                break
+            batch: list[_Pending] = [first]
+            deadline = first.enqueued + self.max_wait_s
+            while len(batch) < self.max_batch_size:
+                # Past the deadline only already-queued items are taken.
+                timeout = deadline - time.perf_counter()
+                try:
+                    if timeout > 0:
+                        item = self._queue.get(timeout=timeout)
+                    else:
+                        item = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                if item is _STOP:
+                    stopping = True
+                    break
+                batch.append(item)
+            self._flush(batch)
+
+        while True:
+            try:
+                item = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if item is not _STOP:
+                self._flush([item])
+
+    def _flush(self, batch: list[_Pending]) -> None:
+        now = time.perf_counter()
+        self.batch_size.observe(len(batch))
+        for p in batch:
+            self.queue_delay_ms.observe((now - p.enqueued) * 1000.0)
+
+        # ModelSet compares by identity: one group per snapshot and variant.
+        groups: dict[tuple[ModelSet, str], list[_Pending]] = defaultdict(list)
+        for p in batch:
+            groups[p.models, p.variant].append(p)
+
+        for (models, variant), group in groups.items():
+            try:
+                probas = self.predict_fn(models, variant, [p.features for p in group])
+            except Exception as e:
+                if len(group) == 1:
+                    group[0].future.set_exception(e)
+                    continue
+                # One bad row must not fail its neighbours: score each alone.
+                for p in group:
+                    self._score_alone(models, variant, p)
+                continue
+            for p, proba in zip(group, probas, strict=True):
+                p.future.set_result(float(proba))
+
+    def _score_alone(self, models: ModelSet, variant: str, p: _Pending) -> None:
+        try:
+            proba = self.predict_fn(models, variant, [p.features])[0]
+        except Exception as e:
+            p.future.set_exception(e)
+            return
+        p.future.set_result(float(proba))
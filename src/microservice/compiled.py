@@ -0,0 +1,259 @@
+from __future__ import annotations
+
+import argparse
+import json
+import math
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import TYPE_CHECKING, Any
+
+import numpy as np
+
+from src.utils.constants import MODEL_A_PATH, MODEL_B_PATH, ROOT_DIR
+
+# sklearn is only needed to compile a fitted pipeline, not to score with it.
+if TYPE_CHECKING:
+    from sklearn.impute import SimpleImputer
+    from sklearn.pipeline import Pipeline
+
+
+def _is_nan(v: Any) -> bool:
+    return isinstance(v, float) and math.isnan(v)
+
+
+@dataclass(frozen=True)
+class _Slot:
+    """One imputer output column: the imputed value or its missing flag."""
+
+    key: str
+    fill: Any
+    indicator: bool
+    numeric: bool
+
+
+@dataclass(frozen=True)
+class _Block:
+    slot: _Slot
+    offset: int
+    lookup: dict[Any, int] | None
+
+
+def _py(v: Any) -> Any:
+    return v.item() if isinstance(v, np.generic) else v
+
+
+def _imputer_slots(imputer: SimpleImputer, columns: list[str]) -> list[_Slot]:
+    if not _is_nan(imputer.missing_values):
+        raise ValueError("Only missing_values=np.nan is supported")
+    if any(_is_nan(s) for s in imputer.statistics_):
+        raise ValueError("Imputers that drop all-missing columns are not supported")
+    numeric = imputer.strategy in {"mean", "median"}
+    slots = [
+        _Slot(col, _py(fill), indicator=False, numeric=numeric)
+        for col, fill in zip(columns, imputer.statistics_, strict=True)
+    ]
+    if imputer.indicator_ is not None:
+        slots += [
+            _Slot(columns[i], None, indicator=True, numeric=numeric)
+            for i in imputer.indicator_.features_
+        ]
+    return slots
+
+
+def _compile_transformer(
+    transformer: Any, columns: list[str], offset: int
+) -> tuple[list[_Block], int]:
+    from sklearn.impute import SimpleImputer  # noqa: PLC0415
+    from sklearn.preprocessing import OneHotEncoder  # noqa: PLC0415
+
+    steps = list(transformer.named_steps.values())
+    if not steps or not isinstance(steps[0], SimpleImputer):
+        raise ValueError(f"Unsupported transformer: {transformer!r}")
+    slots = _imputer_slots(steps[0], columns)
+    if len(steps) == 1:
+        return [_Block(s, offset + i, None) for i, s in enumerate(slots)], len(slots)
+
+    ohe = steps[1]
+    if len(steps) > 2 or not isinstance(ohe, OneHotEncoder):
+        raise ValueError(f"Unsupported transformer: {transformer!r}")
+    if ohe.drop_idx_ is not None or getattr(ohe, "_infrequent_enabled", False):
+        raise ValueError("OneHotEncoder with drop/infrequent categories is not supported")
+    blocks = []
+    width = 0
+    for slot, cats in zip(slots, ohe.categories_, strict=True):
+        lookup = {c: j for j, c in enumerate(cats.tolist())}
+        blocks.append(_Block(slot, offset + width, lookup))
+        width += len(cats)
+    return blocks, width
+
+
+class CompiledPipeline:
+    """`Pipeline(prep=ColumnTransformer, clf=...)` scored without pandas.
+
+    Imputation values, missing-indicator positions and one-hot lookup tables
+    are taken from the fitted pipeline once; a feature dict is then written
+    straight into a zero-initialised row of the fixed output layout.
+
+    Missing values follow what `/predict` sees through a one-row DataFrame:
+    numeric features treat None/NaN as missing, categorical features treat
+    only NaN as missing (None is an unknown category). Absent keys count as
+    missing instead of raising.
+    """
+
+    def __init__(self, pipe: Pipeline):
+        from sklearn.compose import ColumnTransformer  # noqa: PLC0415
+
+        prep = pipe.named_steps["prep"]
+        if not isinstance(prep, ColumnTransformer) or prep.sparse_output_:
+            raise ValueError("Expected a dense-output ColumnTransformer as 'prep'")
+        self.clf = pipe.named_steps["clf"]
+        self.blocks: list[_Block] = []
+        width = 0
+        for name, transformer, columns in prep.transformers_:
+            if transformer == "drop" or name == "remainder":
+                continue
+            blocks, w = _compile_transformer(transformer, list(columns), width)
+            if prep.output_indices_[name] != slice(width, width + w):
+                raise ValueError(f"Unexpected output layout for {name!r}")
+            self.blocks += blocks
+            width += w
+        self.n_features = width
+        self.input_features = sorted({b.slot.key for b in self.blocks})
+
+    @classmethod
+    def from_spec(cls, spec: dict[str, Any]) -> CompiledPipeline:
+        """Rebuild the preprocessor from `to_spec()` output, without a classifier."""
+        self = cls.__new__(cls)
+        self.clf = None
+        self.blocks = [
+            _Block(
+                _Slot(b["key"], b["fill"], b["indicator"], b["numeric"]),
+                b["offset"],
+                None
+                if b["categories"] is None
+                else {c: j for j, c in enumerate(b["categories"])},
+            )
+            for b in spec["blocks"]
+        ]
+        self.n_features = spec["n_features"]
+        self.input_features = sorted({b.slot.key for b in self.blocks})
+        return self
+
+    def to_spec(self) -> dict[str, Any]:
+        """JSON-serialisable description of the preprocessor."""
+        return {
+            "n_features": self.n_features,
+            "blocks": [
+                {
+                    "key": b.slot.key,
+                    "fill": b.slot.fill,
+                    "indicator": b.slot.indicator,
+                    "numeric": b.slot.numeric,
+                    "offset": b.offset,
+                    "categories": None if b.lookup is None else list(b.lookup),
+                }
+                for b in self.blocks
+            ],
+        }
+
+    def fill_row(self) -> dict[str, Any]:
+        """A row of the imputation fill values, e.g. for warm-up predictions."""
+        return {b.slot.key: b.slot.fill for b in self.blocks if not b.slot.indicator}
+
+    def transform(self, rows: list[dict[str, Any]]) -> np.ndarray:
+        out = np.empty((len(rows), self.n_features), dtype=np.float64)
+        return self.transform_into(rows, out)
+
+    def transform_into(self, rows: list[dict[str, Any]], out: np.ndarray) -> np.ndarray:
+        """Write `rows` into the first `len(rows)` rows of a preallocated `out`."""
+
+        view = out[: len(rows)]
+        view.fill(0.0)
+        for r, features in enumerate(rows):
+            self._fill(view[r], features)
+        return view
+
+    def predict_proba(self, rows: list[dict[str, Any]]) -> np.ndarray:
+        return self.clf.predict_proba(self.transform(rows))[:, 1]
+
+    def _fill(self, row: np.ndarray, features: dict[str, Any]) -> None:
+        for b in self.blocks:
+            slot = b.slot
+            v = features.get(slot.key, math.nan)
+            missing = _is_nan(v) or (v is None and slot.numeric)
+            if slot.indicator:
+                v = missing
+            elif missing:
+                v = slot.fill
+            if b.lookup is None:
+                row[b.offset] = float(v)
+            else:
+                j = b.lookup.get(v)
+                if j is not None:
+                    row[b.offset + j] = 1.0
+
+
+def compile_pipeline(pipe: Pipeline) -> CompiledPipeline:
+    return CompiledPipeline(pipe)
+
+
+def max_abs_diff(
+    pipe: Pipeline, compiled: CompiledPipeline, rows: list[dict[str, Any]]
+) -> float:
+    from src.utils.pandas import rows_frame  # noqa: PLC0415
+
+    expected = pipe.predict_proba(rows_frame(rows))[:, 1]
+    return float(np.max(np.abs(expected - compiled.predict_proba(rows))))
+
+
+def _load_rows(paths: list[Path]) -> list[dict[str, Any]]:
+    return [json.loads(p.read_text(encoding="utf-8"))["features"] for p in paths]
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser()
+    ap.add_argument(
+        "requests",
+        type=Path,
+        nargs="*",
+        default=sorted((ROOT_DIR / "requests").glob("*.json")),
+        help="Request JSON files with a `features` object",
+    )
+    ap.add_argument("--repeat", type=int, default=200)
+    ap.add_argument("--tol", type=float, default=1e-9)
+    args = ap.parse_args()
+
+    import joblib  # noqa: PLC0415
+    import pandas as pd  # noqa: PLC0415
+
+    rows = _load_rows(args.requests)
+    for name, path in (("A", MODEL_A_PATH), ("B", MODEL_B_PATH)):
+        pipe = joblib.load(path)
+        compiled = compile_pipeline(pipe)
+        rows_full = [
+            {k: r.get(k, np.nan) for k in pipe.named_steps["prep"].feature_names_in_}
+            for r in rows
+        ]
+        diff = max_abs_diff(pipe, compiled, rows_full)
+
+        t0 = time.perf_counter()
+        for _ in range(args.repeat):
+            for r in rows_full:
+                pipe.predict_proba(pd.DataFrame([r]))
+        t_pipe = (time.perf_counter() - t0) / (args.repeat * len(rows_full))
+        t0 = time.perf_counter()
+        for _ in range(args.repeat):
+            for r in rows_full:
+                compiled.predict_proba([r])
+        t_fast = (time.perf_counter() - t0) / (args.repeat * len(rows_full))
+
+        status = "OK" if diff <= args.tol else "MISMATCH"
+        print(
+            f"{name}: max|diff|={diff:.3g} [{status}]  "
+            f"pipeline {t_pipe * 1e6:.0f} us/row  compiled {t_fast * 1e6:.0f} us/row"
+        )
+
+
+if __name__ == "__main__":
+    main()
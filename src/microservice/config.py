@@ -0,0 +1,164 @@
+import os
+from dataclasses import dataclass
+from typing import Self
+
+
+def env_bool(name: str, default: bool) -> bool:
+    value = os.environ.get(name)
+    if value is None:
+        return default
+    return value.strip().lower() in {"1", "true", "yes", "on"}
+
+
+def env_int(name: str, default: int) -> int:
+    value = os.environ.get(name)
+    return default if value is None else int(value)
+
+
+def env_float(name: str, default: float) -> float:
+    value = os.environ.get(name)
+    return default if value is None else float(value)
+
+
+@dataclass(frozen=True)
+class MicroBatchConfig:
+    enabled: bool = False
+    max_batch_size: int = 64
+    max_wait_ms: float = 5.0
+
+    @classmethod
+    def from_env(cls) -> Self:
+        return cls(
+            enabled=env_bool("MICROBATCH_ENABLED", cls.enabled),
+            max_batch_size=env_int("MICROBATCH_MAX_SIZE", cls.max_batch_size),
+            max_wait_ms=env_float("MICROBATCH_MAX_WAIT_MS", cls.max_wait_ms),
+        )
+
+
+@dataclass(frozen=True)
+class EventLogConfig:
+    sink: str = "jsonl"
+    max_queue: int = 10_000
+    flush_size: int = 256
+    flush_interval_ms: float = 1000.0
+    policy: str = "block"
+    block_timeout_ms: float = 100.0
+    rotate_max_mb: float = 64.0
+    rotate_max_age_s: float = 3600.0
+    compress: bool = True
+    parquet_max_rows: int = 100_000
+    parquet_max_age_s: float = 300.0
+
+    @classmethod
+    def from_env(cls) -> Self:
+        return cls(
+            sink=os.environ.get("EVENT_LOG_SINK", cls.sink),
+            max_queue=env_int("EVENT_LOG_MAX_QUEUE", cls.max_queue),
+            flush_size=env_int("EVENT_LOG_FLUSH_SIZE", cls.flush_size),
+            flush_interval_ms=env_float(
+                "EVENT_LOG_FLUSH_INTERVAL_MS", cls.flush_interval_ms
+            ),
+            policy=os.environ.get("EVENT_LOG_POLICY", cls.policy),
+            block_timeout_ms=env_float(
+                "EVENT_LOG_BLOCK_TIMEOUT_MS", cls.block_timeout_ms
+            ),
+            rotate_max_mb=env_float("EVENT_LOG_ROTATE_MAX_MB", cls.rotate_max_mb),
+            rotate_max_age_s=env_float(
+                "EVENT_LOG_ROTATE_MAX_AGE_S", cls.rotate_max_age_s
+            ),
+            compress=env_bool("EVENT_LOG_COMPRESS", cls.compress),
+            parquet_max_rows=env_int(
+                "EVENT_LOG_PARQUET_MAX_ROWS", cls.parquet_max_rows
+            ),
+            parquet_max_age_s=env_float(
+                "EVENT_LOG_PARQUET_MAX_AGE_S", cls.parquet_max_age_s
+            ),
+        )
+
+
+@dataclass(frozen=True)
+class ServingConfig:
+    fast_path: bool = False
+    xgb_backend: str = "inplace"
+
+    @classmethod
+    def from_env(cls) -> Self:
+        return cls(
+            fast_path=env_bool("FAST_PATH_ENABLED", cls.fast_path),
+            xgb_backend=os.environ.get("XGB_BACKEND", cls.xgb_backend),
+        )
+
+
+@dataclass(frozen=True)
+class FeatureStoreConfig:
+    enabled: bool = False
+    path: str | None = None
+    cache_size: int = 10_000
+
+    @classmethod
+    def from_env(cls) -> Self:
+        return cls(
+            enabled=env_bool("FEATURE_STORE_ENABLED", cls.enabled),
+            path=os.environ.get("FEATURE_STORE_PATH", cls.path),
+            cache_size=env_int("FEATURE_STORE_CACHE_SIZE", cls.cache_size),
+        )
+
+
+@dataclass(frozen=True)
+class PredictionCacheConfig:
+    enabled: bool = False
+    max_entries: int = 100_000
+    ttl_s: float = 300.0
+
+    @classmethod
+    def from_env(cls) -> Self:
+        return cls(
+            enabled=env_bool("PREDICTION_CACHE_ENABLED", cls.enabled),
+            max_entries=env_int("PREDICTION_CACHE_MAX_ENTRIES", cls.max_entries),
+            ttl_s=env_float("PREDICTION_CACHE_TTL_S", cls.ttl_s),
+        )
+
+
+@dataclass(frozen=True)
+class RegistryConfig:
+    path: str | None = None
+    poll_s: float = 10.0
+    mmap_mode: str | None = None
+    shared: bool = False
+    shared_dir: str | None = None
+    ready_timeout_s: float = 30.0
+
+    @classmethod
+    def from_env(cls) -> Self:
+        return cls(
+            path=os.environ.get("MODEL_REGISTRY_PATH", cls.path),
+            poll_s=env_float("MODEL_REGISTRY_POLL_S", cls.poll_s),
+            mmap_mode=os.environ.get("MODEL_MMAP_MODE", cls.mmap_mode),
+            shared=env_bool("MODEL_SHARED_ENABLED", cls.shared),
+            shared_dir=os.environ.get("MODEL_SHARED_DIR", cls.shared_dir),
+            ready_timeout_s=env_float("MODEL_READY_TIMEOUT_S", cls.ready_timeout_s),
+        )
+
+
+@dataclass(frozen=True)
+class ScoringConfig:
+    executor: str = "thread"
+    workers: int = 4
+
+    @classmethod
+    def from_env(cls) -> Self:
+        return cls(
+            executor=os.environ.get("SCORING_EXECUTOR", cls.executor),
+            workers=env_int("SCORING_WORKERS", cls.workers),
+        )
+
+
+@dataclass(frozen=True)
+class MetricsConfig:
+    server_timing: bool = False
+
+    @classmethod
+    def from_env(cls) -> Self:
+        return cls(
+            server_timing=env_bool("SERVER_TIMING_ENABLED", cls.server_timing),
+        )
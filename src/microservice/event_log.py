@@ -0,0 +1,451 @@
+from __future__ import annotations
+
+import asyncio
+import fcntl
+import gzip
+import json
+import logging
+import os
+import queue
+import shutil
+import threading
+import time
+from collections import Counter
+from collections.abc import Iterator
+from contextlib import contextmanager
+from datetime import UTC, datetime
+from enum import StrEnum
+from pathlib import Path
+from typing import TYPE_CHECKING, Any, Protocol
+
+from src.microservice.config import EventLogConfig
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+MANIFEST_NAME = "manifest.json"
+LOCK_NAME = "manifest.lock"
+
+logger = logging.getLogger(__name__)
+
+
+class EventSink(Protocol):
+    def write(self, events: list[dict[str, Any]]) -> None: ...
+
+    def tick(self) -> None:
+        """Called on every periodic flush, also when there were no new events."""
+        ...
+
+    def close(self) -> None: ...
+
+
+class JsonlSink:
+    """Append events to a single JSONL file kept open by the writer thread."""
+
+    def __init__(self, path: Path):
+        self.path = path
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._f = self.path.open("a", encoding="utf-8")
+
+    def write(self, events: list[dict[str, Any]]) -> None:
+        self._f.write(
+            "".join(json.dumps(e, ensure_ascii=False) + "\n" for e in events)
+        )
+        self._f.flush()
+
+    def write_frame(self, event: str, df: pd.DataFrame) -> None:
+        """Write a whole frame of events of one type in a single call."""
+
+        if df.empty:
+            return
+        df = df.copy()
+        df.insert(0, "event", event)
+        data = df.to_json(
+            orient="records",
+            lines=True,
+            force_ascii=False,
+            double_precision=15,
+        )
+        self._f.write(data if data.endswith("\n") else data + "\n")
+        self._f.flush()
+
+    def tick(self) -> None:
+        pass
+
+    def close(self) -> None:
+        self._f.close()
+
+
+def read_manifest(directory: Path) -> list[dict[str, Any]]:
+    path = directory / MANIFEST_NAME
+    if not path.exists():
+        return []
+    return json.loads(path.read_text(encoding="utf-8"))["segments"]
+
+
+def write_manifest(directory: Path, segments: list[dict[str, Any]]) -> None:
+    path = directory / MANIFEST_NAME
+    tmp = path.with_suffix(".json.tmp")
+    tmp.write_text(json.dumps({"segments": segments}, indent=2), encoding="utf-8")
+    os.replace(tmp, path)
+
+
+class _SegmentStats:
+    def __init__(self) -> None:
+        self.start_ts: str | None = None
+        self.end_ts: str | None = None
+        self.rows = 0
+        self.events: Counter[str] = Counter()
+        self.variants: Counter[str] = Counter()
+
+    def update_from(self, events: list[dict[str, Any]]) -> None:
+        for e in events:
+            ts = e.get("ts")
+            if ts is not None:
+                if self.start_ts is None or ts < self.start_ts:
+                    self.start_ts = ts
+                if self.end_ts is None or ts > self.end_ts:
+                    self.end_ts = ts
+            self.events[e.get("event")] += 1
+            if "variant" in e:
+                self.variants[e["variant"]] += 1
+        self.rows += len(events)
+
+    def as_dict(self) -> dict[str, Any]:
+        return {
+            "start_ts": self.start_ts,
+            "end_ts": self.end_ts,
+            "rows": self.rows,
+            "events": dict(self.events),
+            "variants": dict(self.variants),
+        }
+
+
+def segment_summary(events: list[dict[str, Any]]) -> dict[str, Any]:
+    stats = _SegmentStats()
+    stats.update_from(events)
+    return stats.as_dict()
+
+
+@contextmanager
+def manifest_lock(directory: Path) -> Iterator[None]:
+    """Exclusive lock serialising manifest updates across processes."""
+    with (directory / LOCK_NAME).open("a") as f:
+        fcntl.flock(f, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(f, fcntl.LOCK_UN)
+
+
+def _pid_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def _read_segment_events(path: Path) -> list[dict[str, Any]]:
+    """Events of an unsealed segment, skipping lines left half-written by a crash."""
+    events = []
+    with path.open("r", encoding="utf-8") as f:
+        for i, raw in enumerate(f, start=1):
+            line = raw.strip()
+            if not line:
+                continue
+            try:
+                events.append(json.loads(line))
+            except json.JSONDecodeError:
+                logger.warning("Invalid JSON in %s line %d, skipping", path.name, i)
+    return events
+
+
+class RotatingJsonlSink:
+    """Write events to JSONL segments in `directory`, rotated by size or age.
+
+    Closed segments are gzip-compressed and registered in `manifest.json`
+    together with their time range, row counts and variants, so readers can
+    skip segments outside the range they need.
+
+    Several processes (e.g. `uvicorn --workers N`) may share `directory`:
+    segment names carry the writer's pid, the manifest is merged under a file
+    lock, and on start only segments whose writer is no longer running are
+    sealed. Pids are only meaningful on one host, so the directory must not
+    be shared between machines.
+    """
+
+    def __init__(
+        self,
+        directory: Path,
+        *,
+        prefix: str = "ab_log",
+        max_bytes: int = 64 * 1024 * 1024,
+        max_age_s: float = 3600.0,
+        compress: bool = True,
+    ):
+        self.directory = directory
+        self.prefix = prefix
+        self.max_bytes = max_bytes
+        self.max_age_s = max_age_s
+        self.compress = compress
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self._seal_orphans()
+        self._open_segment()
+
+    def write(self, events: list[dict[str, Any]]) -> None:
+        data = "".join(json.dumps(e, ensure_ascii=False) + "\n" for e in events)
+        self._f.write(data)
+        self._f.flush()
+        self._bytes += len(data.encode("utf-8"))
+        self._summary.update_from(events)
+        if self._bytes >= self.max_bytes:
+            self._rotate()
+        else:
+            self.tick()
+
+    def tick(self) -> None:
+        """Rotate a non-empty segment older than `max_age_s`."""
+        age = time.monotonic() - self._opened
+        if self._summary.rows and age >= self.max_age_s:
+            self._rotate()
+
+    def close(self) -> None:
+        self._seal_active()
+
+    def _rotate(self) -> None:
+        self._seal_active()
+        self._open_segment()
+
+    def _open_segment(self) -> None:
+        stamp = datetime.now(UTC).strftime("%Y%m%dT%H%M%S%f")
+        self._path = self.directory / f"{self.prefix}-{os.getpid()}-{stamp}.jsonl"
+        self._f = self._path.open("a", encoding="utf-8")
+        self._bytes = 0
+        self._opened = time.monotonic()
+        self._summary = _SegmentStats()
+
+    def _seal_active(self) -> None:
+        self._f.close()
+        if self._summary.rows == 0:
+            self._path.unlink(missing_ok=True)
+            return
+        entry = {"file": self._compressed(self._path).name, **self._summary.as_dict()}
+        with manifest_lock(self.directory):
+            write_manifest(self.directory, [*read_manifest(self.directory), entry])
+
+    def _orphaned(self, path: Path) -> bool:
+        owner = path.name[len(self.prefix) + 1 :].split("-", 1)[0]
+        if not owner.isdigit():
+            # Written before segment names carried the writer's pid.
+            return True
+        pid = int(owner)
+        return pid == os.getpid() or not _pid_alive(pid)
+
+    def _seal_orphans(self) -> None:
+        # Segments left open by a crashed process are not in the manifest yet.
+        # The lock is held throughout so two starting workers do not both
+        # seal the same segment.
+        with manifest_lock(self.directory):
+            segments = read_manifest(self.directory)
+            known = {seg["file"] for seg in segments}
+            sealed = []
+            for path in sorted(self.directory.glob(f"{self.prefix}-*.jsonl")):
+                if path.name in known or not self._orphaned(path):
+                    continue
+                events = _read_segment_events(path)
+                if not events:
+                    path.unlink()
+                    continue
+                summary = segment_summary(events)
+                sealed.append({"file": self._compressed(path).name, **summary})
+            if sealed:
+                write_manifest(self.directory, segments + sealed)
+
+    def _compressed(self, path: Path) -> Path:
+        if not self.compress:
+            return path
+        gz_path = path.with_suffix(".jsonl.gz")
+        with path.open("rb") as src, gzip.open(gz_path, "wb") as dst:
+            shutil.copyfileobj(src, dst)
+        path.unlink()
+        return gz_path
+
+
+class DropPolicy(StrEnum):
+    BLOCK = "block"
+    DROP_NEW = "drop_new"
+    DROP_OLDEST = "drop_oldest"
+
+
+_STOP = object()
+
+
+class EventLogger:
+    """Buffer events in a bounded queue and write them from a background thread.
+
+    Queue options come from `config` (an `EventLogConfig`; its sink settings
+    are ignored here). Buffered events are flushed to the sink every
+    `flush_size` events or every `flush_interval_ms`, whichever comes first.
+    When the queue is full, `policy` decides what happens:
+
+    - `block`: wait up to `block_timeout_ms` for space, then drop the event,
+    - `drop_new`: drop the incoming event,
+    - `drop_oldest`: evict the oldest queued event to make room.
+    """
+
+    def __init__(self, sink: EventSink, config: EventLogConfig | None = None):
+        config = config or EventLogConfig()
+        if config.max_queue <= 0:
+            raise ValueError("max_queue must be > 0")
+        if config.flush_size <= 0:
+            raise ValueError("flush_size must be > 0")
+        self.sink = sink
+        self.flush_size = config.flush_size
+        self.flush_interval_s = config.flush_interval_ms / 1000.0
+        self.policy = DropPolicy(config.policy)
+        self.block_timeout_s = config.block_timeout_ms / 1000.0
+        self.enqueued = 0
+        self.written = 0
+        self.dropped = 0
+        self._queue: queue.Queue[Any] = queue.Queue(maxsize=config.max_queue)
+        self._lock = threading.Lock()
+        self._thread: threading.Thread | None = None
+        self._closed = False
+
+    def start(self) -> None:
+        with self._lock:
+            if self._thread is not None or self._closed:
+                return
+            self._thread = threading.Thread(
+                target=self._run, name="event-logger", daemon=True
+            )
+            self._thread.start()
+
+    def close(self) -> None:
+        with self._lock:
+            if self._closed:
+                return
+            self._closed = True
+            thread = self._thread
+        if thread is None:
+            self.sink.close()
+            return
+        self._queue.put(_STOP)
+        thread.join()
+
+    def log(self, event: dict[str, Any]) -> bool:
+        """Queue `event` for writing; returns False if it was dropped."""
+
+        if self._thread is None:
+            self.start()
+        if self._closed:
+            self._count_drop()
+            return False
+
+        if self.policy is DropPolicy.BLOCK:
+            try:
+                self._queue.put(event, timeout=self.block_timeout_s)
+            except queue.Full:
+                self._count_drop()
+                return False
+        elif self.policy is DropPolicy.DROP_NEW:
+            try:
+                self._queue.put_nowait(event)
+            except queue.Full:
+                self._count_drop()
+                return False
+        else:
+            while True:
+                try:
+                    self._queue.put_nowait(event)
+                    break
+                except queue.Full:
+                    try:
+                        self._queue.get_nowait()
+                        self._count_drop()
+                    except queue.Empty:
+                        pass
+
+        with self._lock:
+            self.enqueued += 1
+        return True
+
+    async def log_async(self, event: dict[str, Any]) -> bool:
+        """`log` for event-loop callers; never blocks the loop.
+
+        Only the `block` policy can wait, and only on a full queue, so that
+        case alone is handed to a worker thread.
+        """
+        if self.policy is DropPolicy.BLOCK and self._queue.full():
+            return await asyncio.to_thread(self.log, event)
+        return self.log(event)
+
+    def stats(self) -> dict[str, Any]:
+        with self._lock:
+            return {
+                "policy": str(self.policy),
+                "queue_depth": self._queue.qsize(),
+                "queue_capacity": self._queue.maxsize,
+                "enqueued": self.enqueued,
+                "written": self.written,
+                "dropped": self.dropped,
+            }
+
+    def _count_drop(self) -> None:
+        with self._lock:
+            self.dropped += 1
+
+    def _run(self) -> None:
+        buffer: list[dict[str, Any]] = []
+        next_flush = time.monotonic() + self.flush_interval_s
+        stopping = False
+        while not stopping:
+            timeout = max(next_flush - time.monotonic(), 0.0)
+            try:
+                item = self._queue.get(timeout=timeout)
+            except queue.Empty:
+                item = None
+            if item is _STOP:
+                stopping = True
+            elif item is not None:
+                buffer.append(item)
+
+            now = time.monotonic()
+            if len(buffer) >= self.flush_size or now >= next_flush or stopping:
+                self._flush(buffer)
+                buffer = []
+                if now >= next_flush:
+                    self._tick()
+                next_flush = now + self.flush_interval_s
+
+        while True:
+            try:
+                item = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if item is not _STOP:
+                buffer.append(item)
+        self._flush(buffer)
+        self.sink.close()
+
+    def _tick(self) -> None:
+        try:
+            self.sink.tick()
+        except Exception:
+            logger.exception("Failed to flush the event sink")
+
+    def _flush(self, buffer: list[dict[str, Any]]) -> None:
+        if not buffer:
+            return
+        try:
+            self.sink.write(buffer)
+        except Exception:
+            logger.exception("Failed to write %d events", len(buffer))
+            with self._lock:
+                self.dropped += len(buffer)
+            return
+        with self._lock:
+            self.written += len(buffer)
@@ -0,0 +1,203 @@
+import argparse
+import json
+import os
+import shutil
+from collections.abc import Iterable
+from functools import lru_cache
+from pathlib import Path
+from typing import Any
+
+import joblib
+import numpy as np
+import pandas as pd
+
+from src.data_processing.bookings import load_listing_features
+from src.microservice.amenities import AmenityExpander
+from src.utils.constants import (
+    DATA_DIR,
+    FEATURE_STORE_DIR,
+    MODEL_A_PATH,
+    MODEL_B_PATH,
+)
+
+META_NAME = "meta.json"
+ID_COLUMN = "listing_id"
+
+
+def _column_file(directory: Path, name: str) -> Path:
+    return directory / f"{name}.npy"
+
+
+def _encode_numeric(s: pd.Series) -> np.ndarray:
+    if isinstance(s.dtype, np.dtype) and s.dtype.kind in "iub":
+        return s.to_numpy()
+    values = pd.to_numeric(s, errors="coerce").to_numpy(dtype=np.float64)
+    narrow = values.astype(np.float32)
+    if np.array_equal(narrow.astype(np.float64), values, equal_nan=True):
+        return narrow
+    return values
+
+
+def _encode_categorical(s: pd.Series) -> tuple[np.ndarray, list[str]]:
+    codes, categories = pd.factorize(s.astype("string"), use_na_sentinel=True)
+    dtype = np.int16 if len(categories) < np.iinfo(np.int16).max else np.int32
+    return codes.astype(dtype), [str(c) for c in categories]
+
+
+def listing_feature_frame(
+    listings: pd.DataFrame, amen_columns: Iterable[str]
+) -> pd.DataFrame:
+    """Turn `load_listing_features` output into model-ready listing columns."""
+    expander = AmenityExpander(amen_columns)
+    parsed = listings["amenities_list"].tolist()
+    amen = np.zeros((len(parsed), len(expander.columns)), dtype=np.int8)
+    position = {c: i for i, c in enumerate(expander.columns)}
+    for row, names in enumerate(parsed):
+        for name in names:
+            col = expander.column_for(name)
+            if col is not None:
+                amen[row, position[col]] = 1
+
+    out = listings.drop(columns=["amenities_list"]).reset_index(drop=True)
+    # Counted as `AmenityExpander.expand` counts amenities a client sends.
+    out["amenities_count"] = np.array(
+        [len({expander.slug(a) for a in names}) for names in parsed], dtype=np.int16
+    )
+    amen_df = pd.DataFrame(amen, columns=pd.Index(expander.columns))
+    return pd.concat([out, amen_df], axis=1)
+
+
+def build_feature_store(
+    frame: pd.DataFrame,
+    out_dir: Path,
+    *,
+    columns: Iterable[str] | None = None,
+) -> Path:
+    """Write `frame` (one row per listing) as a feature store in `out_dir`.
+
+    When `columns` is given, only those (plus `listing_id`) are stored.
+    The directory is written next to `out_dir` and swapped in at the end.
+    """
+    frame = frame.dropna(subset=[ID_COLUMN]).drop_duplicates(subset=[ID_COLUMN])
+    frame = frame.assign(**{ID_COLUMN: frame[ID_COLUMN].astype("string")})
+    frame = frame.sort_values(ID_COLUMN, kind="stable").reset_index(drop=True)
+    if columns is not None:
+        keep = [c for c in frame.columns if c in set(columns)]
+        frame = frame.loc[:, [ID_COLUMN, *[c for c in keep if c != ID_COLUMN]]]
+
+    tmp = out_dir.with_name(out_dir.name + ".tmp")
+    shutil.rmtree(tmp, ignore_errors=True)
+    tmp.mkdir(parents=True)
+
+    ids = frame[ID_COLUMN].to_numpy(dtype=str)
+    np.save(_column_file(tmp, ID_COLUMN), ids)
+    meta: dict[str, Any] = {"rows": len(frame), "columns": []}
+    for name in frame.columns:
+        if name == ID_COLUMN:
+            continue
+        s = frame[name]
+        if pd.api.types.is_numeric_dtype(s) or pd.api.types.is_bool_dtype(s):
+            values = _encode_numeric(s)
+            meta["columns"].append({"name": name, "kind": "numeric"})
+        else:
+            values, categories = _encode_categorical(s)
+            meta["columns"].append(
+                {"name": name, "kind": "categorical", "categories": categories}
+            )
+        np.save(_column_file(tmp, name), values)
+    (tmp / META_NAME).write_text(json.dumps(meta), encoding="utf-8")
+
+    shutil.rmtree(out_dir, ignore_errors=True)
+    os.replace(tmp, out_dir)
+    return out_dir
+
+
+class ListingFeatureStore:
+    """Read-only, memory-mapped listing lookup with an in-process LRU cache.
+
+    The store is one `.npy` per column plus `meta.json`, with rows sorted by
+    `listing_id` so a lookup is a binary search over the mapped id column.
+    Missing values (numeric or categorical) come back as NaN, as in training.
+    """
+
+    def __init__(self, directory: Path, *, cache_size: int = 10_000):
+        self.directory = Path(directory)
+        meta = json.loads((self.directory / META_NAME).read_text(encoding="utf-8"))
+        self.rows: int = meta["rows"]
+        self._ids = np.load(_column_file(self.directory, ID_COLUMN), mmap_mode="r")
+        self._columns: list[tuple[str, np.ndarray, list[Any] | None]] = []
+        for col in meta["columns"]:
+            values = np.load(_column_file(self.directory, col["name"]), mmap_mode="r")
+            categories = col.get("categories")
+            if categories is not None:
+                categories = [*categories, float("nan")]  # code -1 -> NaN
+            self._columns.append((col["name"], values, categories))
+        self.columns = [name for name, _, _ in self._columns]
+        self._row = lru_cache(maxsize=cache_size)(self._read_row)
+
+    def __len__(self) -> int:
+        return self.rows
+
+    def _position(self, listing_id: str) -> int | None:
+        i = int(np.searchsorted(self._ids, listing_id))
+        if i < self.rows and self._ids[i] == listing_id:
+            return i
+        return None
+
+    def _read_row(self, listing_id: str) -> dict[str, Any] | None:
+        i = self._position(listing_id)
+        if i is None:
+            return None
+        row: dict[str, Any] = {}
+        for name, values, categories in self._columns:
+            value = values[i]
+            row[name] = categories[value] if categories is not None else value.item()
+        return row
+
+    def get(self, listing_id: str) -> dict[str, Any] | None:
+        """Listing features for `listing_id`, or None when it is unknown."""
+        row = self._row(str(listing_id))
+        return None if row is None else dict(row)
+
+    def stats(self) -> dict[str, Any]:
+        info = self._row.cache_info()
+        return {
+            "rows": self.rows,
+            "columns": len(self.columns),
+            "cache_hits": info.hits,
+            "cache_misses": info.misses,
+            "cache_size": info.currsize,
+            "cache_max_size": info.maxsize,
+        }
+
+
+def model_feature_names(paths: Iterable[Path]) -> list[str]:
+    names: dict[str, None] = {}
+    for path in paths:
+        pipe = joblib.load(path)
+        names.update(dict.fromkeys(pipe.named_steps["prep"].feature_names_in_))
+    return list(names)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description="Build the listing feature store from raw listings."
+    )
+    parser.add_argument("--listings", type=Path, default=DATA_DIR / "listings.csv")
+    parser.add_argument("--out", type=Path, default=FEATURE_STORE_DIR)
+    args = parser.parse_args()
+
+    features = model_feature_names([MODEL_A_PATH, MODEL_B_PATH])
+    frame = listing_feature_frame(load_listing_features(args.listings), features)
+    build_feature_store(frame, args.out, columns=features)
+
+    store = ListingFeatureStore(args.out)
+    size = sum(p.stat().st_size for p in args.out.iterdir())
+    print(
+        f"Saved: {args.out} listings: {len(store)} columns: {len(store.columns)} "
+        f"size: {size / 1e6:.1f} MB"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -1,17 +1,26 @@
 import argparse
-import json
+import shutil
 import uuid
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
 from datetime import UTC, datetime
 from pathlib import Path
+from typing import Any
 
 import joblib
 import numpy as np
 import pandas as pd
 from sklearn.pipeline import Pipeline
 
+from src.data_processing.columnar import read_dataset
+from src.microservice.event_log import JsonlSink, write_manifest
+from src.microservice.parquet_sink import ParquetSink
 from src.utils.constants import AB_LOG_PATH, DATA, MODEL_A_PATH, MODEL_B_PATH, TARGET
 
 GROUP_COL = "listing_id"
+# Written into every output directory, so reruns may replace it without --overwrite.
+GENERATED_MARKER = ".generate_logs"
 
 
 def parse_args() -> argparse.Namespace:
@@ -27,7 +36,16 @@ def parse_args() -> argparse.Namespace:
         "--out",
         type=Path,
         default=AB_LOG_PATH,
-        help="Output JSONL path (default: AB_LOG_PATH)",
+        help="Output JSONL path or Parquet directory (default: AB_LOG_PATH)",
+    )
+    ap.add_argument(
+        "--format",
+        choices=["jsonl", "segments", "parquet"],
+        default="jsonl",
+        help=(
+            "Event sink: a single JSONL file, a directory of per-shard JSONL "
+            "segments with a manifest, or a partitioned Parquet directory"
+        ),
     )
     ap.add_argument(
         "--feedback-rate",
@@ -41,77 +59,262 @@ def parse_args() -> argparse.Namespace:
         default=0.5,
         help="Probability of assignment to variant B",
     )
-    return ap.parse_args()
+    ap.add_argument(
+        "--chunk-size",
+        type=int,
+        default=100_000,
+        help="Samples per shard; each shard has its own RNG stream",
+    )
+    ap.add_argument(
+        "--workers",
+        type=int,
+        default=1,
+        help="Processes scoring shards in parallel (output does not depend on it)",
+    )
+    ap.add_argument(
+        "--start-ts",
+        type=datetime.fromisoformat,
+        default=None,
+        help="Timestamp of the first event (default: now)",
+    )
+    ap.add_argument(
+        "--interval-ms",
+        type=float,
+        default=1.0,
+        help="Time between consecutive simulated requests",
+    )
+    ap.add_argument(
+        "--overwrite",
+        action="store_true",
+        help="Replace --out even if it is not a log written by this script",
+    )
+    args = ap.parse_args()
+    if args.workers > 1 and args.format == "jsonl":
+        ap.error("--workers > 1 needs --format segments or parquet")
+    if not args.overwrite and not replaceable_output(args.out):
+        ap.error(f"{args.out} is not an empty or generated log; use --overwrite")
+    return args
 
 
-def log_event(path: Path, obj: dict) -> None:
-    obj["ts"] = datetime.now(UTC).isoformat()
-    path.parent.mkdir(parents=True, exist_ok=True)
-    with path.open("a", encoding="utf-8") as f:
-        f.write(json.dumps(obj, ensure_ascii=False) + "\n")
+def replaceable_output(out: Path) -> bool:
+    """Whether `out` is missing, a file, empty, or a log this script wrote.
 
+    Only directories marked with `GENERATED_MARKER` count as generated: a
+    manifest or `event=*` partitions alone may belong to the registry or to
+    the service's live log.
+    """
+    if not out.is_dir():
+        return True
+    return (out / GENERATED_MARKER).exists() or not any(out.iterdir())
+
+
+def clear_output(out: Path) -> None:
+    if out.is_dir():
+        shutil.rmtree(out)
+    elif out.exists():
+        out.unlink()
+
+
+def make_sink(fmt: str, out: Path) -> JsonlSink | ParquetSink:
+    clear_output(out)
+    if fmt == "parquet":
+        return ParquetSink(out, max_age_s=float("inf"))
+    return JsonlSink(out)
+
+
+def random_request_ids(rng: np.random.Generator, n: int) -> list[str]:
+    raw = rng.bytes(16 * n)
+    return [
+        str(uuid.UUID(bytes=raw[i : i + 16], version=4)) for i in range(0, 16 * n, 16)
+    ]
 
-def main() -> None:
-    args = parse_args()
-    rng = np.random.default_rng(args.seed)
 
-    df = pd.read_csv(DATA)
-    model_a: Pipeline = joblib.load(MODEL_A_PATH)
-    model_b: Pipeline = joblib.load(MODEL_B_PATH)
+@dataclass(frozen=True)
+class Shard:
+    index: int
+    start: int
+    size: int
+
+
+@dataclass(frozen=True)
+class SimulationConfig:
+    seed: int
+    p_b: float
+    feedback_rate: float
+    start_ts: datetime
+    interval_ms: float
+    fmt: str
+    out: Path
+
+
+def simulate_chunk(
+    df: pd.DataFrame,
+    models: dict[str, Pipeline],
+    rng: np.random.Generator,
+    ts: pd.Series,
+    config: SimulationConfig,
+) -> tuple[pd.DataFrame, pd.DataFrame]:
+    """Draw one sample per timestamp in `ts` and build their events in bulk."""
+
+    n = len(ts)
+    idx = rng.integers(0, len(df), size=n)
+    is_b = rng.random(n) < config.p_b
+    has_feedback = rng.random(n) < config.feedback_rate
+    request_id = random_request_ids(rng, n)
+
+    sample = df.iloc[idx]
+    X = sample.drop(columns=[TARGET, GROUP_COL], errors="ignore")
+    proba = np.empty(n, dtype=np.float64)
+    for variant, mask in (("A", ~is_b), ("B", is_b)):
+        if mask.any():
+            proba[mask] = models[variant].predict_proba(X.loc[mask])[:, 1]
 
+    user_id = (
+        sample["user_id"].astype("string").to_numpy()
+        if "user_id" in sample.columns
+        else None
+    )
+    predict = pd.DataFrame(
+        {
+            "request_id": request_id,
+            "variant": np.where(is_b, "B", "A"),
+            "model": np.where(is_b, "target", "baseline"),
+            "user_id": user_id,
+            "listing_id": sample[GROUP_COL].astype("string").to_numpy(),
+            "prob": proba,
+            "pred": (proba >= 0.5).astype(int),
+            "ts": ts.to_numpy(),
+        }
+    )
+    feedback = pd.DataFrame(
+        {
+            "request_id": predict["request_id"].to_numpy()[has_feedback],
+            "true": sample[TARGET].astype(int).to_numpy()[has_feedback],
+            "ts": ts.to_numpy()[has_feedback],
+        }
+    )
+    return predict, feedback
+
+
+# Per-process inputs, loaded once by `load_inputs` (the pool initializer).
+_inputs: dict[str, pd.DataFrame] = {}
+_models: dict[str, Pipeline] = {}
+
+
+def load_inputs(single_threaded: bool = False) -> None:
+    df = read_dataset(DATA)
     if TARGET not in df.columns:
         raise ValueError(f"Missing target column {TARGET!r} in {DATA}")
     if GROUP_COL not in df.columns:
         raise ValueError(f"Missing group column {GROUP_COL!r} in {DATA}")
-    idx = rng.integers(0, len(df), size=args.n)
-    sample = df.iloc[idx].copy()
-    y_true = sample[TARGET].astype(int).to_numpy()
-    X = sample.drop(columns=[TARGET, GROUP_COL], errors="ignore")
-    user_id = (
-        sample["user_id"].astype("string") if "user_id" in sample.columns else None
-    )
-    listing_id = sample[GROUP_COL].astype("string")
-
-    if args.out.exists():
-        args.out.unlink()
-
-    for i in range(args.n):
-        rid = str(uuid.uuid4())
-
-        variant = "B" if rng.random() < args.p_b else "A"
-        model = model_b if variant == "B" else model_a
-        model_name = "target" if variant == "B" else "baseline"
-
-        row = X.iloc[i : i + 1]
-        proba = float(model.predict_proba(row)[:, 1][0])
-        pred = int(proba >= 0.5)
-
-        log_event(
-            args.out,
-            {
-                "event": "predict",
-                "request_id": rid,
-                "variant": variant,
-                "model": model_name,
-                "user_id": (None if user_id is None else str(user_id.iloc[i])),
-                "listing_id": str(listing_id.iloc[i]),
-                "prob": proba,
-                "pred": pred,
-            },
-        )
-
-        if rng.random() < args.feedback_rate:
-            log_event(
-                args.out,
-                {
-                    "event": "feedback",
-                    "request_id": rid,
-                    "true": int(y_true[i]),
-                },
-            )
+    _inputs["df"] = df
+    _models["A"] = joblib.load(MODEL_A_PATH)
+    _models["B"] = joblib.load(MODEL_B_PATH)
+    if single_threaded:
+        # Parallelism comes from worker processes; avoid oversubscription.
+        for model in _models.values():
+            model.named_steps["clf"].set_params(n_jobs=1)
+
+
+def shard_timestamps(config: SimulationConfig, shard: Shard) -> pd.Series:
+    offsets = pd.to_timedelta(
+        (shard.start + np.arange(shard.size)) * config.interval_ms, unit="ms"
+    )
+    ts = pd.Timestamp(config.start_ts) + offsets
+    return pd.Series(ts.strftime("%Y-%m-%dT%H:%M:%S.%f+00:00"))
+
+
+def simulate_shard(
+    config: SimulationConfig, shard: Shard
+) -> tuple[pd.DataFrame, pd.DataFrame]:
+    if "df" not in _inputs:
+        raise RuntimeError("load_inputs() must be called first")
+    rng = np.random.default_rng([config.seed, shard.index])
+    return simulate_chunk(
+        _inputs["df"], _models, rng, shard_timestamps(config, shard), config
+    )
+
+
+def shard_summary(predict: pd.DataFrame, feedback: pd.DataFrame) -> dict[str, Any]:
+    ts = pd.concat([predict["ts"], feedback["ts"]])
+    return {
+        "start_ts": ts.min(),
+        "end_ts": ts.max(),
+        "rows": len(predict) + len(feedback),
+        "events": {"predict": len(predict), "feedback": len(feedback)},
+        "variants": dict(Counter(predict["variant"])),
+    }
+
+
+def write_shard(config: SimulationConfig, shard: Shard) -> dict[str, Any]:
+    """Simulate one shard and write it to its own file(s); runs in a worker.
+
+    Returns the shard's summary; for JSONL it is the segment's manifest entry.
+    Parquet output has no manifest: readers filter on its partitions instead.
+    """
+
+    predict, feedback = simulate_shard(config, shard)
+    name = f"ab_log-{shard.index:06d}"
+    if config.fmt == "parquet":
+        sink = ParquetSink(config.out, max_age_s=float("inf"), file_prefix=name)
+        sink.write_frame("predict", predict)
+        sink.write_frame("feedback", feedback)
+        return {"shard": shard.index, **shard_summary(predict, feedback)}
+
+    path = config.out / f"{name}.jsonl"
+    sink = JsonlSink(path)
+    sink.write_frame("predict", predict)
+    sink.write_frame("feedback", feedback)
+    sink.close()
+    return {"shard": shard.index, "file": path.name, **shard_summary(predict, feedback)}
+
+
+def main() -> None:
+    args = parse_args()
+    config = SimulationConfig(
+        seed=args.seed,
+        p_b=args.p_b,
+        feedback_rate=args.feedback_rate,
+        start_ts=args.start_ts or datetime.now(UTC),
+        interval_ms=args.interval_ms,
+        fmt=args.format,
+        out=args.out,
+    )
+    shards = [
+        Shard(i, start, min(args.chunk_size, args.n - start))
+        for i, start in enumerate(range(0, args.n, args.chunk_size))
+    ]
+
+    if args.format == "jsonl":
+        load_inputs()
+        sink = make_sink(args.format, args.out)
+        for shard in shards:
+            predict, feedback = simulate_shard(config, shard)
+            sink.write_frame("predict", predict)
+            sink.write_frame("feedback", feedback)
+        sink.close()
+        print(f"Saved log to: {args.out}")
+        print(f"Lines: {sum(1 for _ in args.out.open('r', encoding='utf-8'))}")
+        return
+
+    clear_output(args.out)
+    args.out.mkdir(parents=True)
+    (args.out / GENERATED_MARKER).touch()
+    if args.workers > 1:
+        with ProcessPoolExecutor(
+            max_workers=args.workers,
+            initializer=load_inputs,
+            initargs=(True,),
+        ) as ex:
+            segments = list(ex.map(write_shard, [config] * len(shards), shards))
+    else:
+        load_inputs()
+        segments = [write_shard(config, shard) for shard in shards]
 
+    if args.format == "segments":
+        write_manifest(args.out, segments)
     print(f"Saved log to: {args.out}")
-    print(f"Lines: {sum(1 for _ in args.out.open('r', encoding='utf-8'))}")
+    print(f"Shards: {len(segments)}  Events: {sum(s['rows'] for s in segments)}")
 
 
 if __name__ == "__main__":
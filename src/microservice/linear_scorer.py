@@ -0,0 +1,212 @@
+from __future__ import annotations
+
+import argparse
+import json
+import math
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import TYPE_CHECKING, Any
+
+from src.utils.constants import MODEL_A_PATH, MODEL_A_SCORER_PATH, ROOT_DIR
+
+if TYPE_CHECKING:
+    from sklearn.pipeline import Pipeline
+
+SCORER_FORMAT = "linear-scorer/1"
+
+
+def _is_nan(v: Any) -> bool:
+    return isinstance(v, float) and math.isnan(v)
+
+
+def _sigmoid(z: float) -> float:
+    if z >= 0:
+        return 1.0 / (1.0 + math.exp(-z))
+    e = math.exp(z)
+    return e / (1.0 + e)
+
+
+def _py(v: Any) -> Any:
+    return v.item() if hasattr(v, "item") else v
+
+
+@dataclass(frozen=True)
+class Term:
+    """Contribution of one preprocessed input to the logit.
+
+    Dense terms add `weight * value`; one-hot terms add the coefficient of
+    the observed category (0 for unknown categories).
+    """
+
+    key: str
+    fill: Any
+    indicator: bool
+    numeric: bool
+    weight: float = 0.0
+    categories: dict[Any, float] | None = None
+
+
+class LinearScorer:
+    """Logistic-regression scorer over raw feature dicts, without sklearn.
+
+    Holds only the intercept and, per input feature, either a coefficient or
+    a category -> coefficient map taken from the sparse one-hot layout, so a
+    prediction is a handful of dict lookups and one sigmoid. Absent keys are
+    scored as missing, like in `CompiledPipeline`.
+    """
+
+    def __init__(self, intercept: float, terms: list[Term]):
+        self.intercept = intercept
+        self.terms = terms
+
+    def decision_function(self, features: dict[str, Any]) -> float:
+        z = self.intercept
+        for t in self.terms:
+            v = features.get(t.key, math.nan)
+            missing = _is_nan(v) or (v is None and t.numeric)
+            if t.indicator:
+                v = missing
+            elif missing:
+                v = t.fill
+            if t.categories is None:
+                z += t.weight * float(v)
+            else:
+                z += t.categories.get(v, 0.0)
+        return z
+
+    def predict_one(self, features: dict[str, Any]) -> float:
+        return _sigmoid(self.decision_function(features))
+
+    def predict_proba(self, rows: list[dict[str, Any]]) -> list[float]:
+        return [self.predict_one(r) for r in rows]
+
+    def to_dict(self) -> dict[str, Any]:
+        return {
+            "format": SCORER_FORMAT,
+            "intercept": self.intercept,
+            "terms": [
+                {
+                    "key": t.key,
+                    "fill": t.fill,
+                    "indicator": t.indicator,
+                    "numeric": t.numeric,
+                    "weight": t.weight,
+                    # Pairs keep category types (0 vs 0.0 vs "0") through JSON.
+                    "categories": None
+                    if t.categories is None
+                    else [[c, w] for c, w in t.categories.items()],
+                }
+                for t in self.terms
+            ],
+        }
+
+    @classmethod
+    def from_dict(cls, raw: dict[str, Any]) -> LinearScorer:
+        if raw.get("format") != SCORER_FORMAT:
+            raise ValueError(f"Unsupported scorer format: {raw.get('format')!r}")
+        terms = [
+            Term(
+                key=t["key"],
+                fill=t["fill"],
+                indicator=t["indicator"],
+                numeric=t["numeric"],
+                weight=t["weight"],
+                categories=None
+                if t["categories"] is None
+                else {c: w for c, w in t["categories"]},
+            )
+            for t in raw["terms"]
+        ]
+        return cls(raw["intercept"], terms)
+
+    def save(self, path: Path) -> None:
+        path.write_text(json.dumps(self.to_dict()), encoding="utf-8")
+
+    @classmethod
+    def load(cls, path: Path) -> LinearScorer:
+        return cls.from_dict(json.loads(path.read_text(encoding="utf-8")))
+
+
+def export_linear_scorer(pipe: Pipeline) -> LinearScorer:
+    """Fold a fitted `prep` + `LogisticRegression` pipeline into a LinearScorer."""
+
+    from src.microservice.compiled import compile_pipeline  # noqa: PLC0415
+
+    clf = pipe.named_steps["clf"]
+    if clf.coef_.shape[0] != 1 or list(clf.classes_) != [0, 1]:
+        raise ValueError("Expected a binary LogisticRegression with classes [0, 1]")
+    compiled = compile_pipeline(pipe)
+    coef = clf.coef_[0]
+    if coef.shape[0] != compiled.n_features:
+        raise ValueError("Coefficient vector does not match the preprocessed layout")
+
+    terms = []
+    for b in compiled.blocks:
+        slot = b.slot
+        if b.lookup is None:
+            categories = None
+            weight = float(coef[b.offset])
+        else:
+            categories = {_py(c): float(coef[b.offset + j]) for c, j in b.lookup.items()}
+            weight = 0.0
+        terms.append(
+            Term(
+                key=slot.key,
+                fill=_py(slot.fill),
+                indicator=slot.indicator,
+                numeric=slot.numeric,
+                weight=weight,
+                categories=categories,
+            )
+        )
+    return LinearScorer(float(clf.intercept_[0]), terms)
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser()
+    ap.add_argument(
+        "requests",
+        type=Path,
+        nargs="*",
+        default=sorted((ROOT_DIR / "requests").glob("*.json")),
+        help="Request JSON files with a `features` object",
+    )
+    ap.add_argument("--model", type=Path, default=MODEL_A_PATH)
+    ap.add_argument("--export", type=Path, default=MODEL_A_SCORER_PATH)
+    ap.add_argument("--repeat", type=int, default=1000)
+    ap.add_argument("--tol", type=float, default=1e-9)
+    args = ap.parse_args()
+
+    import joblib  # noqa: PLC0415
+
+    from src.utils.pandas import rows_frame  # noqa: PLC0415
+
+    pipe = joblib.load(args.model)
+    scorer = export_linear_scorer(pipe)
+    scorer.save(args.export)
+    scorer = LinearScorer.load(args.export)
+
+    names = pipe.named_steps["prep"].feature_names_in_
+    rows = [
+        {k: f.get(k, float("nan")) for k in names}
+        for f in (
+            json.loads(p.read_text(encoding="utf-8"))["features"]
+            for p in args.requests
+        )
+    ]
+    expected = pipe.predict_proba(rows_frame(rows))[:, 1]
+    diff = max(abs(e - g) for e, g in zip(expected, scorer.predict_proba(rows), strict=True))
+
+    t0 = time.perf_counter()
+    for _ in range(args.repeat):
+        for r in rows:
+            scorer.predict_one(r)
+    t_one = (time.perf_counter() - t0) / (args.repeat * len(rows))
+    status = "OK" if diff <= args.tol else "MISMATCH"
+    print(f"Exported scorer to: {args.export}")
+    print(f"max|diff|={diff:.3g} [{status}]  {t_one * 1e6:.1f} us/row")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,171 @@
+import bisect
+import math
+import threading
+import time
+from collections.abc import Sequence
+from typing import Any
+
+BATCH_SIZE_BUCKETS = (1, 2, 4, 8, 16, 32, 64, 128, 256)
+LATENCY_MS_BUCKETS = (0.5, 1, 2, 5, 10, 25, 50, 100, 250, 500, 1000)
+STAGE_MS_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 25, 50, 100, 250, 1000)
+
+
+class Histogram:
+    """Fixed-bucket histogram; bucket `i` counts observations `<= buckets[i]`."""
+
+    def __init__(self, buckets: Sequence[float]):
+        self.buckets = tuple(sorted(buckets))
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self._lock = threading.Lock()
+
+    def observe(self, value: float) -> None:
+        i = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            self.counts[i] += 1
+            self.count += 1
+            self.total += value
+            self.max = max(self.max, value)
+
+    def snapshot(self) -> dict[str, Any]:
+        with self._lock:
+            counts = list(self.counts)
+            count, total, max_ = self.count, self.total, self.max
+        labels = [str(b) for b in self.buckets] + ["+Inf"]
+        return {
+            "count": count,
+            "sum": total,
+            "mean": total / count if count else 0.0,
+            "max": max_,
+            "buckets": dict(zip(labels, counts, strict=True)),
+        }
+
+
+def _fmt(value: float) -> str:
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    return repr(float(value))
+
+
+def _labels(names: Sequence[str], values: Sequence[str], **extra: str) -> str:
+    pairs = [*zip(names, values, strict=True), *extra.items()]
+    if not pairs:
+        return ""
+    escaped = (
+        (k, str(v).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n"))
+        for k, v in pairs
+    )
+    return "{" + ",".join(f'{k}="{v}"' for k, v in escaped) + "}"
+
+
+class HistogramFamily:
+    """One `Histogram` per combination of label values, in Prometheus format.
+
+    Observations use the buckets' unit; `scale` converts them on export, e.g.
+    `scale=1e-3` exposes millisecond observations as seconds.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        help: str,
+        buckets: Sequence[float],
+        labels: Sequence[str] = (),
+        *,
+        scale: float = 1.0,
+    ):
+        self.name = name
+        self.help = help
+        self.buckets = tuple(buckets)
+        self.label_names = tuple(labels)
+        self.scale = scale
+        self._children: dict[tuple[str, ...], Histogram] = {}
+        self._lock = threading.Lock()
+
+    def labels(self, *values: str) -> Histogram:
+        child = self._children.get(values)
+        if child is None:
+            with self._lock:
+                child = self._children.setdefault(values, Histogram(self.buckets))
+        return child
+
+    def observe(self, value: float, *values: str) -> None:
+        self.labels(*values).observe(value)
+
+    def render(self) -> list[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            children = sorted(self._children.items())
+        bounds = [b * self.scale for b in self.buckets] + [math.inf]
+        for values, hist in children:
+            snap = hist.snapshot()
+            cumulative = 0
+            for bound, count in zip(bounds, snap["buckets"].values(), strict=True):
+                cumulative += count
+                le = _labels(self.label_names, values, le=_fmt(bound))
+                lines.append(f"{self.name}_bucket{le} {cumulative}")
+            labels = _labels(self.label_names, values)
+            lines.append(f"{self.name}_sum{labels} {_fmt(snap['sum'] * self.scale)}")
+            lines.append(f"{self.name}_count{labels} {snap['count']}")
+        return lines
+
+
+class CounterFamily:
+    """Monotonic counters keyed by label values, in Prometheus format."""
+
+    def __init__(self, name: str, help: str, labels: Sequence[str] = ()):
+        self.name = name
+        self.help = help
+        self.label_names = tuple(labels)
+        self._values: dict[tuple[str, ...], float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, *values: str, amount: float = 1.0) -> None:
+        with self._lock:
+            self._values[values] = self._values.get(values, 0.0) + amount
+
+    def render(self) -> list[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            items = sorted(self._values.items())
+        for values, value in items:
+            labels = _labels(self.label_names, values)
+            lines.append(f"{self.name}{labels} {_fmt(value)}")
+        return lines
+
+
+def render_sample(name: str, help: str, kind: str, value: float) -> list[str]:
+    """A single unlabeled gauge or counter read from elsewhere at scrape time."""
+    return [f"# HELP {name} {help}", f"# TYPE {name} {kind}", f"{name} {_fmt(value)}"]
+
+
+class StageTimer:
+    """Durations in milliseconds of the consecutive stages of one request.
+
+    `lap(name)` charges the time since the previous lap (or since creation)
+    to `name`; `add` records a duration measured elsewhere.
+    """
+
+    def __init__(self, started: float | None = None):
+        self.started = time.perf_counter() if started is None else started
+        self._last = self.started
+        self.stages: dict[str, float] = {}
+
+    def lap(self, name: str) -> float:
+        now = time.perf_counter()
+        ms = (now - self._last) * 1000.0
+        self._last = now
+        self.stages[name] = self.stages.get(name, 0.0) + ms
+        return ms
+
+    def add(self, name: str, ms: float) -> None:
+        self.stages[name] = self.stages.get(name, 0.0) + ms
+
+    def elapsed_ms(self) -> float:
+        return (time.perf_counter() - self.started) * 1000.0
+
+    def server_timing(self) -> str:
+        """The stages as a `Server-Timing` header value."""
+        return ", ".join(f"{name};dur={ms:.3f}" for name, ms in self.stages.items())
@@ -0,0 +1,124 @@
+import os
+import time
+from datetime import UTC, datetime
+from pathlib import Path
+from typing import Any
+
+import pandas as pd
+
+PREDICT_DTYPES: dict[str, str] = {
+    "request_id": "string",
+    "variant": "category",
+    "model": "category",
+    "model_version": "category",
+    "user_id": "string",
+    "listing_id": "string",
+    "prob": "float32",
+    "pred": "int8",
+    "cached": "boolean",
+}
+FEEDBACK_DTYPES: dict[str, str] = {
+    "request_id": "string",
+    "true": "int8",
+}
+EVENT_DTYPES: dict[str, dict[str, str]] = {
+    "predict": PREDICT_DTYPES,
+    "feedback": FEEDBACK_DTYPES,
+}
+
+
+def type_event_frame(event: str, df: pd.DataFrame) -> pd.DataFrame:
+    df = df.drop(columns=["event"], errors="ignore")
+    for col, dtype in EVENT_DTYPES.get(event, {}).items():
+        if col in df.columns:
+            df[col] = df[col].astype(dtype)
+    if "ts" in df.columns:
+        df["ts"] = pd.to_datetime(df["ts"], utc=True, format="ISO8601")
+    return df
+
+
+def events_to_frame(event: str, rows: list[dict[str, Any]]) -> pd.DataFrame:
+    return type_event_frame(event, pd.DataFrame(rows))
+
+
+class ParquetSink:
+    """Write events as typed Parquet files partitioned by event, date and variant.
+
+    Files land in `event=<event>/date=<YYYY-MM-DD>/[variant=<v>/]part-*.parquet`
+    (hive layout). Predict events store `prob` as float32 and `variant`/`model`
+    as dictionary-encoded columns. Events are buffered and written once
+    `max_rows` are collected or the buffer is older than `max_age_s`; the age
+    is also checked on `tick()`, so a quiet buffer is written too. File names
+    carry the writer's pid, so several processes may share `directory`.
+    """
+
+    def __init__(
+        self,
+        directory: Path,
+        *,
+        max_rows: int = 100_000,
+        max_age_s: float = 300.0,
+        file_prefix: str = "part",
+    ):
+        try:
+            import pyarrow  # noqa: F401, PLC0415
+        except ImportError as e:
+            raise ImportError("ParquetSink requires `pyarrow` to be installed") from e
+        self.directory = directory
+        self.max_rows = max_rows
+        self.max_age_s = max_age_s
+        self.file_prefix = file_prefix
+        self.written_files: list[Path] = []
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self._buffer: list[dict[str, Any]] = []
+        self._started = time.monotonic()
+        self._seq = 0
+
+    def write(self, events: list[dict[str, Any]]) -> None:
+        if not self._buffer:
+            self._started = time.monotonic()
+        self._buffer.extend(events)
+        if len(self._buffer) >= self.max_rows:
+            self.flush()
+        else:
+            self.tick()
+
+    def tick(self) -> None:
+        if self._buffer and time.monotonic() - self._started >= self.max_age_s:
+            self.flush()
+
+    def close(self) -> None:
+        self.flush()
+
+    def flush(self) -> None:
+        if not self._buffer:
+            return
+        by_event: dict[str, list[dict[str, Any]]] = {}
+        for e in self._buffer:
+            by_event.setdefault(str(e.get("event", "unknown")), []).append(e)
+        self._buffer = []
+        for event, rows in by_event.items():
+            self.write_frame(event, events_to_frame(event, rows))
+
+    def write_frame(self, event: str, df: pd.DataFrame) -> None:
+        if df.empty:
+            return
+        df = type_event_frame(event, df)
+        dates = df["ts"].dt.strftime("%Y-%m-%d")
+        keys: list[Any] = [dates]
+        if "variant" in df.columns:
+            keys.append(df["variant"].astype("string"))
+        stamp = datetime.now(UTC).strftime("%Y%m%dT%H%M%S%f")
+        pid = os.getpid()
+        for key, part in df.groupby(keys, observed=True, sort=False):
+            date, *variant = key
+            out_dir = self.directory / f"event={event}" / f"date={date}"
+            if variant:
+                out_dir = out_dir / f"variant={variant[0]}"
+            out_dir.mkdir(parents=True, exist_ok=True)
+            self._seq += 1
+            path = out_dir / f"{self.file_prefix}-{stamp}-{pid}-{self._seq:05d}.parquet"
+            part.drop(columns=["variant"], errors="ignore").to_parquet(
+                path, index=False
+            )
+            self.written_files.append(path)
@@ -0,0 +1,79 @@
+import hashlib
+import json
+import threading
+import time
+from collections import OrderedDict
+from typing import Any
+
+
+def feature_key(model_version: str, features: dict[str, Any]) -> bytes:
+    """Canonical hash of a feature dict, independent of key order."""
+    payload = json.dumps(
+        features, sort_keys=True, separators=(",", ":"), default=str
+    ).encode()
+    h = hashlib.blake2b(payload, digest_size=16, person=b"predict-cache")
+    h.update(model_version.encode())
+    return h.digest()
+
+
+class PredictionCache:
+    """Thread-safe LRU cache of scores with a per-entry TTL.
+
+    Keys are `feature_key` digests, so memory is bounded by `max_entries`
+    small entries regardless of payload size. Expired entries count as misses
+    and are dropped on access.
+    """
+
+    def __init__(self, *, max_entries: int = 100_000, ttl_s: float = 300.0):
+        self.max_entries = max_entries
+        self.ttl_s = ttl_s
+        self._entries: OrderedDict[bytes, tuple[float, float]] = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def get(self, key: bytes) -> float | None:
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            expires, value = entry
+            if expires <= now:
+                del self._entries[key]
+                self.expirations += 1
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, key: bytes, value: float) -> None:
+        expires = time.monotonic() + self.ttl_s
+        with self._lock:
+            self._entries[key] = (expires, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> dict[str, Any]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._entries),
+                "max_entries": self.max_entries,
+                "ttl_s": self.ttl_s,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+            }
@@ -0,0 +1,444 @@
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import shutil
+import threading
+import time
+from collections.abc import Callable
+from dataclasses import asdict, dataclass
+from datetime import UTC, datetime
+from pathlib import Path
+from typing import TYPE_CHECKING, Any
+
+import numpy as np
+
+from src.microservice.amenities import AmenityExpander
+from src.microservice.startup import StartupProfile
+from src.utils.constants import MODEL_A_PATH, MODEL_B_PATH, MODEL_REGISTRY_DIR
+from src.utils.files import file_digest
+
+MANIFEST_NAME = "manifest.json"
+ARTIFACT_NAME = "model.joblib"
+MODEL_NAMES: dict[str, str] = {"A": "baseline", "B": "target"}
+
+if TYPE_CHECKING:
+    from sklearn.pipeline import Pipeline
+
+
+@dataclass(frozen=True)
+class ModelArtifact:
+    variant: str
+    name: str
+    version: str
+    path: str
+
+
+def read_registry(directory: Path) -> dict[str, ModelArtifact] | None:
+    """Artifacts listed in the registry manifest, or None without a manifest."""
+    path = directory / MANIFEST_NAME
+    if not path.exists():
+        return None
+    variants = json.loads(path.read_text(encoding="utf-8"))["variants"]
+    return {
+        variant: ModelArtifact(
+            variant=variant,
+            name=entry["name"],
+            version=entry["version"],
+            path=str(directory / entry["path"]),
+        )
+        for variant, entry in variants.items()
+    }
+
+
+def default_artifacts() -> dict[str, ModelArtifact]:
+    """The fixed artifacts in `models/`, versioned by content hash."""
+    paths = {"A": MODEL_A_PATH, "B": MODEL_B_PATH}
+    return {
+        variant: ModelArtifact(variant, MODEL_NAMES[variant], file_digest(p), str(p))
+        for variant, p in paths.items()
+    }
+
+
+def served_artifacts(directory: Path) -> dict[str, ModelArtifact]:
+    """The registry's artifacts, with `default_artifacts` for unlisted variants."""
+    return {**default_artifacts(), **(read_registry(directory) or {})}
+
+
+def publish_model(
+    directory: Path,
+    variant: str,
+    source: Path,
+    *,
+    name: str | None = None,
+    version: str | None = None,
+) -> ModelArtifact:
+    """Copy `source` into the registry and point `variant` at it.
+
+    The artifact is copied first and the manifest is replaced atomically
+    afterwards, so a watching service never sees a half-written model.
+    """
+    version = version or file_digest(source)
+    name = name or MODEL_NAMES.get(variant, variant)
+    rel = Path(variant) / version / ARTIFACT_NAME
+    target = directory / rel
+    target.parent.mkdir(parents=True, exist_ok=True)
+    if not target.exists():
+        tmp = target.with_suffix(".tmp")
+        shutil.copyfile(source, tmp)
+        os.replace(tmp, target)
+
+    manifest_path = directory / MANIFEST_NAME
+    manifest: dict[str, Any] = {"variants": {}}
+    if manifest_path.exists():
+        manifest = json.loads(manifest_path.read_text(encoding="utf-8"))
+    manifest["variants"][variant] = {
+        "name": name,
+        "version": version,
+        "path": rel.as_posix(),
+        "published_at": datetime.now(UTC).isoformat(),
+    }
+    tmp = manifest_path.with_suffix(".json.tmp")
+    tmp.write_text(json.dumps(manifest, indent=2), encoding="utf-8")
+    os.replace(tmp, manifest_path)
+    return ModelArtifact(variant, name, version, str(target))
+
+
+def warmup_row(pipe: Pipeline) -> dict[str, Any]:
+    """A plausible input row built from the fitted imputers' fill values."""
+    row: dict[str, Any] = {}
+    for name, transformer, columns in pipe.named_steps["prep"].transformers_:
+        if transformer == "drop" or name == "remainder":
+            continue
+        imputer = transformer
+        if hasattr(transformer, "steps"):
+            imputer = transformer.steps[0][1]
+        row.update(zip(columns, imputer.statistics_, strict=True))
+    return row
+
+
+class ModelSet:
+    """An immutable snapshot of the served models and their versions.
+
+    Requests read `ModelRegistry.current` once and use that snapshot for
+    scoring and logging, so a swap never mixes versions within a request.
+    A set scored elsewhere (in scoring processes) holds no models, only the
+    artifacts and the input `features` the models expect.
+    """
+
+    def __init__(
+        self,
+        artifacts: dict[str, ModelArtifact],
+        models: dict[str, Pipeline],
+        scorers: dict[str, Any] | None = None,
+        features: list[str] | None = None,
+    ):
+        self.artifacts = artifacts
+        self.models = models
+        self.scorers = scorers or {}
+        self.names = {v: a.name for v, a in artifacts.items()}
+        self.versions = {v: a.version for v, a in artifacts.items()}
+        if features is None:
+            features = [
+                c
+                for pipe in models.values()
+                for c in pipe.named_steps["prep"].feature_names_in_
+            ]
+            features += [
+                c
+                for variant, scorer in self.scorers.items()
+                if variant not in models
+                for c in scorer.input_features
+            ]
+        self.features = features
+        self.amenities = AmenityExpander(features)
+
+    def predict(self, variant: str, rows: list[dict[str, Any]]) -> np.ndarray:
+        return self.predict_timed(variant, rows)[0]
+
+    def predict_timed(
+        self, variant: str, rows: list[dict[str, Any]]
+    ) -> tuple[np.ndarray, dict[str, float]]:
+        """Scores plus milliseconds per stage: `frame`, `preprocess`, `inference`.
+
+        Compiled scorers prepare rows and score in one pass, reported as
+        `inference` alone.
+        """
+        t0 = time.perf_counter()
+        if variant in self.scorers:
+            scores = self.scorers[variant].predict_proba(rows)
+            ms = (time.perf_counter() - t0) * 1000.0
+            return np.asarray(scores, dtype=np.float64), {"inference": ms}
+        from src.utils.pandas import rows_frame  # noqa: PLC0415
+
+        pipe = self.models[variant]
+        X = rows_frame(rows)
+        t1 = time.perf_counter()
+        Xt = pipe[:-1].transform(X)
+        t2 = time.perf_counter()
+        scores = pipe[-1].predict_proba(Xt)[:, 1]
+        t3 = time.perf_counter()
+        return scores, {
+            "frame": (t1 - t0) * 1000.0,
+            "preprocess": (t2 - t1) * 1000.0,
+            "inference": (t3 - t2) * 1000.0,
+        }
+
+    def warm_up(self, profile: StartupProfile | None = None) -> None:
+        """Score one row per variant so first requests skip lazy initialisation."""
+        for variant in self.artifacts:
+            t0 = time.perf_counter()
+            pipe = self.models.get(variant)
+            if pipe is None:
+                self.predict(variant, [self.scorers[variant].fill_row()])
+            else:
+                row = warmup_row(pipe)
+                self.predict(variant, [row])
+                if variant in self.scorers:
+                    from src.utils.pandas import rows_frame  # noqa: PLC0415
+
+                    pipe.predict_proba(rows_frame([row]))
+            if profile is not None:
+                profile.phases[f"warm_up.{variant}"] = time.perf_counter() - t0
+
+
+@dataclass(frozen=True)
+class LoadOptions:
+    """How `load_model_set` turns artifacts into models that score.
+
+    With `mmap_mode` ("r"), numpy arrays in uncompressed joblib artifacts are
+    memory-mapped instead of copied. With `shared_dir`, pipelines are not
+    unpickled at all: each artifact is exported once to an array bundle there
+    and scored by a `SharedScorer` attached to it read-only. `compile_fn` is
+    then not used, so XGBoost variants are always scored by `FlatForest`.
+    """
+
+    compile_fn: Callable[[Pipeline], Any] | None = None
+    mmap_mode: str | None = None
+    shared_dir: Path | None = None
+
+
+def load_model_set(
+    artifacts: dict[str, ModelArtifact],
+    options: LoadOptions | None = None,
+    *,
+    previous: ModelSet | None = None,
+    profile: StartupProfile | None = None,
+) -> ModelSet:
+    """Load `artifacts`, reusing models from `previous` whose version is unchanged."""
+    import joblib  # noqa: PLC0415
+
+    options = options or LoadOptions()
+    profile = profile or StartupProfile()
+    models: dict[str, Pipeline] = {}
+    scorers: dict[str, Any] = {}
+    for variant, artifact in artifacts.items():
+        if previous is not None and previous.versions.get(variant) == artifact.version:
+            if variant in previous.models:
+                models[variant] = previous.models[variant]
+            if variant in previous.scorers:
+                scorers[variant] = previous.scorers[variant]
+            continue
+        if options.shared_dir is not None:
+            from src.microservice.shared_models import (  # noqa: PLC0415
+                SharedScorer,
+                ensure_bundle,
+            )
+
+            with profile.phase(f"load.{variant}"):
+                scorers[variant] = SharedScorer(
+                    ensure_bundle(artifact, options.shared_dir)
+                )
+            continue
+        with profile.phase(f"load.{variant}"):
+            models[variant] = joblib.load(artifact.path, mmap_mode=options.mmap_mode)
+        if options.compile_fn is not None:
+            with profile.phase(f"compile.{variant}"):
+                scorers[variant] = options.compile_fn(models[variant])
+    return ModelSet(artifacts, models, scorers)
+
+
+def load_and_warm_up(
+    artifacts: dict[str, ModelArtifact],
+    options: LoadOptions | None = None,
+    *,
+    previous: ModelSet | None = None,
+    profile: StartupProfile | None = None,
+) -> ModelSet:
+    """`load_model_set`, then `ModelSet.warm_up`: the default registry loader."""
+    models = load_model_set(artifacts, options, previous=previous, profile=profile)
+    models.warm_up(profile)
+    return models
+
+
+class ModelRegistry:
+    """Serve models from a registry directory and hot-swap them on change.
+
+    Variants missing from the manifest (or all of them, without one) are
+    served from the fixed artifacts in `models/`. Nothing is loaded at
+    construction: `start()` loads and warms up the models on a background
+    thread (`wait_ready` blocks until then) and afterwards polls the manifest
+    every `poll_s` seconds. Loading is done by `loader`, called as
+    `loader(artifacts, previous=..., profile=...)`; it defaults to
+    `load_and_warm_up`. A changed version is loaded, warmed up and then
+    swapped in with a single reference assignment, so in-flight requests
+    finish on the models they started with. A failed reload keeps serving the
+    current models and is reported in `stats()`.
+    """
+
+    def __init__(
+        self,
+        directory: Path,
+        *,
+        poll_s: float = 10.0,
+        loader: Callable[..., ModelSet] = load_and_warm_up,
+        profile: StartupProfile | None = None,
+    ):
+        self.directory = directory
+        self.poll_s = poll_s
+        self.loader = loader
+        self.profile = profile or StartupProfile()
+        self.current: ModelSet | None = None
+        self.loaded_at: str | None = None
+        self.swaps = 0
+        self.last_error: str | None = None
+        self._manifest_mtime: int | None = None
+        self._stop = threading.Event()
+        self._thread: threading.Thread | None = None
+        self._reload_lock = threading.Lock()
+        self._ready = threading.Event()
+
+    def _read_manifest_mtime(self) -> int | None:
+        path = self.directory / MANIFEST_NAME
+        return path.stat().st_mtime_ns if path.exists() else None
+
+    def _load(
+        self,
+        artifacts: dict[str, ModelArtifact],
+        previous: ModelSet | None,
+        profile: StartupProfile | None = None,
+    ) -> ModelSet:
+        return self.loader(artifacts, previous=previous, profile=profile)
+
+    @property
+    def ready(self) -> bool:
+        return self._ready.is_set()
+
+    def wait_ready(self, timeout: float | None = None) -> bool:
+        return self._ready.wait(timeout)
+
+    def load(self) -> None:
+        """Load and warm up the initial models; a no-op once ready."""
+        with self._reload_lock:
+            if self._ready.is_set():
+                return
+            mtime = self._read_manifest_mtime()
+            self.current = self._load(
+                served_artifacts(self.directory), None, self.profile
+            )
+            self._manifest_mtime = mtime
+            self.loaded_at = datetime.now(UTC).isoformat()
+            self.last_error = None
+            self.profile.mark("models_ready")
+            self._ready.set()
+
+    def refresh(self) -> bool:
+        """Reload if the manifest changed; returns True when models were swapped.
+
+        The manifest's mtime is recorded only once its models are served, so
+        a failed reload is retried on the next poll.
+        """
+        with self._reload_lock:
+            mtime = self._read_manifest_mtime()
+            if self.current is None or mtime == self._manifest_mtime:
+                return False
+            try:
+                artifacts = served_artifacts(self.directory)
+                versions = {v: a.version for v, a in artifacts.items()}
+                if versions == self.current.versions:
+                    self._manifest_mtime = mtime
+                    return False
+                self.current = self._load(artifacts, previous=self.current)
+            except Exception as e:  # noqa: BLE001
+                self.last_error = f"{type(e).__name__}: {e}"
+                return False
+            self._manifest_mtime = mtime
+            self.swaps += 1
+            self.last_error = None
+            self.loaded_at = datetime.now(UTC).isoformat()
+            return True
+
+    def start(self) -> None:
+        if self._thread is not None:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(
+            target=self._run, name="model-registry", daemon=True
+        )
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def _run(self) -> None:
+        retry_s = self.poll_s if self.poll_s > 0 else 10.0
+        while not self._ready.is_set():
+            try:
+                self.load()
+            except Exception as e:  # noqa: BLE001
+                self.last_error = f"{type(e).__name__}: {e}"
+                if self._stop.wait(retry_s):
+                    return
+        if self.poll_s <= 0:
+            return
+        while not self._stop.wait(self.poll_s):
+            self.refresh()
+
+    def stats(self) -> dict[str, Any]:
+        artifacts = self.current.artifacts if self.current is not None else {}
+        return {
+            "directory": str(self.directory),
+            "ready": self.ready,
+            "models": {v: asdict(a) for v, a in artifacts.items()},
+            "loaded_at": self.loaded_at,
+            "swaps": self.swaps,
+            "last_error": self.last_error,
+        }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Manage the model registry.")
+    parser.add_argument("--registry", type=Path, default=MODEL_REGISTRY_DIR)
+    sub = parser.add_subparsers(dest="command", required=True)
+    pub = sub.add_parser("publish", help="Publish an artifact for a variant.")
+    pub.add_argument("--variant", required=True, choices=sorted(MODEL_NAMES))
+    pub.add_argument("--model", type=Path, required=True)
+    pub.add_argument("--name", default=None)
+    pub.add_argument("--version", default=None)
+    sub.add_parser("list", help="Show the served artifacts.")
+    args = parser.parse_args()
+
+    if args.command == "publish":
+        artifact = publish_model(
+            args.registry,
+            args.variant,
+            args.model,
+            name=args.name,
+            version=args.version,
+        )
+        print(
+            f"Published {artifact.variant} ({artifact.name}) "
+            f"version {artifact.version}: {artifact.path}"
+        )
+    else:
+        artifacts = served_artifacts(args.registry)
+        for artifact in artifacts.values():
+            print(json.dumps(asdict(artifact)))
+
+
+if __name__ == "__main__":
+    main()
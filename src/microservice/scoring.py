@@ -0,0 +1,237 @@
+from __future__ import annotations
+
+import asyncio
+import multiprocessing
+import threading
+import time
+from concurrent.futures import Executor, Future, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import TYPE_CHECKING, Any
+
+import numpy as np
+
+from src.microservice.registry import (
+    LoadOptions,
+    ModelArtifact,
+    ModelSet,
+    load_and_warm_up,
+    load_model_set,
+)
+from src.microservice.startup import StartupProfile
+
+if TYPE_CHECKING:
+    from multiprocessing.synchronize import Barrier
+
+    from sklearn.pipeline import Pipeline
+
+EXECUTOR_KINDS = ("thread", "process")
+# Upper bound on loading and warming the models in a new scoring process.
+WORKER_WARM_UP_TIMEOUT_S = 300.0
+
+
+def compile_model(pipe: Pipeline, *, xgb_backend: str = "inplace") -> Any:
+    """The fastest available scorer for a fitted pipeline."""
+    from sklearn.linear_model import LogisticRegression  # noqa: PLC0415
+    from xgboost import XGBClassifier  # noqa: PLC0415
+
+    from src.microservice.compiled import compile_pipeline  # noqa: PLC0415
+    from src.microservice.linear_scorer import export_linear_scorer  # noqa: PLC0415
+    from src.microservice.xgb_scorer import BoosterScorer  # noqa: PLC0415
+
+    clf = pipe.named_steps["clf"]
+    if isinstance(clf, LogisticRegression):
+        return export_linear_scorer(pipe)
+    if isinstance(clf, XGBClassifier):
+        return BoosterScorer(pipe, backend=xgb_backend)
+    return compile_pipeline(pipe)
+
+
+# Models loaded inside a scoring process, by variant and version.
+_worker_models: dict[tuple[str, str], ModelSet] = {}
+# Input features of the models the process was started with.
+_worker_features: list[str] = []
+
+
+Scored = tuple[np.ndarray, dict[str, float]]
+
+
+def _init_worker(
+    artifacts: dict[str, ModelArtifact], options: LoadOptions, barrier: Barrier
+) -> None:
+    """Load and warm up `artifacts`, then wait until every worker has."""
+    models = load_and_warm_up(artifacts, options)
+    for variant, artifact in artifacts.items():
+        _worker_models[variant, artifact.version] = models
+    _worker_features[:] = models.features
+    barrier.wait()
+
+
+def _warmed_features() -> list[str]:
+    return _worker_features
+
+
+def _score_in_worker(
+    artifact: ModelArtifact, rows: list[dict[str, Any]], options: LoadOptions
+) -> Scored:
+    key = (artifact.variant, artifact.version)
+    models = _worker_models.get(key)
+    if models is None:
+        # Only a request that read the models just before a swap gets here.
+        models = load_model_set({artifact.variant: artifact}, options)
+        _worker_models[key] = models
+    return models.predict_timed(artifact.variant, rows)
+
+
+def _with_queue(scored: Scored, submitted: float) -> Scored:
+    """Charge the wall time not spent scoring (waiting, IPC) to `queue`."""
+    scores, stages = scored
+    elapsed = (time.perf_counter() - submitted) * 1000.0
+    return scores, {"queue": max(elapsed - sum(stages.values()), 0.0), **stages}
+
+
+class ScoringExecutor:
+    """Run model scoring on a dedicated pool, off the event loop.
+
+    With `kind="thread"` the pool threads score the caller's `ModelSet`
+    directly. With `kind="process"` the models live only in the worker
+    processes: `load_models`, the registry's loader, starts a pool whose
+    initializer loads and warms up the artifacts (cheaply with `shared_dir`,
+    which attaches the exported bundles) and returns once every worker is
+    warm, so `/ready` waits for them. The parent keeps a `ModelSet` without
+    models. A swap warms a new pool the same way before the old one is
+    retired; only the rows and scores cross the process boundary.
+
+    Results are `(scores, stage_ms)` as from `ModelSet.predict_timed`, with
+    the time spent waiting for a worker added as `queue`.
+    """
+
+    def __init__(
+        self,
+        kind: str = "thread",
+        workers: int = 4,
+        *,
+        options: LoadOptions | None = None,
+    ):
+        if kind not in EXECUTOR_KINDS:
+            raise ValueError(f"Unknown scoring executor: {kind!r}")
+        if workers <= 0:
+            raise ValueError("workers must be > 0")
+        self.kind = kind
+        self.workers = workers
+        self.options = options or LoadOptions()
+        self.submitted = 0
+        self.completed = 0
+        self.failed = 0
+        self.pools_started = 0
+        self._lock = threading.Lock()
+        self._pool: Executor | None = None
+
+    def load_models(
+        self,
+        artifacts: dict[str, ModelArtifact],
+        *,
+        previous: ModelSet | None = None,
+        profile: StartupProfile | None = None,
+    ) -> ModelSet:
+        """Load `artifacts` where this executor scores them; see the class doc."""
+        if self.kind == "thread":
+            return load_and_warm_up(
+                artifacts, self.options, previous=previous, profile=profile
+            )
+        profile = profile or StartupProfile()
+        with profile.phase("warm_up.workers"):
+            pool, features = self._start_warm_pool(artifacts)
+        with self._lock:
+            retired, self._pool = self._pool, pool
+            self.pools_started += 1
+        if retired is not None:
+            # Requests already queued there finish on the previous models.
+            retired.shutdown(wait=False)
+        return ModelSet(artifacts, {}, features=features)
+
+    def _start_warm_pool(
+        self, artifacts: dict[str, ModelArtifact]
+    ) -> tuple[ProcessPoolExecutor, list[str]]:
+        # Forking would copy the server's threads and locks mid-use.
+        context = multiprocessing.get_context("spawn")
+        barrier = context.Barrier(self.workers, timeout=WORKER_WARM_UP_TIMEOUT_S)
+        pool = ProcessPoolExecutor(
+            self.workers,
+            mp_context=context,
+            initializer=_init_worker,
+            initargs=(artifacts, self.options, barrier),
+        )
+        # Each task submitted while no worker is idle spawns another one, and
+        # the barrier holds them all in the initializer until every worker is
+        # warm, so these tasks start all `workers` processes.
+        try:
+            probes = [pool.submit(_warmed_features) for _ in range(self.workers)]
+            features = [probe.result() for probe in probes]
+        except BaseException:
+            pool.shutdown(wait=False, cancel_futures=True)
+            raise
+        return pool, features[0]
+
+    def _get_pool(self) -> Executor:
+        if self._pool is None:
+            if self.kind == "process":
+                raise RuntimeError("No scoring workers: call load_models first")
+            self._pool = ThreadPoolExecutor(self.workers, thread_name_prefix="scoring")
+        return self._pool
+
+    def start(self) -> None:
+        if self.kind == "thread":
+            with self._lock:
+                self._get_pool()
+
+    def stop(self) -> None:
+        with self._lock:
+            pool, self._pool = self._pool, None
+        if pool is not None:
+            pool.shutdown(wait=True, cancel_futures=True)
+
+    def submit(
+        self, models: ModelSet, variant: str, rows: list[dict[str, Any]]
+    ) -> Future:
+        # Under the lock, so a swap cannot retire the pool in between.
+        with self._lock:
+            pool = self._get_pool()
+            if self.kind == "thread":
+                future = pool.submit(models.predict_timed, variant, rows)
+            else:
+                future = pool.submit(
+                    _score_in_worker, models.artifacts[variant], rows, self.options
+                )
+            self.submitted += 1
+        future.add_done_callback(self._count)
+        return future
+
+    def predict(
+        self, models: ModelSet, variant: str, rows: list[dict[str, Any]]
+    ) -> Scored:
+        t0 = time.perf_counter()
+        return _with_queue(self.submit(models, variant, rows).result(), t0)
+
+    async def predict_async(
+        self, models: ModelSet, variant: str, rows: list[dict[str, Any]]
+    ) -> Scored:
+        t0 = time.perf_counter()
+        future = self.submit(models, variant, rows)
+        return _with_queue(await asyncio.wrap_future(future), t0)
+
+    def _count(self, future: Future) -> None:
+        with self._lock:
+            self.completed += 1
+            if future.cancelled() or future.exception() is not None:
+                self.failed += 1
+
+    def stats(self) -> dict[str, Any]:
+        with self._lock:
+            return {
+                "kind": self.kind,
+                "workers": self.workers,
+                "in_flight": self.submitted - self.completed,
+                "submitted": self.submitted,
+                "completed": self.completed,
+                "failed": self.failed,
+                "pools_started": self.pools_started,
+            }
@@ -0,0 +1,220 @@
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import struct
+import subprocess
+import sys
+import threading
+from pathlib import Path
+from typing import TYPE_CHECKING, Any
+
+import numpy as np
+
+from src.microservice.compiled import CompiledPipeline
+from src.microservice.xgb_scorer import FOREST_ARRAYS, FlatForest
+from src.utils.constants import MODEL_REGISTRY_DIR, MODEL_SHARED_DIR, ROOT_DIR
+
+if TYPE_CHECKING:
+    from sklearn.pipeline import Pipeline
+
+    from src.microservice.registry import ModelArtifact
+
+MAGIC = b"ABMODEL1"
+ALIGN = 64
+# Bump when the header or array layout changes. It is part of the file name,
+# so bundles exported by older code are re-exported instead of misread.
+BUNDLE_FORMAT = 1
+
+
+def _align(n: int) -> int:
+    return -(-n // ALIGN) * ALIGN
+
+
+def export_bundle(pipe: Pipeline, path: Path) -> Path:
+    """Write the arrays needed to score `pipe` into one memory-mappable file.
+
+    Layout: magic, u64 header length, JSON header, then 64-byte aligned raw
+    arrays. The header holds the format version, the compiled preprocessor
+    (slots and encoder vocabularies) and, per array, its dtype, shape and
+    offset.
+    """
+    from sklearn.linear_model import LogisticRegression  # noqa: PLC0415
+    from xgboost import XGBClassifier  # noqa: PLC0415
+
+    clf = pipe.named_steps["clf"]
+    if isinstance(clf, LogisticRegression):
+        if clf.coef_.shape[0] != 1:
+            raise ValueError("Only binary LogisticRegression is supported")
+        kind = "linear"
+        arrays = {"coef": np.ascontiguousarray(clf.coef_[0], dtype=np.float64)}
+        params = {"intercept": float(clf.intercept_[0])}
+    elif isinstance(clf, XGBClassifier):
+        forest = FlatForest.from_booster(clf.get_booster())
+        kind = "forest"
+        arrays = forest.arrays()
+        params = {"base_margin": forest.base_margin}
+    else:
+        raise ValueError(f"Unsupported classifier: {type(clf).__name__}")
+
+    entries: dict[str, dict[str, Any]] = {}
+    offset = 0
+    for name, arr in arrays.items():
+        entries[name] = {
+            "dtype": arr.dtype.str,
+            "shape": list(arr.shape),
+            "offset": offset,
+        }
+        offset = _align(offset + arr.nbytes)
+    header = json.dumps(
+        {
+            "format": BUNDLE_FORMAT,
+            "kind": kind,
+            "params": params,
+            "prep": CompiledPipeline(pipe).to_spec(),
+            "arrays": entries,
+        }
+    ).encode()
+    data_start = _align(len(MAGIC) + 8 + len(header))
+
+    tmp = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with tmp.open("wb") as f:
+        f.write(MAGIC + struct.pack("<Q", len(header)) + header)
+        for name, arr in arrays.items():
+            f.seek(data_start + entries[name]["offset"])
+            f.write(np.ascontiguousarray(arr).tobytes())
+    os.replace(tmp, path)
+    return path
+
+
+class SharedScorer:
+    """Score from an exported bundle attached read-only via `np.memmap`.
+
+    All model arrays are views into the one mapping, so worker processes
+    that attach the same file share its pages instead of holding copies.
+    Only numpy is needed: no sklearn, xgboost or pandas.
+    """
+
+    def __init__(self, path: Path, *, max_batch: int = 256):
+        self.path = path
+        with path.open("rb") as f:
+            if f.read(len(MAGIC)) != MAGIC:
+                raise ValueError(f"Not a model bundle: {path}")
+            (size,) = struct.unpack("<Q", f.read(8))
+            header = json.loads(f.read(size))
+        if header.get("format") != BUNDLE_FORMAT:
+            raise ValueError(
+                f"Bundle format {header.get('format')} of {path} is not "
+                f"{BUNDLE_FORMAT}; re-export it"
+            )
+        data_start = _align(len(MAGIC) + 8 + size)
+        self._mmap = np.memmap(path, dtype=np.uint8, mode="r")
+        arrays = {
+            name: np.ndarray(
+                tuple(e["shape"]),
+                dtype=np.dtype(e["dtype"]),
+                buffer=self._mmap,
+                offset=data_start + e["offset"],
+            )
+            for name, e in header["arrays"].items()
+        }
+        self.kind: str = header["kind"]
+        self.prep = CompiledPipeline.from_spec(header["prep"])
+        self.input_features = self.prep.input_features
+        if self.kind == "linear":
+            self.coef = arrays["coef"]
+            self.intercept = float(header["params"]["intercept"])
+            dtype = np.float64
+        else:
+            self.forest = FlatForest(
+                {name: arrays[name] for name in FOREST_ARRAYS},
+                float(header["params"]["base_margin"]),
+            )
+            # XGBoost compares float32 features against float32 thresholds.
+            dtype = np.float32
+        self._dtype = dtype
+        self.max_batch = max_batch
+        self._local = threading.local()
+
+    def _buffer(self, n: int) -> np.ndarray:
+        buf = getattr(self._local, "buf", None)
+        if buf is None or buf.shape[0] < n:
+            shape = (max(n, self.max_batch), self.prep.n_features)
+            buf = np.empty(shape, dtype=self._dtype)
+            self._local.buf = buf
+        return buf
+
+    def predict_proba(self, rows: list[dict[str, Any]]) -> np.ndarray:
+        X = self.prep.transform_into(rows, self._buffer(len(rows)))
+        if self.kind == "linear":
+            return 1.0 / (1.0 + np.exp(-(X @ self.coef + self.intercept)))
+        return self.forest.predict_proba(X)
+
+    def fill_row(self) -> dict[str, Any]:
+        return self.prep.fill_row()
+
+
+def bundle_path(shared_dir: Path, artifact: ModelArtifact) -> Path:
+    name = f"{artifact.variant}-{artifact.version}.v{BUNDLE_FORMAT}.bundle"
+    return shared_dir / name
+
+
+def ensure_bundle(artifact: ModelArtifact, shared_dir: Path) -> Path:
+    """Export `artifact` once; later workers and restarts reuse the file.
+
+    The export runs in a child interpreter so the serving process never
+    imports sklearn/xgboost or holds an unpickled copy of the pipeline.
+    """
+    path = bundle_path(shared_dir, artifact)
+    if not path.exists():
+        subprocess.run(  # noqa: S603 - argv is this interpreter and an artifact path
+            [
+                sys.executable,
+                "-m",
+                "src.microservice.shared_models",
+                "--model",
+                artifact.path,
+                "--out",
+                str(path),
+            ],
+            cwd=ROOT_DIR,
+            check=True,
+        )
+    return path
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description=(
+            "Export model artifacts as shared, memory-mappable bundles. Without "
+            "--model, every served artifact is exported into --shared-dir."
+        )
+    )
+    parser.add_argument("--model", type=Path, default=None)
+    parser.add_argument("--out", type=Path, default=None)
+    parser.add_argument("--registry", type=Path, default=MODEL_REGISTRY_DIR)
+    parser.add_argument("--shared-dir", type=Path, default=MODEL_SHARED_DIR)
+    args = parser.parse_args()
+    if (args.model is None) != (args.out is None):
+        parser.error("--model and --out must be given together")
+
+    import joblib  # noqa: PLC0415
+
+    from src.microservice.registry import served_artifacts  # noqa: PLC0415
+
+    if args.model is not None:
+        jobs = [(args.model, args.out)]
+    else:
+        jobs = [
+            (Path(a.path), bundle_path(args.shared_dir, a))
+            for a in served_artifacts(args.registry).values()
+        ]
+    for model, out in jobs:
+        export_bundle(joblib.load(model), out)
+        print(f"Saved bundle to: {out} ({out.stat().st_size / 1e3:.1f} kB)")
+
+
+if __name__ == "__main__":
+    main()
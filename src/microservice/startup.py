@@ -0,0 +1,94 @@
+import argparse
+import json
+import subprocess
+import sys
+import time
+from collections import defaultdict
+from collections.abc import Iterator
+from contextlib import contextmanager
+from typing import Any
+
+from src.utils.constants import ROOT_DIR
+
+
+class StartupProfile:
+    """Wall-clock timings of the named startup phases of the service."""
+
+    def __init__(self) -> None:
+        self.started = time.perf_counter()
+        self.phases: dict[str, float] = {}
+        self.marks: dict[str, float] = {}
+
+    @contextmanager
+    def phase(self, name: str) -> Iterator[None]:
+        t0 = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.phases[name] = time.perf_counter() - t0
+
+    def mark(self, name: str) -> None:
+        """Record the time since the profile was created under `name`."""
+        self.marks[name] = time.perf_counter() - self.started
+
+    def report(self) -> dict[str, Any]:
+        return {
+            "phases_s": {k: round(v, 4) for k, v in self.phases.items()},
+            "marks_s": {k: round(v, 4) for k, v in self.marks.items()},
+        }
+
+
+PROFILE = StartupProfile()
+
+_PROBE = """
+import json, sys, time
+t0 = time.perf_counter()
+import src.microservice.app as app
+imported = time.perf_counter() - t0
+app.registry.load()
+ready = time.perf_counter() - t0
+print(json.dumps({"import_s": imported, "ready_s": ready,
+                  "profile": app.PROFILE.report()}))
+"""
+
+
+def parse_importtime(stderr: str) -> dict[str, float]:
+    """Self import time in seconds per top-level package from `-X importtime`."""
+    totals: dict[str, float] = defaultdict(float)
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, _, name = line.removeprefix("import time:").split("|")
+        totals[name.strip().split(".")[0]] += int(self_us) / 1e6
+    return dict(totals)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description="Profile service startup in a fresh interpreter."
+    )
+    parser.add_argument("--top", type=int, default=15)
+    args = parser.parse_args()
+
+    proc = subprocess.run(  # noqa: S603 - argv is sys.executable and a constant probe
+        [sys.executable, "-X", "importtime", "-c", _PROBE],
+        cwd=ROOT_DIR,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    result = json.loads(proc.stdout.strip().splitlines()[-1])
+    packages = parse_importtime(proc.stderr)
+
+    print(f"import src.microservice.app: {result['import_s'] * 1e3:8.1f} ms")
+    print(f"models loaded and warmed:    {result['ready_s'] * 1e3:8.1f} ms")
+    print("\nphases:")
+    for name, seconds in result["profile"]["phases_s"].items():
+        print(f"  {name:<28} {seconds * 1e3:8.1f} ms")
+    print(f"\nimport time by package (top {args.top}):")
+    for name, seconds in sorted(packages.items(), key=lambda kv: -kv[1])[: args.top]:
+        print(f"  {name:<28} {seconds * 1e3:8.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,217 @@
+from __future__ import annotations
+
+import argparse
+import json
+import threading
+import time
+from pathlib import Path
+from typing import TYPE_CHECKING, Any
+
+import numpy as np
+
+from src.microservice.compiled import compile_pipeline
+from src.utils.constants import MODEL_B_PATH, ROOT_DIR
+
+if TYPE_CHECKING:
+    from sklearn.pipeline import Pipeline
+    from xgboost import Booster
+
+FOREST_ARRAYS = ("left", "right", "feature", "threshold", "default_left")
+
+
+class FlatForest:
+    """Trees of a binary:logistic gbtree flattened into NumPy node arrays.
+
+    All trees are walked level by level for a whole batch at once: each step
+    gathers the current node's split feature and threshold for every
+    (row, tree) pair and moves to the left or right child. The node arrays
+    are only read, so they may be read-only memory-mapped views.
+    """
+
+    def __init__(self, arrays: dict[str, np.ndarray], base_margin: float):
+        self.left = arrays["left"]
+        self.right = arrays["right"]
+        self.feature = arrays["feature"]
+        self.threshold = arrays["threshold"]
+        self.default_left = arrays["default_left"]
+        self.base_margin = base_margin
+        self.n_trees = self.left.shape[0]
+        self.is_leaf = self.left == -1
+        self.depth = self._max_depth()
+
+    @classmethod
+    def from_booster(cls, booster: Booster) -> FlatForest:
+        model = json.loads(booster.save_raw("json"))
+        learner = model["learner"]
+        if learner["objective"]["name"] != "binary:logistic":
+            raise ValueError("Only binary:logistic boosters are supported")
+        trees = learner["gradient_booster"]["model"]["trees"]
+        if any(t["categories_nodes"] for t in trees):
+            raise ValueError("Categorical splits are not supported")
+
+        base_score = float(learner["learner_model_param"]["base_score"])
+        width = max(len(t["left_children"]) for t in trees)
+
+        shape = (len(trees), width)
+        left = np.full(shape, -1, dtype=np.int32)
+        right = np.full(shape, -1, dtype=np.int32)
+        feature = np.zeros(shape, dtype=np.int32)
+        threshold = np.zeros(shape, dtype=np.float32)
+        default_left = np.zeros(shape, dtype=bool)
+        for i, t in enumerate(trees):
+            n = len(t["left_children"])
+            left[i, :n] = t["left_children"]
+            right[i, :n] = t["right_children"]
+            feature[i, :n] = t["split_indices"]
+            # For leaves split_conditions holds the leaf value.
+            threshold[i, :n] = t["split_conditions"]
+            default_left[i, :n] = t["default_left"]
+        arrays = {
+            "left": left,
+            "right": right,
+            "feature": feature,
+            "threshold": threshold,
+            "default_left": default_left,
+        }
+        return cls(arrays, float(np.log(base_score / (1.0 - base_score))))
+
+    def arrays(self) -> dict[str, np.ndarray]:
+        return {name: getattr(self, name) for name in FOREST_ARRAYS}
+
+    def _max_depth(self) -> int:
+        depth = 0
+        for i in range(self.n_trees):
+            stack = [(0, 0)]
+            while stack:
+                node, d = stack.pop()
+                if self.is_leaf[i, node]:
+                    depth = max(depth, d)
+                    continue
+                stack.append((int(self.left[i, node]), d + 1))
+                stack.append((int(self.right[i, node]), d + 1))
+        return depth
+
+    def predict_margin(self, X: np.ndarray) -> np.ndarray:
+        n = X.shape[0]
+        trees = np.broadcast_to(np.arange(self.n_trees), (n, self.n_trees))
+        rows = np.broadcast_to(np.arange(n)[:, None], (n, self.n_trees))
+        nodes = np.zeros((n, self.n_trees), dtype=np.int32)
+        for _ in range(self.depth):
+            feat = self.feature[trees, nodes]
+            x = X[rows, feat]
+            go_left = np.where(
+                np.isnan(x), self.default_left[trees, nodes], x < self.threshold[trees, nodes]
+            )
+            nxt = np.where(go_left, self.left[trees, nodes], self.right[trees, nodes])
+            nodes = np.where(self.is_leaf[trees, nodes], nodes, nxt)
+        return self.base_margin + self.threshold[trees, nodes].sum(axis=1, dtype=np.float64)
+
+    def predict_proba(self, X: np.ndarray) -> np.ndarray:
+        return 1.0 / (1.0 + np.exp(-self.predict_margin(X)))
+
+
+class BoosterScorer:
+    """Serve an XGBClassifier pipeline from its raw Booster.
+
+    Feature dicts go through the compiled preprocessor into a per-thread,
+    preallocated float32 buffer, which is scored with `inplace_predict`
+    (no pandas, no DMatrix) or, with `backend="flat"`, by `FlatForest`.
+    """
+
+    def __init__(self, pipe: Pipeline, *, backend: str = "inplace", max_batch: int = 256):
+        from xgboost import XGBClassifier  # noqa: PLC0415
+
+        clf = pipe.named_steps["clf"]
+        if not isinstance(clf, XGBClassifier):
+            raise ValueError("Expected an XGBClassifier as 'clf'")
+        if backend not in {"inplace", "flat"}:
+            raise ValueError(f"Unknown backend: {backend!r}")
+        self.prep = compile_pipeline(pipe)
+        self.booster = clf.get_booster()
+        self.iteration_range = (0, self.booster.num_boosted_rounds())
+        self.forest = FlatForest.from_booster(self.booster) if backend == "flat" else None
+        self.backend = backend
+        self.max_batch = max_batch
+        self._local = threading.local()
+
+    def _buffer(self, n: int) -> np.ndarray:
+        buf = getattr(self._local, "buf", None)
+        if buf is None or buf.shape[0] < n:
+            buf = np.empty((max(n, self.max_batch), self.prep.n_features), dtype=np.float32)
+            self._local.buf = buf
+        return buf
+
+    def score_matrix(self, X: np.ndarray) -> np.ndarray:
+        if self.forest is not None:
+            return self.forest.predict_proba(X)
+        return np.asarray(
+            self.booster.inplace_predict(
+                X, iteration_range=self.iteration_range, predict_type="value"
+            ),
+            dtype=np.float64,
+        )
+
+    def predict_proba(self, rows: list[dict[str, Any]]) -> np.ndarray:
+        X = self.prep.transform_into(rows, self._buffer(len(rows)))
+        return self.score_matrix(X)
+
+
+def _bench(fn: Any, rows: list[dict[str, Any]], repeat: int) -> float:
+    t0 = time.perf_counter()
+    for _ in range(repeat):
+        for r in rows:
+            fn([r])
+    return (time.perf_counter() - t0) / (repeat * len(rows)) * 1e6
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser()
+    ap.add_argument(
+        "requests",
+        type=Path,
+        nargs="*",
+        default=sorted((ROOT_DIR / "requests").glob("*.json")),
+        help="Request JSON files with a `features` object",
+    )
+    ap.add_argument("--model", type=Path, default=MODEL_B_PATH)
+    ap.add_argument("--repeat", type=int, default=200)
+    ap.add_argument("--batch", type=int, default=1000)
+    ap.add_argument("--tol", type=float, default=1e-6)
+    args = ap.parse_args()
+
+    import joblib  # noqa: PLC0415
+    import pandas as pd  # noqa: PLC0415
+
+    pipe = joblib.load(args.model)
+    names = pipe.named_steps["prep"].feature_names_in_
+    rows = [
+        {k: f.get(k, np.nan) for k in names}
+        for f in (
+            json.loads(p.read_text(encoding="utf-8"))["features"]
+            for p in args.requests
+        )
+    ]
+    batch = [rows[i % len(rows)] for i in range(args.batch)]
+    expected = pipe.predict_proba(pd.DataFrame(batch))[:, 1]
+
+    def pipeline_fn(rs: list[dict[str, Any]]) -> np.ndarray:
+        return pipe.predict_proba(pd.DataFrame(rs))[:, 1]
+
+    t_pipe = _bench(pipeline_fn, rows, max(args.repeat // 10, 1))
+    print(f"pipeline: {t_pipe:8.1f} us/row")
+    for backend in ("inplace", "flat"):
+        scorer = BoosterScorer(pipe, backend=backend)
+        diff = float(np.max(np.abs(expected - scorer.predict_proba(batch))))
+        t_one = _bench(scorer.predict_proba, rows, args.repeat)
+        t0 = time.perf_counter()
+        scorer.predict_proba(batch)
+        t_batch = (time.perf_counter() - t0) / len(batch) * 1e6
+        status = "OK" if diff <= args.tol else "MISMATCH"
+        print(
+            f"{backend:>8}: {t_one:8.1f} us/row single, {t_batch:6.2f} us/row "
+            f"batched({args.batch})  max|diff|={diff:.3g} [{status}]"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -1,6 +1,7 @@
 import joblib
 from sklearn.pipeline import Pipeline
 
+from src.microservice.linear_scorer import export_linear_scorer
 from src.modeling.preprocess import make_preprocess
 from src.modeling.train_baseline import (
     DATA,
@@ -8,7 +9,12 @@ from src.modeling.train_baseline import (
     pick_feature_columns,
     prepare_xyg,
 )
-from src.utils.constants import MODEL_A_PATH, MODEL_B_PATH, MODELS_DIR
+from src.utils.constants import (
+    MODEL_A_PATH,
+    MODEL_A_SCORER_PATH,
+    MODEL_B_PATH,
+    MODELS_DIR,
+)
 from src.utils.models import get_models
 
 
@@ -31,8 +37,10 @@ def main() -> None:
     MODELS_DIR.mkdir(parents=True, exist_ok=True)
     joblib.dump(pipe_a, MODEL_A_PATH)
     joblib.dump(pipe_b, MODEL_B_PATH)
+    export_linear_scorer(pipe_a).save(MODEL_A_SCORER_PATH)
 
     print(f"Saved model A to: {MODEL_A_PATH}")
+    print(f"Saved model A scorer to: {MODEL_A_SCORER_PATH}")
     print(f"Saved model B to: {MODEL_B_PATH}")
 
 
@@ -14,6 +14,7 @@ from sklearn.pipeline import Pipeline
 from xgboost import XGBClassifier
 
 import src.utils.pandas as pandas_utils
+from src.data_processing.columnar import read_dataset
 from src.data_processing.features import get_amen_col_names, review_features
 from src.modeling.preprocess import make_preprocess
 from src.modeling.tune import XGBoostTuneConfig, tune_xgboost
@@ -74,7 +75,7 @@ class CVConfig:
 
 
 def load_dataset(path: Path) -> pd.DataFrame:
-    return pd.read_csv(path)
+    return read_dataset(path)
 
 
 def prepare_xyg(df: pd.DataFrame) -> tuple[pd.DataFrame, pd.Series, pd.Series]:
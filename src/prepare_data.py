@@ -1,28 +1,76 @@
+import argparse
+from pathlib import Path
+
 from src.data_processing.bookings import (
     load_listing_features,
     load_sessions,
     load_user_features,
+    prepare_bookings_streaming,
     prepare_bookings_to_train,
 )
+from src.data_processing.stages import prepare_bookings_incremental
 from src.utils.constants import DATA_DIR
 
-if __name__ == "__main__":
-    sessions = load_sessions(DATA_DIR / "sessions.csv")
-    listing_feats = load_listing_features(DATA_DIR / "listings.csv")
-    user_feats = load_user_features(DATA_DIR / "users.csv")
-    sessions = sessions.merge(
-        listing_feats, on="listing_id", how="left", validate="m:1"
-    )
 
-    bookings_prepared = prepare_bookings_to_train(
-        sessions,
-        user_feats,
-        amen_topk=50,
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description="Build bookings_prepared.csv from raw sessions, listings and users."
     )
-    bookings_prepared.to_csv(DATA_DIR / "bookings_prepared.csv", index=False)
-    print(
-        "Saved:",
-        DATA_DIR / "bookings_prepared.csv",
-        "rows:",
-        len(bookings_prepared),
+    parser.add_argument("--data-dir", type=Path, default=DATA_DIR)
+    parser.add_argument("--out", type=Path, default=None)
+    parser.add_argument("--amen-topk", type=int, default=50)
+    parser.add_argument(
+        "--chunksize",
+        type=int,
+        default=None,
+        help="Stream sessions in chunks of this many rows instead of all at once.",
     )
+    parser.add_argument(
+        "--incremental",
+        action="store_true",
+        help=(
+            "Reuse cached stages under <data-dir>/cache/stages and only process "
+            "changed inputs. Sessions may be split into <data-dir>/sessions/*.csv."
+        ),
+    )
+    args = parser.parse_args()
+    out_path = args.out or args.data_dir / "bookings_prepared.csv"
+
+    if args.incremental:
+        rows, cache = prepare_bookings_incremental(
+            args.data_dir,
+            out_path,
+            amen_topk=args.amen_topk,
+            chunksize=args.chunksize or 500_000,
+        )
+        print("Stages built:", cache.summary())
+        print("Saved:", out_path, "rows:", rows)
+        return
+
+    if args.chunksize:
+        rows = prepare_bookings_streaming(
+            args.data_dir,
+            out_path,
+            amen_topk=args.amen_topk,
+            chunksize=args.chunksize,
+        )
+    else:
+        listing_feats = load_listing_features(args.data_dir / "listings.csv")
+        user_feats = load_user_features(args.data_dir / "users.csv")
+        sessions = load_sessions(args.data_dir / "sessions.csv")
+        sessions = sessions.merge(
+            listing_feats, on="listing_id", how="left", validate="m:1"
+        )
+        bookings_prepared = prepare_bookings_to_train(
+            sessions,
+            user_feats,
+            amen_topk=args.amen_topk,
+            listing_feats=listing_feats,
+        )
+        bookings_prepared.to_csv(out_path, index=False)
+        rows = len(bookings_prepared)
+    print("Saved:", out_path, "rows:", rows)
+
+
+if __name__ == "__main__":
+    main()
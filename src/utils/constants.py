@@ -7,15 +7,21 @@ ROOT_DIR = Path(__file__).resolve().parents[2]
 
 DATA_DIR = ROOT_DIR / "data"
 DATA = DATA_DIR / "bookings_prepared.csv"
+FEATURE_STORE_DIR = DATA_DIR / "feature_store"
 
 TARGET = "long_stay"
 
 MODELS_DIR = ROOT_DIR / "models"
 MODEL_A_PATH = MODELS_DIR / "regression.joblib"
 MODEL_B_PATH = MODELS_DIR / "xgboost.joblib"
+MODEL_A_SCORER_PATH = MODELS_DIR / "regression_scorer.json"
+MODEL_REGISTRY_DIR = MODELS_DIR / "registry"
+MODEL_SHARED_DIR = MODELS_DIR / "shared"
 
 LOG_DIR = ROOT_DIR / "logs"
 AB_LOG_PATH = LOG_DIR / "ab_log.jsonl"
+AB_LOG_DIR = LOG_DIR / "ab_log"
+AB_EVENTS_DIR = LOG_DIR / "ab_events"
 
 
 XGB_CONFIG: dict[str, Any] = {
@@ -0,0 +1,8 @@
+import hashlib
+from pathlib import Path
+
+
+def file_digest(path: Path, length: int = 12) -> str:
+    """Short SHA-256 content hash of a file, e.g. a model artifact's version."""
+    with path.open("rb") as f:
+        return hashlib.file_digest(f, "sha256").hexdigest()[:length]
@@ -1,3 +1,6 @@
+import math
+from typing import Any
+
 import pandas as pd
 
 
@@ -14,3 +17,21 @@ def require_series(df: pd.DataFrame, column: str) -> pd.Series:
             f"Expected 1D column {column!r}, got DataFrame (duplicate cols?)"
         )
     return col
+
+
+def rows_frame(rows: list[dict[str, Any]]) -> pd.DataFrame:
+    """Feature dicts as a frame in which every row is typed as if it were alone.
+
+    `pd.DataFrame(rows)` infers one dtype per column across all rows, so a
+    None next to values becomes NaN and the encoders see another category
+    than for the same row scored alone. Here every column is object dtype
+    holding the values as sent; a key absent from a row is NaN.
+    """
+    columns = dict.fromkeys(key for row in rows for key in row)
+    return pd.DataFrame(
+        {
+            c: pd.Series([row.get(c, math.nan) for row in rows], dtype=object)
+            for c in columns
+        },
+        index=pd.RangeIndex(len(rows)),
+    )
@@ -0,0 +1,10 @@
+import re
+
+_slug_re = re.compile(r"[^a-z0-9_]+")
+
+
+def slugify_amenity(a: str) -> str:
+    s = a.strip().lower().replace(" ", "_")
+    s = _slug_re.sub("_", s)
+    s = re.sub(r"_+", "_", s).strip("_")
+    return s or "amenity"
@@ -0,0 +1,109 @@
+import asyncio
+import json
+from typing import Any
+
+import numpy as np
+
+from src.microservice.batching import MicroBatcher
+from src.microservice.registry import default_artifacts, load_model_set
+from src.utils.constants import ROOT_DIR
+
+REQUEST = ROOT_DIR / "requests" / "request_07_long_sparse.json"
+
+
+class Snapshot:
+    """Stands in for a `ModelSet`: hashable by identity, with a version."""
+
+    def __init__(self, version: str):
+        self.version = version
+
+
+class Registry:
+    def __init__(self, current: Snapshot):
+        self.current = current
+
+
+def test_batch_pending_across_a_swap_scores_each_snapshot() -> None:
+    old, new = Snapshot("v1"), Snapshot("v2")
+    registry = Registry(old)
+    calls: list[tuple[str, str, int]] = []
+
+    def predict(models: Any, variant: str, rows: list[dict[str, Any]]) -> np.ndarray:
+        calls.append((models.version, variant, len(rows)))
+        return np.full(len(rows), 0.1 if models is old else 0.9)
+
+    async def requests() -> list[float]:
+        # Each request scores with the snapshot it read, like /predict does.
+        before = asyncio.ensure_future(
+            batcher.submit_async(registry.current, "A", {"x": 1})
+        )
+        await asyncio.sleep(0)
+        registry.current = new
+        after = batcher.submit_async(registry.current, "A", {"x": 2})
+        return await asyncio.gather(before, after)
+
+    batcher = MicroBatcher(predict, max_batch_size=8, max_wait_ms=200.0)
+    batcher.start()
+    try:
+        scores = asyncio.run(requests())
+    finally:
+        batcher.stop()
+
+    assert scores == [0.1, 0.9]
+    assert batcher.batch_size.snapshot()["count"] == 1
+    assert sorted(calls) == [("v1", "A", 1), ("v2", "A", 1)]
+
+
+def test_failing_row_fails_alone() -> None:
+    calls: list[int] = []
+
+    def predict(models: Any, variant: str, rows: list[dict[str, Any]]) -> np.ndarray:
+        calls.append(len(rows))
+        if any(r["x"] is None for r in rows):
+            raise ValueError("x is required")
+        return np.array([r["x"] / 10.0 for r in rows])
+
+    async def requests() -> list[Any]:
+        snapshot = Snapshot("v1")
+        return await asyncio.gather(
+            *(batcher.submit_async(snapshot, "A", {"x": x}) for x in (1, None, 3)),
+            return_exceptions=True,
+        )
+
+    batcher = MicroBatcher(predict, max_batch_size=3, max_wait_ms=200.0)
+    batcher.start()
+    try:
+        first, failed, third = asyncio.run(requests())
+    finally:
+        batcher.stop()
+
+    assert (first, third) == (0.1, 0.3)
+    assert isinstance(failed, ValueError)
+    assert calls == [3, 1, 1, 1]
+
+
+def test_mixed_batch_scores_like_single_rows() -> None:
+    request = json.loads(REQUEST.read_text(encoding="utf-8"))
+    models = load_model_set(default_artifacts())
+    sparse = models.amenities.expand(request["features"], request["amenities"])
+    filled = {**sparse, "min_ge_7": 1.0, "bath_is_private": 1.0}
+    rows = [sparse, filled, sparse, filled]
+
+    def predict(models: Any, variant: str, rows: list[dict[str, Any]]) -> np.ndarray:
+        return models.predict(variant, rows)
+
+    async def requests(variant: str) -> list[float]:
+        return await asyncio.gather(
+            *(batcher.submit_async(models, variant, r) for r in rows)
+        )
+
+    batcher = MicroBatcher(predict, max_batch_size=len(rows), max_wait_ms=200.0)
+    batcher.start()
+    try:
+        for variant in models.artifacts:
+            scores = asyncio.run(requests(variant))
+            alone = [models.predict(variant, [r])[0] for r in rows]
+            np.testing.assert_allclose(scores, alone, rtol=0, atol=1e-12)
+    finally:
+        batcher.stop()
+    assert batcher.batch_size.snapshot()["count"] == len(models.artifacts)
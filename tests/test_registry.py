@@ -0,0 +1,63 @@
+import json
+from pathlib import Path
+from typing import Any
+
+import numpy as np
+
+from src.microservice.registry import (
+    ModelRegistry,
+    ModelSet,
+    default_artifacts,
+    load_model_set,
+    publish_model,
+)
+from src.utils.constants import ROOT_DIR
+
+REQUEST = ROOT_DIR / "requests" / "request_07_long_sparse.json"
+
+FLAGS = {
+    "min_ge_7": 1.0,
+    "max_lt_7": 0.0,
+    "bath_is_shared": 0.0,
+    "bath_is_private": 1.0,
+}
+
+
+def test_row_scores_the_same_alone_and_in_a_mixed_batch() -> None:
+    request = json.loads(REQUEST.read_text(encoding="utf-8"))
+    models = load_model_set(default_artifacts())
+    sparse = models.amenities.expand(request["features"], request["amenities"])
+    # The same listing with the numeric flags set: next to it, the None flags
+    # of `sparse` share a column with floats and must not turn into NaN.
+    filled = {**sparse, **FLAGS}
+    for variant in models.artifacts:
+        alone = models.predict(variant, [sparse])
+        batched = models.predict(variant, [sparse, filled, sparse])
+        np.testing.assert_allclose(batched[[0, 2]], [alone[0]] * 2, rtol=0, atol=1e-12)
+        np.testing.assert_allclose(
+            batched[1], models.predict(variant, [filled])[0], rtol=0, atol=1e-12
+        )
+
+
+def test_failed_reload_is_retried(tmp_path: Path) -> None:
+    source = tmp_path / "model.joblib"
+    source.write_bytes(b"v1")
+    failures = [RuntimeError("disk full")]
+
+    def loader(artifacts: dict[str, Any], **_: Any) -> ModelSet:
+        if failures and artifacts["A"].version == "v2":
+            raise failures.pop()
+        return ModelSet(artifacts, {}, features=[])
+
+    registry = ModelRegistry(tmp_path / "registry", loader=loader)
+    publish_model(registry.directory, "A", source, version="v1")
+    registry.load()
+    publish_model(registry.directory, "A", source, version="v2")
+
+    assert not registry.refresh()
+    assert registry.last_error == "RuntimeError: disk full"
+    # The manifest has not changed since, but its models are still not served.
+    assert registry.refresh()
+    assert registry.current.versions["A"] == "v2"
+    assert registry.last_error is None
+    assert not registry.refresh()
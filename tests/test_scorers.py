@@ -0,0 +1,111 @@
+import json
+import math
+from typing import Any
+
+import joblib
+import numpy as np
+import pytest
+
+from src.microservice.compiled import compile_pipeline
+from src.microservice.linear_scorer import LinearScorer, export_linear_scorer
+from src.microservice.xgb_scorer import BoosterScorer
+from src.utils.constants import MODEL_A_PATH, MODEL_B_PATH, ROOT_DIR
+from src.utils.pandas import rows_frame
+
+REQUESTS = sorted((ROOT_DIR / "requests").glob("*.json"))
+
+
+@pytest.fixture(scope="module")
+def pipe_a() -> Any:
+    return joblib.load(MODEL_A_PATH)
+
+
+@pytest.fixture(scope="module")
+def pipe_b() -> Any:
+    return joblib.load(MODEL_B_PATH)
+
+
+def _columns(pipe: Any, name: str) -> list[str]:
+    prep = pipe.named_steps["prep"]
+    return next(list(cols) for n, _, cols in prep.transformers_ if n == name)
+
+
+def make_rows(pipe: Any) -> list[dict[str, Any]]:
+    """The example requests plus rows with None, NaN and absent features."""
+    rows = [json.loads(p.read_text(encoding="utf-8"))["features"] for p in REQUESTS]
+    base = rows[0]
+    num, cat = _columns(pipe, "num"), _columns(pipe, "cat")
+    return [
+        *rows,
+        {**base, num[0]: None, cat[0]: None},
+        {**base, num[1]: math.nan, cat[1]: math.nan},
+        {k: v for k, v in base.items() if k not in {num[2], cat[2]}},
+        {},
+    ]
+
+
+def pipeline_proba(pipe: Any, rows: list[dict[str, Any]]) -> np.ndarray:
+    """The pipeline's scores for all rows in one batch, absent features as NaN.
+
+    The frame is built as `ModelSet.predict_timed` builds it, so a None
+    stays None next to floats instead of becoming NaN.
+    """
+    names = pipe.named_steps["prep"].feature_names_in_
+    X = rows_frame([{k: r.get(k, np.nan) for k in names} for r in rows])
+    return pipe.predict_proba(X)[:, 1]
+
+
+def assert_parity(pipe: Any, scorer: Any, tol: float) -> None:
+    rows = make_rows(pipe)
+    got = np.asarray(scorer.predict_proba(rows), dtype=np.float64)
+    np.testing.assert_allclose(got, pipeline_proba(pipe, rows), rtol=0, atol=tol)
+
+
+@pytest.mark.parametrize("variant", ["A", "B"])
+def test_compiled_matches_pipeline(
+    variant: str, pipe_a: Any, pipe_b: Any
+) -> None:
+    pipe = pipe_a if variant == "A" else pipe_b
+    assert_parity(pipe, compile_pipeline(pipe), tol=1e-6)
+
+
+def test_linear_scorer_matches_pipeline(pipe_a: Any) -> None:
+    assert_parity(pipe_a, export_linear_scorer(pipe_a), tol=1e-9)
+
+
+def test_linear_scorer_survives_json(pipe_a: Any) -> None:
+    raw = json.loads(json.dumps(export_linear_scorer(pipe_a).to_dict()))
+    assert_parity(pipe_a, LinearScorer.from_dict(raw), tol=1e-9)
+
+
+@pytest.mark.parametrize("backend", ["inplace", "flat"])
+def test_booster_scorer_matches_pipeline(backend: str, pipe_b: Any) -> None:
+    assert_parity(pipe_b, BoosterScorer(pipe_b, backend=backend), tol=1e-6)
+
+
+@pytest.mark.parametrize(
+    "make_scorer",
+    [
+        lambda a, b: compile_pipeline(a),
+        lambda a, b: export_linear_scorer(a),
+        lambda a, b: BoosterScorer(b, backend="inplace"),
+        lambda a, b: BoosterScorer(b, backend="flat"),
+    ],
+    ids=["compiled", "linear", "inplace", "flat"],
+)
+def test_fast_paths_impute_absent_features(
+    make_scorer: Any, pipe_a: Any, pipe_b: Any
+) -> None:
+    # Intended: an absent key is scored as if it were sent as NaN, so the
+    # pipeline's "columns are missing" error does not apply to fast paths.
+    scorer = make_scorer(pipe_a, pipe_b)
+    nan_row = dict.fromkeys(scorer_inputs(scorer), math.nan)
+    empty, explicit = scorer.predict_proba([{}, nan_row])
+    assert empty == pytest.approx(explicit, abs=1e-12)
+
+
+def scorer_inputs(scorer: Any) -> list[str]:
+    if isinstance(scorer, LinearScorer):
+        return sorted({t.key for t in scorer.terms})
+    prep = scorer.prep if isinstance(scorer, BoosterScorer) else scorer
+    return prep.input_features
@@ -0,0 +1,41 @@
+import json
+
+import numpy as np
+
+from src.microservice.registry import default_artifacts
+from src.microservice.scoring import ScoringExecutor
+from src.utils.constants import ROOT_DIR
+
+REQUEST = ROOT_DIR / "requests" / "request_07_long_sparse.json"
+
+
+def test_process_workers_are_warm_and_rewarmed_on_swap() -> None:
+    request = json.loads(REQUEST.read_text(encoding="utf-8"))
+    artifacts = default_artifacts()
+    threads = ScoringExecutor("thread", 1)
+    processes = ScoringExecutor("process", 2)
+    threads.start()
+    processes.start()
+    try:
+        local = threads.load_models(artifacts)
+        remote = processes.load_models(artifacts)
+        # The parent keeps no models, only what requests need to build rows.
+        assert remote.models == {}
+        assert remote.scorers == {}
+        assert remote.amenities.columns == local.amenities.columns
+        rows = [remote.amenities.expand(request["features"], request["amenities"])]
+        for variant in artifacts:
+            expected, _ = threads.predict(local, variant, rows)
+            got, stages = processes.predict(remote, variant, rows)
+            np.testing.assert_allclose(got, expected, rtol=0, atol=1e-12)
+            assert "queue" in stages
+
+        swapped = processes.load_models(artifacts, previous=remote)
+        got, _ = processes.predict(swapped, "A", rows)
+        # A request holding the previous set is served by the new pool too.
+        again, _ = processes.predict(remote, "A", rows)
+        np.testing.assert_allclose(again, got, rtol=0, atol=1e-12)
+        assert processes.stats()["pools_started"] == 2
+    finally:
+        threads.stop()
+        processes.stop()